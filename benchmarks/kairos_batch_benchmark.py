@@ -0,0 +1,52 @@
+"""
+Compares a line-status dashboard load (40 lines x 5 tags) issued per metric with the batched query API.
+
+Run from the repository root:
+    python -m benchmarks.kairos_batch_benchmark
+"""
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.kairos_stub_server import start_stub_server  # noqa: E402
+from scripts.db.kairos.kairos_connection import KairosConn  # noqa: E402
+from scripts.db.kairos.kairos_queries import KairosMetricSpec  # noqa: E402
+
+LINES = 40
+TAGS = 5
+START = 1704067200000
+END = START + 8 * 60 * 60 * 1000 - 1
+RUNS = 5
+
+
+def main():
+    server, base_url = start_stub_server()
+    kairos = KairosConn()
+    kairos.kairos_instance.base_url = base_url
+    specs = [
+        KairosMetricSpec(f"tag_{tag}", {"c3": f"line_{line}"}, "avg", "minutes", 15)
+        for line in range(LINES)
+        for tag in range(TAGS)
+    ]
+    try:
+        for label, load in [
+            ("per metric", lambda: [
+                kairos.aggregate_kairosdb(spec.metric, spec.tags, START, END, spec.aggregation_type,
+                                          spec.sampling_unit, spec.sampling_value, "UTC")
+                for spec in specs
+            ]),
+            ("batched", lambda: kairos.query_batch(specs, START, END, "UTC")),
+        ]:
+            started = time.perf_counter()
+            for _ in range(RUNS):
+                load()
+            elapsed = (time.perf_counter() - started) / RUNS
+            print(f"{label:<12} {elapsed * 1000:>8.1f} ms/dashboard  {len(specs) / elapsed:>9.0f} metrics/s")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares parse time and peak memory of `response.json()` with the columnar response decoder
+on a one million point raw query, then times both paths end to end against the stub server.
+
+Run from the repository root:
+    python -m benchmarks.kairos_decoder_benchmark
+"""
+import json
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.kairos_stub_server import KairosStubHandler, start_stub_server  # noqa: E402
+from scripts.db.kairos.kairos_connection import KairosConn  # noqa: E402
+from scripts.db.kairos.response_decoder import KairosResponseDecoder  # noqa: E402
+
+POINTS = 1_000_000
+CHUNK_BYTES = 256 * 1024
+START = 1704067200000
+INTERVAL_MS = 1000
+
+
+def synthetic_body():
+    values = [[START + i * INTERVAL_MS, i * 0.25] for i in range(POINTS)]
+    body = {"queries": [{"sample_size": POINTS, "results": [
+        {"name": "tag_0", "group_by": [{"name": "type", "type": "number"}], "tags": {"c3": ["line_0"]},
+         "values": values}
+    ]}]}
+    return json.dumps(body).encode()
+
+
+def chunked(body):
+    view = memoryview(body)
+    for offset in range(0, len(body), CHUNK_BYTES):
+        yield bytes(view[offset:offset + CHUNK_BYTES])
+
+
+def stream_points(body):
+    return sum(len(series) for series in KairosResponseDecoder(chunk_points=100000).iter_series(chunked(body)))
+
+
+def measure(label, parse, body):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = parse(body)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{label:<22} {elapsed * 1000:>8.0f} ms  peak {peak / 2 ** 20:>8.1f} MiB")
+
+
+def main():
+    body = synthetic_body()
+    print(f"body {len(body) / 2 ** 20:.1f} MiB, {POINTS} points")
+    measure("json.loads", json.loads, body)
+    measure("decoder", lambda raw: KairosResponseDecoder().decode(chunked(raw)), body)
+    measure("decoder (streaming)", stream_points, body)
+
+    KairosStubHandler.point_interval_ms = INTERVAL_MS
+    server, base_url = start_stub_server()
+    kairos = KairosConn()
+    kairos.kairos_instance.base_url = base_url
+    end = START + POINTS * INTERVAL_MS - 1
+    try:
+        for label, load in [
+            ("query_kairosdb", lambda: kairos.query_kairosdb("tag_0", {}, START, end)),
+            ("columnar", lambda: kairos.query_kairosdb_columnar("tag_0", {}, START, end)),
+        ]:
+            started = time.perf_counter()
+            load()
+            print(f"{label:<22} {(time.perf_counter() - started) * 1000:>8.0f} ms end to end")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Payload size and response time of a 7 day, 1 second resolution series drawn on a 1000 pixel wide chart:
+raw query_kairosdb against each downsampling method.
+
+Run from the repository root:
+    python -m benchmarks.kairos_downsampling_benchmark
+"""
+import json
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.kairos_stub_server import KairosStubHandler, start_stub_server  # noqa: E402
+from scripts.core.engine.downsampling import DownsampleMethod  # noqa: E402
+from scripts.db.kairos.kairos_connection import KairosConn  # noqa: E402
+
+START = 1704067200000
+END = START + 7 * 24 * 60 * 60 * 1000 - 1
+WIDTH = 1000
+
+
+def main():
+    KairosStubHandler.point_interval_ms = 1000
+    server, base_url = start_stub_server()
+    kairos = KairosConn()
+    kairos.kairos_instance.base_url = base_url
+    try:
+        for label, load in [
+            ("raw", lambda: kairos.query_kairosdb("tag_0", {}, START, END)),
+            *[(method, lambda method=method: kairos.query_kairosdb_downsampled("tag_0", {}, START, END, WIDTH,
+                                                                              method, tz="UTC"))
+              for method in (DownsampleMethod.aggregate, DownsampleMethod.lttb, DownsampleMethod.min_max)],
+        ]:
+            started = time.perf_counter()
+            body = json.dumps(load())
+            elapsed = time.perf_counter() - started
+            points = body.count("], [") + 1
+            print(f"{label:<10} {points:>8} points  {len(body) / 2 ** 20:>7.2f} MiB  {elapsed * 1000:>7.0f} ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
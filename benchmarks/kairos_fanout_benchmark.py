@@ -0,0 +1,58 @@
+"""
+Compares a year-long aggregation sent as one Kairos request with the time-sliced fan-out.
+
+The stand-in server sleeps in proportion to the raw points in the requested window to model
+Kairos's scan cost, and answers with hourly buckets.
+
+Run from the repository root:
+    python -m benchmarks.kairos_fanout_benchmark
+"""
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.kairos_stub_server import KairosStubHandler, start_stub_server  # noqa: E402
+from scripts.db.kairos.kairos_queries import KairosQueryBuilder  # noqa: E402
+from scripts.db.kairos.query_planner import KairosQueryPlanner  # noqa: E402
+from scripts.utils.kairos_util import KairosDBUtility  # noqa: E402
+
+YEAR_START = 1704067200000  # 2024-01-01T00:00:00Z
+YEAR_END = 1735689600000 - 1
+RUNS = 3
+
+
+def timed(call):
+    best = None
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    KairosStubHandler.scan_cost_per_point_s = 2e-6
+    server, base_url = start_stub_server()
+    kairos = KairosDBUtility()
+    kairos.base_url = base_url
+    query = KairosQueryBuilder.aggregate_query("line_status", {"c3": "line_1"}, YEAR_START, YEAR_END, "avg",
+                                               "hours", 1, "UTC")
+    try:
+        single, expected = timed(lambda: kairos.read(query).json())
+        print(f"{'single request':<28} {single * 1000:>9.1f} ms")
+        for chunk_buckets, workers in [(24 * 31, 4), (24 * 7, 4), (24 * 7, 8)]:
+            planner = KairosQueryPlanner(kairos, chunk_buckets=chunk_buckets, max_workers=workers)
+            elapsed, merged = timed(lambda: planner.execute(query, "hours", 1, "UTC"))
+            slices = len(planner.plan(YEAR_START, YEAR_END, "hours", 1, "UTC"))
+            same = merged["queries"][0]["results"][0]["values"] == expected["queries"][0]["results"][0]["values"]
+            label = f"{slices} slices / {workers} workers"
+            print(f"{label:<28} {elapsed * 1000:>9.1f} ms  identical={same}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compares the pooled KairosDB session against one-shot `requests.post` calls.
+
+Run from the repository root:
+    python -m benchmarks.kairos_session_benchmark
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import requests  # noqa: E402
+
+from benchmarks.kairos_stub_server import start_stub_server  # noqa: E402
+from scripts.utils.kairos_util import KairosDBUtility, KairosSession  # noqa: E402
+
+REQUESTS = 2000
+WORKERS = 8
+QUERY = {
+    "start_absolute": 0,
+    "end_absolute": 30 * 60 * 1000,
+    "metrics": [{"name": "line_status", "tags": {"c3": "line_1"}}],
+}
+
+
+def run(label, call):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        list(executor.map(lambda _: call(), range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {REQUESTS / elapsed:>10.1f} req/s  {elapsed * 1000 / REQUESTS:>8.3f} ms/req")
+
+
+def main():
+    server, base_url = start_stub_server()
+    url = base_url + "/api/v1/datapoints/query"
+    pooled = KairosDBUtility(session=KairosSession.create(pool_maxsize=WORKERS))
+    pooled.base_url = base_url
+    try:
+        run("unpooled", lambda: requests.post(url, json=QUERY).json())
+        run("pooled", lambda: pooled.read(QUERY).json())
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
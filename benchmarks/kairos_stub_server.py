@@ -0,0 +1,112 @@
+"""
+Minimal stand-in for the KairosDB HTTP API used by the benchmarks.
+
+Serves `/api/v1/datapoints/query` with synthetic, evenly spaced series covering the
+requested window and `/api/v1/datapoints/query/tags` with a fixed tag map, and accepts
+writes on `/api/v1/datapoints`.
+"""
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UNIT_MS = {
+    "milliseconds": 1,
+    "seconds": 1000,
+    "minutes": 60 * 1000,
+    "hours": 60 * 60 * 1000,
+    "days": 24 * 60 * 60 * 1000,
+    "weeks": 7 * 24 * 60 * 60 * 1000,
+}
+
+
+class KairosStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    point_interval_ms = 60 * 1000
+    scan_cost_per_point_s = 0
+    written_points = 0
+    write_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body or b"{}")
+
+    def _send(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = self._read_body()
+        if self.path == "/api/v1/datapoints/query":
+            self._send(200, self.build_query_response(payload))
+        elif self.path == "/api/v1/datapoints/query/tags":
+            self._send(200, self.build_tags_response(payload))
+        elif self.path == "/api/v1/datapoints":
+            metrics = payload if isinstance(payload, list) else [payload]
+            points = sum(len(metric.get("datapoints", [])) + ("timestamp" in metric) for metric in metrics)
+            with self.write_lock:
+                KairosStubHandler.written_points += points
+            self._send(204)
+        elif self.path == "/api/v1/datapoints/delete":
+            self._send(204)
+        else:
+            self._send(404, {"errors": ["not found"]})
+
+    def build_tags_response(self, payload):
+        tags = {"c1": ["site_1"], "c3": [f"line_{i}" for i in range(40)]}
+        return {
+            "queries": [
+                {"results": [{"name": metric.get("name"), "tags": tags, "values": []}]}
+                for metric in payload.get("metrics", [])
+            ]
+        }
+
+    def build_query_response(self, payload):
+        start = payload.get("start_absolute", 0)
+        end = payload.get("end_absolute", start)
+        first = start + (-start % self.point_interval_ms)
+        raw_points = max(0, (end - first) // self.point_interval_ms + 1)
+        if self.scan_cost_per_point_s:
+            # stands in for the time Kairos spends reading rows, proportional to the window
+            time.sleep(raw_points * self.scan_cost_per_point_s)
+        queries = []
+        for metric in payload.get("metrics", []):
+            step = self.point_interval_ms
+            aggregators = metric.get("aggregators") or []
+            if aggregators and "sampling" in aggregators[0]:
+                sampling = aggregators[0]["sampling"]
+                step = max(step, int(sampling["value"]) * UNIT_MS.get(sampling["unit"], step))
+            first_bucket = start - start % step if aggregators else first
+            values = [[ts, float(ts // step % 100)] for ts in range(first_bucket, end + 1, step)]
+            queries.append(
+                {
+                    "sample_size": raw_points,
+                    "results": [
+                        {
+                            "name": metric.get("name"),
+                            "group_by": [{"name": "type", "type": "number"}],
+                            "tags": {k: v if isinstance(v, list) else [v] for k, v in metric.get("tags", {}).items()},
+                            "values": values,
+                        }
+                    ],
+                }
+            )
+        return {"queries": queries}
+
+
+def start_stub_server(host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), KairosStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
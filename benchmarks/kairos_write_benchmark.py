@@ -0,0 +1,66 @@
+"""
+Load test of point-by-point line-status writes: one POST per insert_data call against the
+background write buffer, both posting to the stub `/api/v1/datapoints` endpoint.
+
+Run from the repository root:
+    python -m benchmarks.kairos_write_benchmark
+"""
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.kairos_stub_server import KairosStubHandler, start_stub_server  # noqa: E402
+from scripts.db.kairos.kairos_connection import KairosConn  # noqa: E402
+from scripts.db.kairos.write_buffer import KairosWriteBuffer  # noqa: E402
+from scripts.utils.kairos_util import KairosDBUtility  # noqa: E402
+
+PRODUCERS = 8
+LINES = 40
+START = 1704067200000
+
+
+def produce(write, points):
+    def worker(producer):
+        for i in range(points):
+            write({"name": "line_status", "tags": {"c3": f"line_{(producer * points + i) % LINES}"},
+                   "timestamp": START + i * 1000, "value": i % 4})
+
+    threads = [threading.Thread(target=worker, args=(producer,)) for producer in range(PRODUCERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run(label, write, points, finish=lambda: None):
+    KairosStubHandler.written_points = 0
+    started = time.perf_counter()
+    produce(write, points)
+    finish()
+    elapsed = time.perf_counter() - started
+    total = PRODUCERS * points
+    print(f"{label:<10} {total:>8} points  {elapsed:>6.2f} s  {total / elapsed:>10.0f} points/s  "
+          f"received {KairosStubHandler.written_points}")
+
+
+def main():
+    server, base_url = start_stub_server()
+    kairos = KairosConn()
+    kairos.kairos_instance.base_url = base_url
+    kairos_instance = KairosDBUtility()
+    kairos_instance.base_url = base_url
+    buffer = KairosWriteBuffer(kairos_instance, max_points=5000, max_age=0.5, queue_size=2000)
+    try:
+        run("per call", kairos.insert_data, 250)
+        run("buffered", buffer.put, 25000, finish=buffer.flush)
+        print(buffer.stats())
+    finally:
+        buffer.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Soft delete of 1k, 100k and 1M documents: the previous path (one $match/$addFields/$merge over the query,
+then delete_many on the same query) against SoftDeleteEngine (snapshot _ids, archive and delete per batch).
+
+Needs a MongoDB server (4.2+ for $merge) in BENCHMARK_MONGO_URI, MONGO_URI otherwise.
+Both databases below are dropped when done.
+
+Run from the repository root:
+    python -m benchmarks.mongo_soft_delete_benchmark
+"""
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from pymongo import MongoClient  # noqa: E402
+
+from scripts.utils.mongo_soft_delete_util import SoftDeleteEngine, soft_delete_pipeline  # noqa: E402
+
+SIZES = (1_000, 100_000, 1_000_000)
+DB_NAME = "benchmark__soft_delete"
+COLLECTION = "widgets"
+QUERY = {"kind": "chart"}
+
+
+def populate(collection, size):
+    collection.drop()
+    for offset in range(0, size, 50_000):
+        collection.insert_many([
+            {"widget_id": i, "kind": "chart", "line": f"line_{i % 40}", "config": {"series": [i, i + 1]}}
+            for i in range(offset, min(offset + 50_000, size))
+        ], ordered=False)
+
+
+def previous_path(collection):
+    collection.aggregate(soft_delete_pipeline(QUERY, DB_NAME, COLLECTION))
+    return collection.delete_many(QUERY).deleted_count
+
+
+def timed(client, collection, size, call):
+    populate(collection, size)
+    client.drop_database(f"deleted__{DB_NAME}")
+    started = time.perf_counter()
+    deleted = call()
+    elapsed = time.perf_counter() - started
+    archived = client[f"deleted__{DB_NAME}"][COLLECTION].estimated_document_count()
+    assert deleted == archived == size, (deleted, archived, size)
+    return elapsed
+
+
+def main():
+    client = MongoClient(os.environ.get("BENCHMARK_MONGO_URI") or os.environ["MONGO_URI"])
+    # the timings depend on the server, print its version with them
+    print(f"MongoDB {client.server_info()['version']}")
+    collection = client[DB_NAME][COLLECTION]
+    engine = SoftDeleteEngine(collection, DB_NAME, COLLECTION)
+    try:
+        for size in SIZES:
+            previous = timed(client, collection, size, lambda: previous_path(collection))
+            batched = timed(client, collection, size, lambda: engine.delete_many(QUERY))
+            print(f"{size:>9} docs  merge+delete_many {previous * 1000:>10.1f} ms  "
+                  f"SoftDeleteEngine {batched * 1000:>10.1f} ms  ({engine.batch_size} per batch)")
+    finally:
+        client.drop_database(DB_NAME)
+        client.drop_database(f"deleted__{DB_NAME}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
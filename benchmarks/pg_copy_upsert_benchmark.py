@@ -0,0 +1,100 @@
+"""
+Rows/sec and peak Python memory of TableDDL upserts at 10k, 100k and 1M rows:
+one INSERT ... VALUES ... ON CONFLICT against the COPY + staging table path. Requires pandas.
+
+With BENCHMARK_PG_URI (full URI including the database) both paths run end to end against Postgres.
+Without it only the client side work is measured: building and compiling the VALUES statement against
+writing the CSV chunks COPY would stream.
+
+Run from the repository root:
+    python -m benchmarks.pg_copy_upsert_benchmark
+"""
+import io
+import os
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from sqlalchemy import Float, Integer, String, create_engine  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
+from sqlalchemy.dialects.postgresql import insert  # noqa: E402
+
+from scripts.config.app_configurations import PostgresConf  # noqa: E402
+from scripts.db.psql import TableDDL  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+# compiling a VALUES statement of a million rows takes minutes and gigabytes, the point is made by 100k
+VALUES_LIMIT = 100_000
+TABLE = "copy_upsert_benchmark"
+DATA_TYPES = {
+    "id": (Integer, True),
+    "line": (String, False),
+    "status": (Integer, False),
+    "value": (Float, False),
+}
+
+
+def frame(rows):
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "line": [f"line_{i % 40}" for i in range(rows)],
+        "status": np.arange(rows) % 4,
+        "value": np.random.default_rng(0).random(rows),
+    })
+
+
+def measure(label, rows, run):
+    tracemalloc.start()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} {rows:>9} rows  {rows / elapsed:>10.0f} rows/s  peak {peak / 2 ** 20:>8.1f} MiB")
+
+
+def compile_values(table_ddl, data_df):
+    table_model = table_ddl.create_model(DATA_TYPES)
+    statement = insert(table_model).values(data_df.to_dict(orient="records"))
+    statement = statement.on_conflict_do_update(
+        index_elements=[table_model.c.id],
+        set_={name: getattr(statement.excluded, name) for name in data_df if name != "id"},
+    )
+    statement.compile(dialect=postgresql.dialect())
+
+
+def write_csv_chunks(table_ddl, data_df):
+    columns = list(table_ddl.create_model(DATA_TYPES).columns)
+    for start in range(0, len(data_df), PostgresConf.copy_chunk_rows):
+        buffer = io.StringIO()
+        table_ddl.csv_ready(data_df.iloc[start:start + PostgresConf.copy_chunk_rows], columns).to_csv(
+            buffer, index=False, header=False, na_rep="\\N"
+        )
+
+
+def main():
+    uri = os.environ.get("BENCHMARK_PG_URI")
+    engine = create_engine(uri) if uri else None
+    table_ddl = TableDDL(engine, TABLE)
+    if engine is not None:
+        table_ddl.create_new_table(DATA_TYPES)
+    try:
+        for rows in SIZES:
+            data_df = frame(rows)
+            if rows <= VALUES_LIMIT:
+                measure("values", rows, lambda: table_ddl.insert_data(data_df, DATA_TYPES, ["id"], bulk=False)
+                        if engine is not None else compile_values(table_ddl, data_df))
+            measure("copy", rows, lambda: table_ddl.insert_data(data_df, DATA_TYPES, ["id"], bulk=True)
+                    if engine is not None else write_csv_chunks(table_ddl, data_df))
+    finally:
+        if engine is not None:
+            table_ddl.create_model(DATA_TYPES).drop(engine)
+
+
+if __name__ == "__main__":
+    main()
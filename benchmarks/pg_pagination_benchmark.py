@@ -0,0 +1,82 @@
+"""
+OFFSET pagination with a separate count query against keyset pagination on a one million row table.
+
+Runs against BENCHMARK_PG_URI (full URI including the database) when set, otherwise against a local
+SQLite file; the estimated count mode needs Postgres and is skipped on SQLite.
+
+Run from the repository root:
+    python -m benchmarks.pg_pagination_benchmark
+"""
+import os
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import Column, Integer, String, create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import declarative_base, sessionmaker  # noqa: E402
+
+from scripts.db.psql.pagination import CountMode, count_statement, encode_cursor  # noqa: E402
+from scripts.utils.postgres_util import PostgresUtility  # noqa: E402
+
+ROWS = 1_000_000
+PAGE_SIZE = 50
+DEPTHS = [0, 10_000, 500_000, 990_000]
+RUNS = 5
+
+Base = declarative_base()
+
+
+class BenchmarkRow(Base):
+    __tablename__ = "pagination_benchmark"
+    id = Column(Integer, primary_key=True)
+    line = Column(String)
+    status = Column(Integer)
+
+
+def timed(call):
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        result = call()
+    return (time.perf_counter() - started) / RUNS * 1000, result
+
+
+def main():
+    uri = os.environ.get("BENCHMARK_PG_URI") or f"sqlite:///{tempfile.mkdtemp()}/pagination.db"
+    engine = create_engine(uri)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for offset in range(0, ROWS, 100_000):
+            connection.execute(insert(BenchmarkRow), [
+                {"id": i, "line": f"line_{i % 40}", "status": i % 4} for i in range(offset, offset + 100_000)
+            ])
+    session = sessionmaker(bind=engine)()
+    utility = PostgresUtility(session, BenchmarkRow)
+    query = f"SELECT * FROM {BenchmarkRow.__tablename__} ORDER BY id LIMIT :page_size OFFSET :offset"
+    count_query = f"SELECT count(*) FROM {BenchmarkRow.__tablename__}"
+    try:
+        for depth in DEPTHS:
+            offset_ms, _ = timed(lambda: utility.find_data_by_pagination(
+                query, count_query, page=depth // PAGE_SIZE + 1, page_size=PAGE_SIZE))
+            cursor = encode_cursor([depth - 1], depth) if depth else None
+            keyset_ms, _ = timed(lambda: utility.find_data_by_cursor(["id"], cursor, PAGE_SIZE))
+            window_ms, _ = timed(lambda: utility.find_data_by_cursor(
+                ["id"], cursor, PAGE_SIZE, count_mode=CountMode.window))
+            print(f"row {depth:>7}  offset+count {offset_ms:>8.2f} ms  keyset {keyset_ms:>6.2f} ms  "
+                  f"keyset+window total {window_ms:>8.2f} ms")
+        exact_ms, exact = timed(lambda: session.execute(count_statement(BenchmarkRow)).scalar())
+        print(f"exact count      {exact_ms:>8.2f} ms  ({exact})")
+        if engine.dialect.name == "postgresql":
+            session.execute(text(f"ANALYZE {BenchmarkRow.__tablename__}"))
+            estimated_ms, estimated = timed(lambda: utility.estimate_count())
+            print(f"estimated count  {estimated_ms:>8.2f} ms  ({estimated})")
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
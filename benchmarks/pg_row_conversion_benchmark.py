@@ -0,0 +1,72 @@
+"""
+ORM read path (query.all + fetch_records_from_object) against PostgresUtility.find_rows on 100k rows,
+all columns and a three column projection, on SQLite.
+
+Run from the repository root:
+    python -m benchmarks.pg_row_conversion_benchmark
+"""
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, create_engine, func, insert  # noqa: E402
+from sqlalchemy.orm import declarative_base, sessionmaker  # noqa: E402
+
+from scripts.db.psql.row_converter import RowOutput  # noqa: E402
+from scripts.utils.postgres_util import PostgresUtility  # noqa: E402
+
+ROWS = 100_000
+RUNS = 3
+PROJECTION = ["line", "status", "value"]
+
+Base = declarative_base()
+
+
+class LineStatus(Base):
+    __tablename__ = "line_status_benchmark"
+    id = Column(Integer, primary_key=True)
+    line = Column(String)
+    shift = Column(String)
+    status = Column(Integer)
+    value = Column(Float)
+    reason = Column(String)
+    updated_at = Column(DateTime, server_default=func.current_timestamp())
+
+
+def timed(label, call):
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        call()
+    elapsed = (time.perf_counter() - started) / RUNS
+    print(f"{label:<28} {elapsed * 1000:>8.1f} ms  {ROWS / elapsed:>10.0f} rows/s")
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(LineStatus), [
+            {"id": i, "line": f"line_{i % 40}", "shift": "ABC"[i % 3], "status": i % 4, "value": i * 0.5,
+             "reason": None if i % 5 else "changeover"}
+            for i in range(ROWS)
+        ])
+    session = sessionmaker(bind=engine)()
+    utility = PostgresUtility(session, LineStatus)
+
+    def orm_path():
+        records = utility.find_all_data()
+        session.expunge_all()
+        return records
+
+    timed("orm, all columns", orm_path)
+    timed("find_rows dict, all columns", lambda: utility.find_rows())
+    timed("find_rows dict, 3 columns", lambda: utility.find_rows(columns=PROJECTION))
+    timed("find_rows tuple, 3 columns", lambda: utility.find_rows(columns=PROJECTION, output=RowOutput.tuple))
+    timed("find_rows columns, 3 columns", lambda: utility.find_rows(columns=PROJECTION, output=RowOutput.columns))
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
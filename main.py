@@ -9,6 +9,16 @@ from scripts.core.constants.app_constants import Secrets
 from scripts.logging.logging import logger
 from scripts.utils.security_utils.jwt_signature_validator import EncodedPayloadSignatureMiddleware
 from scripts.core.services.defaults import default_router
+from scripts.core.services.monitoring import monitoring_router
+from scripts.db.kairos.tag_index import tag_index
+from scripts.db.kairos.write_buffer import write_buffer
+from scripts.db.psql.async_engine_registry import async_engine_registry
+from scripts.db.psql.engine_registry import engine_registry
+from scripts.utils.kairos_async_util import AsyncKairosSession
+from scripts.utils.kairos_util import KairosSession
+from scripts.utils.mongo_async_util import async_mongo_client
+from scripts.utils.mongo_cache_util import read_cache
+from scripts.utils.mongo_profiler_util import pipeline_profiler
 
 @dataclass
 class FastAPIConfig:
@@ -42,9 +52,23 @@ except Exception as e:
     logger.error(f"Main.py file error : {str(e)}")
 
 app.include_router(default_router)
+app.include_router(monitoring_router)
 app.mount("/assets", StaticFiles(directory=f"{Service.BUILD_DIR}/assets"), name="assets")
 
 
 @app.get("/visualization/healthcheck")
 async def ping():
-    return {"status": 200}
\ No newline at end of file
+    return {"status": 200}
+
+
+@app.on_event("shutdown")
+async def close_connections():
+    tag_index.stop_refresher()
+    read_cache.stop()
+    pipeline_profiler.stop()
+    write_buffer.stop()
+    engine_registry.dispose()
+    await async_engine_registry.dispose()
+    KairosSession.close()
+    await AsyncKairosSession.close()
+    async_mongo_client.close()
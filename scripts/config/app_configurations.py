@@ -103,6 +103,89 @@ class DBConf:
         sys.exit(1)
 
 
+class MongoConf:
+    """
+    Mongo client pool, batching, caching and profiling settings.
+    """
+    max_pool_size = int(config.get("MONGO_DB", "max_pool_size", fallback=None) or 100)
+    min_pool_size = int(config.get("MONGO_DB", "min_pool_size", fallback=None) or 0)
+    max_idle_time_ms = int(config.get("MONGO_DB", "max_idle_time_ms", fallback=None) or 300000)
+    wait_queue_timeout_ms = int(config.get("MONGO_DB", "wait_queue_timeout_ms", fallback=None) or 10000)
+    server_selection_timeout_ms = int(config.get("MONGO_DB", "server_selection_timeout_ms", fallback=None) or 30000)
+    connect_timeout_ms = int(config.get("MONGO_DB", "connect_timeout_ms", fallback=None) or 20000)
+    bulk_chunk_size = int(config.get("MONGO_DB", "bulk_chunk_size", fallback=None) or 1000)
+    soft_delete_batch_size = int(config.get("MONGO_DB", "soft_delete_batch_size", fallback=None) or 5000)
+    count_cache_ttl = int(config.get("MONGO_DB", "count_cache_ttl", fallback=None) or 60)
+    count_cache_size = int(config.get("MONGO_DB", "count_cache_size", fallback=None) or 1024)
+    read_cache_size = int(config.get("MONGO_DB", "read_cache_size", fallback=None) or 512)
+    read_cache_ttl = float(config.get("MONGO_DB", "read_cache_ttl", fallback=None) or 30)
+    read_cache_watch_ttl = float(config.get("MONGO_DB", "read_cache_watch_ttl", fallback=None) or 3600)
+    profile_max_pipelines = int(config.get("MONGO_DB", "profile_max_pipelines", fallback=None) or 500)
+    profile_explain_interval = float(config.get("MONGO_DB", "profile_explain_interval", fallback=None) or 600)
+    pipeline_cache_size = int(config.get("MONGO_DB", "pipeline_cache_size", fallback=None) or 256)
+    pipeline_cache_ttl = float(config.get("MONGO_DB", "pipeline_cache_ttl", fallback=None) or 60)
+    pipeline_cache_bytes = int(config.get("MONGO_DB", "pipeline_cache_bytes", fallback=None) or 64 * 1024 * 1024)
+    stream_batch_size = int(config.get("MONGO_DB", "stream_batch_size", fallback=None) or 1000)
+
+
+class PostgresConf:
+    """
+    Postgres engine and connection pool settings, shared by every per-project engine.
+    """
+    pool_size = int(config.get("POSTGRES", "pool_size", fallback=None) or 5)
+    max_overflow = int(config.get("POSTGRES", "max_overflow", fallback=None) or 10)
+    pool_timeout = float(config.get("POSTGRES", "pool_timeout", fallback=None) or 30)
+    pool_recycle = int(config.get("POSTGRES", "pool_recycle", fallback=None) or 1800)
+    pool_pre_ping = config.get("POSTGRES", "pool_pre_ping", fallback=None) not in {"false", "False"}
+    max_engines = int(config.get("POSTGRES", "max_engines", fallback=None) or 32)
+    copy_min_rows = int(config.get("POSTGRES", "copy_min_rows", fallback=None) or 1000)
+    copy_chunk_rows = int(config.get("POSTGRES", "copy_chunk_rows", fallback=None) or 50000)
+    upsert_chunk_rows = int(config.get("POSTGRES", "upsert_chunk_rows", fallback=None) or 1000)
+    stream_fetch_size = int(config.get("POSTGRES", "stream_fetch_size", fallback=None) or 2000)
+    schema_cache_size = int(config.get("POSTGRES", "schema_cache_size", fallback=None) or 1024)
+
+
+class KairosConf:
+    """
+    KairosDB client settings: connection pool, timeouts, retries and caching.
+    """
+    pool_connections = int(config.get("KAIROS", "pool_connections", fallback=None) or 10)
+    pool_maxsize = int(config.get("KAIROS", "pool_maxsize", fallback=None) or 20)
+    pool_block = config.get("KAIROS", "pool_block", fallback=None) in {"true", "True"}
+    connect_timeout = float(config.get("KAIROS", "connect_timeout", fallback=None) or 5)
+    read_timeout = float(config.get("KAIROS", "read_timeout", fallback=None) or 60)
+    read_retries = int(config.get("KAIROS", "read_retries", fallback=None) or 3)
+    retry_backoff = float(config.get("KAIROS", "retry_backoff", fallback=None) or 0.3)
+    retry_statuses = (502, 503, 504)
+    gzip_requests = config.get("KAIROS", "gzip_requests", fallback=None) not in {"false", "False"}
+    gzip_min_bytes = int(config.get("KAIROS", "gzip_min_bytes", fallback=None) or 1024)
+    tag_index_size = int(config.get("KAIROS", "tag_index_size", fallback=None) or 512)
+    tag_index_ttl = float(config.get("KAIROS", "tag_index_ttl", fallback=None) or 3600)
+    tag_index_refresh = float(config.get("KAIROS", "tag_index_refresh", fallback=None) or 300)
+    tag_index_lookback_days = int(config.get("KAIROS", "tag_index_lookback_days", fallback=None) or 365)
+    tag_index_miss_reload = float(config.get("KAIROS", "tag_index_miss_reload", fallback=None) or 30)
+    fanout_chunk_buckets = int(config.get("KAIROS", "fanout_chunk_buckets", fallback=None) or 720)
+    fanout_workers = int(config.get("KAIROS", "fanout_workers", fallback=None) or 4)
+    batch_max_metrics = int(config.get("KAIROS", "batch_max_metrics", fallback=None) or 50)
+    batch_max_bytes = int(config.get("KAIROS", "batch_max_bytes", fallback=None) or 256 * 1024)
+    cache_size = int(config.get("KAIROS", "cache_size", fallback=None) or 1024)
+    cache_max_bytes = int(config.get("KAIROS", "cache_max_bytes", fallback=None) or 256 * 1024 * 1024)
+    cache_open_ttl = float(config.get("KAIROS", "cache_open_ttl", fallback=None) or 10)
+    cache_recent_ttl = float(config.get("KAIROS", "cache_recent_ttl", fallback=None) or 300)
+    cache_closed_ttl = float(config.get("KAIROS", "cache_closed_ttl", fallback=None) or 24 * 60 * 60)
+    cache_stale_ttl = float(config.get("KAIROS", "cache_stale_ttl", fallback=None) or 60)
+    incremental_size = int(config.get("KAIROS", "incremental_size", fallback=None) or 1024)
+    incremental_ttl = float(config.get("KAIROS", "incremental_ttl", fallback=None) or 6 * 60 * 60)
+    incremental_grace = float(config.get("KAIROS", "incremental_grace", fallback=None) or 60)
+    decode_chunk_bytes = int(config.get("KAIROS", "decode_chunk_bytes", fallback=None) or 256 * 1024)
+    decode_chunk_points = int(config.get("KAIROS", "decode_chunk_points", fallback=None) or 100000)
+    write_max_points = int(config.get("KAIROS", "write_max_points", fallback=None) or 5000)
+    write_max_age = float(config.get("KAIROS", "write_max_age", fallback=None) or 2)
+    write_queue_size = int(config.get("KAIROS", "write_queue_size", fallback=None) or 10000)
+    write_retries = int(config.get("KAIROS", "write_retries", fallback=None) or 5)
+    downsample_max_points = int(config.get("KAIROS", "downsample_max_points", fallback=None) or 1000)
+
+
 class DatabaseConstants:
     metadata_db = config.get("DATABASES", "metadata_db")
     if not bool(metadata_db):
@@ -5,3 +5,12 @@ class DefaultAPI:
     load_styles = "/load_styles"
     load_file = "/load_file"
     load_configuration = "/load_configuration"
+
+
+class MonitoringAPI:
+    prefix = "/monitoring"
+    kairos_cache = "/kairos_cache"
+    kairos_writes = "/kairos_writes"
+    pg_engines = "/pg_engines"
+    mongo_read_cache = "/mongo_read_cache"
+    mongo_pipelines = "/mongo_pipelines"
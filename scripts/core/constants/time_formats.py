@@ -29,6 +29,13 @@ class AppTimeFormats:
         "previous_month",
         "previous_year",
     ]
+    # ranges whose end moves forward with "now" on every refresh
+    open_time_ranges = [
+        "today_so_far",
+        "this_week_so_far",
+        "this_month_so_far",
+        "this_year_so_far",
+    ]
     YEARS = "years"
     MONTHS = "months"
     WEEKS = "weeks"
@@ -0,0 +1,141 @@
+"""
+Reduces time series to the number of points a chart can actually draw.
+
+Either Kairos aggregates into buckets sized from the point budget (plan_sampling), or raw
+columns are decimated here with a shape preserving method (lttb, min_max).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+SECOND_MS = 1000
+MINUTE_MS = 60 * SECOND_MS
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+
+# (value, unit, approximate bucket width) in increasing width, all aligned to calendar boundaries
+SAMPLING_LADDER = [
+    *[(value, "seconds", value * SECOND_MS) for value in (1, 2, 5, 10, 15, 30)],
+    *[(value, "minutes", value * MINUTE_MS) for value in (1, 2, 5, 10, 15, 30)],
+    *[(value, "hours", value * HOUR_MS) for value in (1, 2, 3, 6, 12)],
+    (1, "days", DAY_MS),
+    (1, "weeks", 7 * DAY_MS),
+    (1, "months", 30 * DAY_MS),
+    (1, "years", 365 * DAY_MS),
+]
+
+# Kairos aggregator keeping each kind of series meaningful when several points share a bucket
+AGGREGATOR_BY_KIND = {
+    "gauge": "avg",
+    "counter": "max",
+    "state": "last",
+    "total": "sum",
+}
+
+
+class DownsampleMethod:
+    aggregate = "aggregate"
+    lttb = "lttb"
+    min_max = "min_max"
+
+
+@dataclass
+class SamplingPlan:
+    sampling_value: int
+    sampling_unit: str
+    aggregator: str
+    bucket_ms: int
+
+
+def plan_sampling(start: int, end: int, max_points: int, kind: str = "gauge") -> SamplingPlan:
+    """
+    Picks the narrowest calendar aligned Kairos sampling that keeps start..end within max_points buckets.
+
+    :param kind: gauge, counter, state or total, see AGGREGATOR_BY_KIND
+    """
+    span = max(end - start, 1)
+    for value, unit, bucket_ms in SAMPLING_LADDER:
+        if span / bucket_ms <= max_points:
+            break
+    return SamplingPlan(value, unit, AGGREGATOR_BY_KIND.get(kind, "avg"), bucket_ms)
+
+
+def lttb(timestamps: np.ndarray, values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets.
+    Keeps the first and last point and, per bucket, the point forming the largest triangle with the
+    point kept from the previous bucket and the mean of the next one.
+    Bucket bounds and means are computed for all buckets at once, only the choice of the kept point
+    walks the buckets because it depends on the previous choice.
+
+    :return: Sorted indexes of the points to keep
+    """
+    size = len(timestamps)
+    if max_points >= size or max_points < 3:
+        return np.arange(size)
+    x = timestamps.astype(np.float64)
+    y = values.astype(np.float64)
+    bounds = np.linspace(1, size - 1, max_points - 1).astype(np.int64)
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x[:-1], bounds[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], bounds[:-1]) / counts
+    # the last point closes the final triangle
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        low, high = bounds[bucket], bounds[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[bucket]) * (y[low:high] - ay) - (ax - x[low:high]) * (mean_y[bucket] - ay))
+        previous = low + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def min_max(timestamps: np.ndarray, values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Keeps the minimum and the maximum of every time bucket (max_points // 2 equal width buckets),
+    so spikes survive however long the range is.
+
+    :return: Sorted indexes of the points to keep
+    """
+    size = len(timestamps)
+    buckets = max_points // 2
+    if max_points >= size or buckets < 1:
+        return np.arange(size)
+    span = int(timestamps[-1] - timestamps[0]) + 1
+    bucket_of = (timestamps - timestamps[0]) * buckets // span
+    starts = np.flatnonzero(np.r_[True, bucket_of[1:] != bucket_of[:-1]])
+    lengths = np.diff(np.r_[starts, size])
+    lows = np.repeat(np.minimum.reduceat(values, starts), lengths)
+    highs = np.repeat(np.maximum.reduceat(values, starts), lengths)
+    first_low = _first_per_bucket(np.flatnonzero(values == lows), bucket_of)
+    first_high = _first_per_bucket(np.flatnonzero(values == highs), bucket_of)
+    return np.union1d(first_low, first_high)
+
+
+def _first_per_bucket(indexes: np.ndarray, bucket_of: np.ndarray) -> np.ndarray:
+    _, first = np.unique(bucket_of[indexes], return_index=True)
+    return indexes[first]
+
+
+DECIMATORS = {
+    DownsampleMethod.lttb: lttb,
+    DownsampleMethod.min_max: min_max,
+}
+
+
+def decimate(timestamps: np.ndarray, values: np.ndarray, max_points: int, method: str = DownsampleMethod.lttb):
+    """
+    Drops null (NaN) points and reduces a series to at most max_points points.
+
+    :return: (timestamps, values) of the kept points
+    """
+    present = ~np.isnan(values)
+    if not present.all():
+        timestamps, values = timestamps[present], values[present]
+    keep = DECIMATORS[method](timestamps, values, max_points)
+    return timestamps[keep], values[keep]
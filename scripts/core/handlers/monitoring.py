@@ -0,0 +1,60 @@
+import logging
+
+from scripts.core.schemas.response_models import DefaultResponse, DefaultSuccessResponse
+from scripts.db.kairos.result_cache import result_cache
+from scripts.db.kairos.write_buffer import write_buffer
+from scripts.db.psql.async_engine_registry import async_engine_registry
+from scripts.db.psql.engine_registry import engine_registry
+from scripts.db.psql.schema_cache import schema_cache
+from scripts.utils.mongo_cache_util import read_cache
+from scripts.utils.mongo_profiler_util import pipeline_profiler, pipeline_result_cache
+
+
+class MonitoringHandler:
+
+    @staticmethod
+    def kairos_cache_stats():
+        try:
+            return DefaultSuccessResponse(message="Kairos cache stats fetched successfully", data=result_cache.stats())
+        except Exception as e:
+            logging.exception(e)
+            return DefaultResponse(message="Failed to fetch Kairos cache stats")
+
+    @staticmethod
+    def kairos_write_stats():
+        try:
+            return DefaultSuccessResponse(message="Kairos write buffer stats fetched successfully",
+                                          data=write_buffer.stats())
+        except Exception as e:
+            logging.exception(e)
+            return DefaultResponse(message="Failed to fetch Kairos write buffer stats")
+
+    @staticmethod
+    def pg_engine_stats():
+        try:
+            return DefaultSuccessResponse(message="Postgres engine stats fetched successfully",
+                                          data={"sync": engine_registry.stats(),
+                                                "async": async_engine_registry.stats(),
+                                                "schema_cache": schema_cache.stats()})
+        except Exception as e:
+            logging.exception(e)
+            return DefaultResponse(message="Failed to fetch Postgres engine stats")
+
+    @staticmethod
+    def mongo_read_cache_stats():
+        try:
+            return DefaultSuccessResponse(message="Mongo read cache stats fetched successfully",
+                                          data=read_cache.stats())
+        except Exception as e:
+            logging.exception(e)
+            return DefaultResponse(message="Failed to fetch Mongo read cache stats")
+
+    @staticmethod
+    def mongo_pipeline_report(limit: int, sort_by: str, collscan_only: bool):
+        try:
+            return DefaultSuccessResponse(message="Mongo pipeline report fetched successfully",
+                                          data={"pipelines": pipeline_profiler.report(limit, sort_by, collscan_only),
+                                                "result_cache": pipeline_result_cache.stats()})
+        except Exception as e:
+            logging.exception(e)
+            return DefaultResponse(message="Failed to fetch Mongo pipeline report")
@@ -0,0 +1,48 @@
+from fastapi import APIRouter
+
+from scripts.core.constants.api import MonitoringAPI
+from scripts.core.handlers.monitoring import MonitoringHandler
+
+monitoring_router = APIRouter(prefix=MonitoringAPI.prefix)
+handler = MonitoringHandler
+
+
+@monitoring_router.get(MonitoringAPI.kairos_cache)
+async def kairos_cache_stats():
+    """
+    Hit, miss, stale and byte counters of the Kairos aggregate result cache
+    """
+    return handler.kairos_cache_stats()
+
+
+@monitoring_router.get(MonitoringAPI.kairos_writes)
+async def kairos_write_stats():
+    """
+    Throughput, flush latency and failure counters of the buffered Kairos writer
+    """
+    return handler.kairos_write_stats()
+
+
+@monitoring_router.get(MonitoringAPI.pg_engines)
+async def pg_engine_stats():
+    """
+    Live per-project Postgres engines with their connection pool usage
+    """
+    return handler.pg_engine_stats()
+
+
+@monitoring_router.get(MonitoringAPI.mongo_read_cache)
+async def mongo_read_cache_stats():
+    """
+    Per collection hit and miss counters of the Mongo metadata read cache and the change streams watched
+    """
+    return handler.mongo_read_cache_stats()
+
+
+@monitoring_router.get(MonitoringAPI.mongo_pipelines)
+async def mongo_pipeline_report(limit: int = 20, sort_by: str = "mean_ms", collscan_only: bool = False):
+    """
+    Slowest aggregation pipelines by fingerprint, with their explain summary and COLLSCAN flag
+    (sort_by: mean_ms, max_ms, calls or docs_examined)
+    """
+    return handler.mongo_pipeline_report(limit, sort_by, collscan_only)
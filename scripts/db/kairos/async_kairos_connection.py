@@ -0,0 +1,200 @@
+import asyncio
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.db.kairos.incremental import incremental_aggregator
+from scripts.db.kairos.kairos_queries import KairosQueryBuilder
+from scripts.db.kairos.query_planner import KairosQueryPlanner
+from scripts.db.kairos.result_cache import result_cache
+from scripts.db.kairos.tag_index import tag_index
+from scripts.logging.logging import logger
+from scripts.utils.kairos_async_util import AsyncKairosDBUtility
+
+
+class AsyncKairosConn:
+    """
+    asyncio counterpart of KairosConn for use inside `async def` routes.
+    Every call accepts an optional `deadline` (seconds); exceeding it raises asyncio.TimeoutError and
+    cancelling the awaiting task aborts the in-flight request.
+    """
+
+    def __init__(self):
+        self.kairos_instance = AsyncKairosDBUtility()
+        self.query_planner = KairosQueryPlanner()
+
+    async def find_key(self, metric_name, tag_value, start_date, end_date, deadline: float = None):
+        try:
+            index = tag_index.peek(metric_name)
+            if index is None:
+                index = await self._load_tag_index(metric_name, deadline)
+            tag_key = index.find_key(tag_value)
+            if tag_key is None and tag_index.reload_due(index):
+                # the value may have been written after the index loaded
+                index = await self._reload_tag_index(index, deadline)
+                tag_key = index.find_key(tag_value)
+            if tag_key is not None:
+                return {tag_key: tag_value}
+            if start_date is None or start_date >= index.covers_from:
+                return None
+            # the window reaches back past the index lookback, scan it the old way
+            query = KairosQueryBuilder.metric_query(metric_name, {}, start_date, end_date)
+            response = await self.kairos_instance.read(query_json=query, deadline=deadline)
+            return KairosQueryBuilder.match_tag_key(response.json(), tag_value)
+        except Exception as fetch_error:
+            logger.error(f'Failed to find key: {fetch_error}')
+            raise fetch_error
+
+    async def _load_tag_index(self, metric_name, deadline: float = None):
+        query, covers_from = tag_index.tags_query(metric_name)
+        response = await self.kairos_instance.read_tags(query_json=query, deadline=deadline)
+        response.raise_for_status()
+        index = tag_index.build(metric_name, response.json(), covers_from)
+        tag_index.store(index)
+        return index
+
+    async def _reload_tag_index(self, index, deadline: float = None):
+        """
+        Reload of an index a lookup missed in, shared by the concurrent misses of the metric.
+        A failed reload keeps `index`.
+        """
+        metric_name = index.metric_name
+        current = tag_index.peek(metric_name)
+        if current is not None and current is not index:
+            return current
+        reload = tag_index.async_reloads.get(metric_name)
+        if reload is None:
+            reload = asyncio.ensure_future(self._load_tag_index(metric_name, deadline))
+            tag_index.async_reloads[metric_name] = reload
+
+            def done(task):
+                tag_index.async_reloads.pop(metric_name, None)
+                # retrieved here as well, in case every waiter was cancelled
+                if not task.cancelled():
+                    task.exception()
+
+            reload.add_done_callback(done)
+        try:
+            # a caller cancelled by its deadline leaves the reload to the others
+            return await asyncio.shield(reload)
+        except Exception as e:
+            tag_index.reload_failed(index, e)
+            return index
+
+    async def query_kairosdb(self, metric_name, tags, start_date, end_date, deadline: float = None):
+        try:
+            query = KairosQueryBuilder.metric_query(metric_name, tags, start_date, end_date)
+            response = await self.kairos_instance.read(query_json=query, deadline=deadline)
+            return response.json()
+        except Exception as fetch_error:
+            logger.error(f'Failed to fetch data: {fetch_error}')
+
+    async def aggregate_kairosdb(self, metric, tags, start, end, aggregation_type, sampling_unit,
+                                 sampling_value, tz, deadline: float = None, use_cache: bool = True,
+                                 incremental: bool = False):
+        """
+        :param incremental: Window end follows "now" (AppTimeFormats.open_time_ranges), reuse closed buckets
+        """
+        query = KairosQueryBuilder.aggregate_query(metric, tags, start, end, aggregation_type, sampling_unit,
+                                                   sampling_value, tz)
+
+        async def load():
+            if incremental:
+                return await incremental_aggregator.aevaluate(
+                    query, sampling_unit, sampling_value,
+                    lambda fetch_query: self._execute(fetch_query, sampling_unit, sampling_value, tz, deadline),
+                    tz,
+                )
+            return await self._execute(query, sampling_unit, sampling_value, tz, deadline)
+
+        return await result_cache.aget_or_load(query, load) if use_cache else await load()
+
+    async def aggregate_kairosdb_group_by(self, metric, tags, start, end, aggregation_type, sampling_unit,
+                                          sampling_value, group_by_tag, deadline: float = None,
+                                          use_cache: bool = True):
+        query = KairosQueryBuilder.group_by_query(metric, tags, start, end, aggregation_type, sampling_unit,
+                                                  sampling_value, group_by_tag)
+
+        async def load():
+            logger.info("Hitting to Kairos DataBase with query")
+            logger.info(query)
+            return await self._execute(query, sampling_unit, sampling_value, None, deadline)
+
+        return await result_cache.aget_or_load(query, load) if use_cache else await load()
+
+    async def query_batch(self, specs, start, end, tz=None, deadline: float = None):
+        """
+        Queries many metrics over one window with as few Kairos requests as possible.
+
+        :param specs: List of KairosMetricSpec
+        :return: One Kairos `queries[]` entry per spec, in the order of specs
+        """
+        results = [None] * len(specs)
+        batches = KairosQueryBuilder.batch_queries(specs, start, end, tz)
+        semaphore = asyncio.Semaphore(KairosConf.fanout_workers)
+
+        async def read_batch(indexes, query):
+            async with semaphore:
+                response = await self.kairos_instance.read(query_json=query)
+            KairosQueryBuilder.split_batch_response(response.json(), indexes, results)
+
+        await asyncio.wait_for(asyncio.gather(*[read_batch(indexes, query) for indexes, query in batches]),
+                               timeout=deadline)
+        return results
+
+    async def insert_data(self, metric_json, deadline: float = None):
+        try:
+            response = await self.kairos_instance.write(metric_json=metric_json, deadline=deadline)
+            if response.status_code not in [204, 200]:
+                logger.info("Inserting data  failed")
+                logger.warning(response.text)
+                return False
+            logger.info("data inserted successfully")
+            return True
+        except Exception as e:
+            logger.error("Exception while inserting the data " + str(e))
+            return False
+
+    async def delete_data(self, metric_json, from_time, to_time, deadline: float = None):
+        try:
+            request_data = KairosQueryBuilder.delete_query(metric_json, from_time, to_time)
+            response = await self.kairos_instance.delete(delete_json=request_data, deadline=deadline)
+            if response.status_code not in [204, 200]:
+                logger.info("error in deleting data")
+                logger.warning(response.text)
+                return False
+            logger.info("data deleted successfully")
+            return True
+        except Exception as e:
+            logger.error("Exception While deleting the data " + str(e))
+            return False
+
+    async def _execute(self, query, sampling_unit, sampling_value, tz, deadline):
+        """
+        Async counterpart of KairosQueryPlanner.execute, slices run concurrently on the event loop.
+        """
+        chunks = self.query_planner.plan(query[KairosConstants.start_absolute], query[KairosConstants.end_absolute],
+                                         sampling_unit, sampling_value, tz)
+        if len(chunks) == 1:
+            response = await self.kairos_instance.read(query_json=query, deadline=deadline)
+            return response.json()
+        semaphore = asyncio.Semaphore(KairosConf.fanout_workers)
+
+        async def read_chunk(chunk_start, chunk_end):
+            chunk_query = dict(query)
+            chunk_query[KairosConstants.start_absolute] = chunk_start
+            chunk_query[KairosConstants.end_absolute] = chunk_end
+            async with semaphore:
+                response = await self.kairos_instance.read(query_json=chunk_query)
+                return response.json()
+
+        tasks = [asyncio.ensure_future(read_chunk(chunk_start, chunk_end)) for chunk_start, chunk_end in chunks]
+        try:
+            responses = await asyncio.wait_for(asyncio.gather(*tasks), timeout=deadline)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        for response in responses:
+            if "errors" in response:
+                return response
+        return KairosQueryPlanner.merge(responses)
@@ -0,0 +1,153 @@
+import threading
+from datetime import datetime
+
+import pytz
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.db.kairos.query_planner import SAMPLING_STEPS, KairosQueryPlanner, truncate_to_unit
+from scripts.db.kairos.result_cache import KairosResultCache
+from scripts.utils.cache_util import LRUCache
+
+FIXED_UNIT_MS = {
+    "milliseconds": 1,
+    "seconds": 1000,
+    "minutes": 60 * 1000,
+    "hours": 60 * 60 * 1000,
+}
+
+
+class WindowState:
+    """
+    Closed sampling buckets of one open-ended window, kept in Kairos response shape.
+    """
+
+    def __init__(self, origin: datetime, closed_until: int, response):
+        self.origin = origin
+        self.closed_until = closed_until
+        self.response = response
+
+
+class IncrementalAggregator:
+    """
+    Evaluates aggregations over windows that grow with "now" (today_so_far, this_month_so_far, ...).
+
+    Buckets that ended before the window end (minus a grace period for late datapoints) are kept per
+    (metric, tags, aggregator, window start) and every poll only asks Kairos for the buckets after the
+    last closed one, then merges both parts. Requires `align_sampling`/`align_start_time` queries as
+    built by KairosQueryBuilder.aggregator.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = KairosConf.incremental_size,
+        ttl: float = KairosConf.incremental_ttl,
+        grace_seconds: float = KairosConf.incremental_grace,
+    ):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.grace_ms = int(grace_seconds * 1000)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query) -> str:
+        # the window start stays in the key, only the moving end is dropped
+        return KairosResultCache.key({k: v for k, v in query.items() if k != KairosConstants.end_absolute})
+
+    def prepare(self, query, tz=None):
+        """
+        :return: (key, state or None, query to send to Kairos)
+        """
+        key = self.key(query)
+        state = self.cache.get(key)
+        if state is None or state.closed_until > query[KairosConstants.end_absolute]:
+            return key, None, query
+        delta_query = dict(query)
+        delta_query[KairosConstants.start_absolute] = state.closed_until
+        return key, state, delta_query
+
+    def absorb(self, key, query, state, response, sampling_unit, sampling_value, tz=None):
+        """
+        Merges the freshly fetched buckets with the closed ones and moves newly closed buckets into the state.
+
+        :return: Response for the whole window
+        """
+        if response is None or "errors" in response:
+            return response
+        merged = response if state is None else KairosQueryPlanner.merge([state.response, response])
+        origin = state.origin if state else self.origin(query[KairosConstants.start_absolute], sampling_unit, tz)
+        closed_until = self.closed_until(origin, query[KairosConstants.end_absolute] + 1 - self.grace_ms,
+                                         sampling_unit, sampling_value, tz)
+        if closed_until > query[KairosConstants.start_absolute]:
+            new_state = WindowState(origin, closed_until, self.closed_part(merged, closed_until))
+            with self._lock:
+                current = self.cache.get(key, count=False)
+                if current is None or current.closed_until <= closed_until:
+                    self.cache.set(key, new_state)
+        return merged
+
+    def evaluate(self, query, sampling_unit, sampling_value, loader, tz=None):
+        """
+        :param loader: Callable taking a Kairos query and returning the response JSON
+        """
+        if not self.supports(sampling_unit, sampling_value):
+            return loader(query)
+        key, state, fetch_query = self.prepare(query, tz)
+        return self.absorb(key, query, state, loader(fetch_query), sampling_unit, sampling_value, tz)
+
+    async def aevaluate(self, query, sampling_unit, sampling_value, loader, tz=None):
+        """
+        :param loader: Coroutine function taking a Kairos query and returning the response JSON
+        """
+        if not self.supports(sampling_unit, sampling_value):
+            return await loader(query)
+        key, state, fetch_query = self.prepare(query, tz)
+        return self.absorb(key, query, state, await loader(fetch_query), sampling_unit, sampling_value, tz)
+
+    @staticmethod
+    def supports(sampling_unit, sampling_value):
+        return sampling_unit in SAMPLING_STEPS and bool(sampling_value)
+
+    @staticmethod
+    def origin(start, sampling_unit, tz=None) -> datetime:
+        zone = pytz.timezone(tz or "UTC")
+        local_start = datetime.fromtimestamp(start / 1000, tz=pytz.utc).astimezone(zone).replace(tzinfo=None)
+        return truncate_to_unit(local_start, sampling_unit)
+
+    @staticmethod
+    def closed_until(origin, limit, sampling_unit, sampling_value, tz=None) -> int:
+        """
+        :return: End (exclusive, epoch ms) of the last bucket that ends at or before limit
+        """
+        zone = pytz.timezone(tz or "UTC")
+        origin_ms = int(zone.localize(origin).timestamp() * 1000)
+        if sampling_unit in FIXED_UNIT_MS:
+            bucket_ms = FIXED_UNIT_MS[sampling_unit] * int(sampling_value)
+            return origin_ms + max(0, (limit - origin_ms) // bucket_ms) * bucket_ms
+        # calendar units: walk bucket by bucket, there are only a few per window
+        step = SAMPLING_STEPS[sampling_unit](int(sampling_value))
+        boundary, boundary_ms = origin, origin_ms
+        while True:
+            next_boundary = boundary + step
+            next_ms = int(zone.localize(next_boundary).timestamp() * 1000)
+            if next_ms > limit:
+                return boundary_ms
+            boundary, boundary_ms = next_boundary, next_ms
+
+    @staticmethod
+    def closed_part(response, closed_until):
+        queries = []
+        for query in response[KairosConstants.queries]:
+            results = []
+            for result in query[KairosConstants.results]:
+                values = result.get("values", [])
+                # values are time ordered, cut at the first open bucket
+                cut = len(values)
+                while cut and values[cut - 1][0] >= closed_until:
+                    cut -= 1
+                results.append({**result, "values": values[:cut]})
+            # raw datapoint counts can't be split per bucket, merged responses only count the fresh fetch
+            queries.append({**query, "sample_size": 0, KairosConstants.results: results})
+        return {KairosConstants.queries: queries}
+
+
+incremental_aggregator = IncrementalAggregator()
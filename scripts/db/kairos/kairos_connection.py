@@ -1,36 +1,43 @@
-from scripts.core.constants.app_constants import KairosConstants
+from scripts.config.app_configurations import KairosConf, Timezone
+from scripts.core.engine.downsampling import DownsampleMethod, decimate, plan_sampling
+from scripts.db.kairos.incremental import incremental_aggregator
+from scripts.db.kairos.kairos_queries import KairosQueryBuilder
+from scripts.db.kairos.query_planner import KairosQueryPlanner
+from scripts.db.kairos.response_decoder import KairosResponseDecoder
+from scripts.db.kairos.result_cache import result_cache
+from scripts.db.kairos.tag_index import tag_index
+from scripts.db.kairos.write_buffer import write_buffer
 from scripts.logging.logging import logger
 from scripts.utils.kairos_util import KairosDBUtility
 
 
 class KairosConn:
+    """
+    Synchronous KairosDB connection.
+    Query bodies and response handling are shared with AsyncKairosConn through KairosQueryBuilder,
+    only the transport (pooled requests session) differs.
+    """
+
     def __init__(self):
         self.kairos_instance = KairosDBUtility()
+        self.query_planner = KairosQueryPlanner(self.kairos_instance)
 
     def find_key(self, metric_name, tag_value, start_date, end_date):
         try:
-            query = {
-                KairosConstants.start_absolute: start_date,
-                KairosConstants.end_absolute: end_date,
-                KairosConstants.metrics: [
-                    {
-                        KairosConstants.name: metric_name,
-                        KairosConstants.tags: {}
-                    }
-                ]
-            }
-
+            index = tag_index.get(metric_name)
+            tag_key = index.find_key(tag_value)
+            if tag_key is None:
+                # the value may have been written after the index loaded
+                index = tag_index.reload(index)
+                tag_key = index.find_key(tag_value)
+            if tag_key is not None:
+                return {tag_key: tag_value}
+            if start_date is None or start_date >= index.covers_from:
+                return None
+            # the window reaches back past the index lookback, scan it the old way
+            query = KairosQueryBuilder.metric_query(metric_name, {}, start_date, end_date)
             response_one = self.kairos_instance.read(query_json=query)
-            data = response_one.json()
-            data_one = data[KairosConstants.queries][0][KairosConstants.results][0][KairosConstants.tags]
-            global tag_key
-            for key, value in data_one.items():
-                for i in value:
-                    if i == tag_value:
-                        tag_key = key
-                        tags = {tag_key: tag_value}
-                        return tags
-            return None
+            return KairosQueryBuilder.match_tag_key(response_one.json(), tag_value)
         except Exception as fetch_error:
             logger.error(f'Failed to find key: {fetch_error}')
             raise fetch_error
@@ -38,93 +45,127 @@ class KairosConn:
     # Function to send a query to KairosDB
     def query_kairosdb(self, metric_name, tags, start_date, end_date):
         try:
-            query = {
-                KairosConstants.start_absolute: start_date,
-                KairosConstants.end_absolute: end_date,
-                KairosConstants.metrics: [
-                    {
-                        KairosConstants.name: metric_name,
-                        KairosConstants.tags: tags
-                    }
-                ]
-            }
-
+            query = KairosQueryBuilder.metric_query(metric_name, tags, start_date, end_date)
             response_second = self.kairos_instance.read(query_json=query)
             return response_second.json()
         except Exception as fetch_error:
             logger.error(f'Failed to fetch data: {fetch_error}')
 
+    def query_kairosdb_columnar(self, metric_name, tags, start_date, end_date):
+        """
+        Same query as query_kairosdb, decoded into NumPy arrays instead of nested lists.
+
+        :return: List of KairosSeries (int64 timestamps, float64 values) for the metric
+        """
+        query = KairosQueryBuilder.metric_query(metric_name, tags, start_date, end_date)
+        response = self.kairos_instance.read(query_json=query, stream=True)
+        try:
+            response.raise_for_status()
+            return KairosResponseDecoder().decode(response.iter_content(KairosConf.decode_chunk_bytes))[0]
+        finally:
+            response.close()
+
+    def stream_kairosdb_columnar(self, metric_name, tags, start_date, end_date,
+                                 chunk_points: int = KairosConf.decode_chunk_points):
+        """
+        Yields KairosSeries pieces of about chunk_points points while the response is still being read,
+        so very large raw queries never hold the whole body or result in memory.
+        Consecutive pieces with the same result_index belong to the same result.
+        """
+        query = KairosQueryBuilder.metric_query(metric_name, tags, start_date, end_date)
+        response = self.kairos_instance.read(query_json=query, stream=True)
+        try:
+            response.raise_for_status()
+            decoder = KairosResponseDecoder(chunk_points=chunk_points)
+            yield from decoder.iter_series(response.iter_content(KairosConf.decode_chunk_bytes))
+        finally:
+            response.close()
+
+    def query_kairosdb_downsampled(self, metric_name, tags, start_date, end_date,
+                                   max_points: int = KairosConf.downsample_max_points,
+                                   method: str = DownsampleMethod.aggregate, kind: str = "gauge", tz=None):
+        """
+        query_kairosdb limited to about max_points points per result, typically the chart width in pixels.
+
+        :param method: aggregate lets Kairos bucket the series with a sampling picked from max_points,
+                       lttb and min_max fetch raw points and keep the ones that preserve the shape
+        :param kind: Series kind choosing the Kairos aggregator (gauge, counter, state, total)
+        :param tz: Time zone of the aggregate buckets, Timezone.desired_time_zone by default
+        :return: Kairos response JSON, same shape as query_kairosdb
+        """
+        if method == DownsampleMethod.aggregate:
+            tz = tz or Timezone.desired_time_zone
+            plan = plan_sampling(start_date, end_date, max_points, kind)
+            return self.aggregate_kairosdb(metric_name, tags, start_date, end_date, plan.aggregator,
+                                           plan.sampling_unit, plan.sampling_value, tz)
+        results, sample_size = [], 0
+        for series in self.query_kairosdb_columnar(metric_name, tags, start_date, end_date):
+            sample_size += len(series)
+            timestamps, values = decimate(series.timestamps, series.values, max_points, method)
+            results.append({
+                "name": series.name,
+                "group_by": series.group_by,
+                "tags": series.tags,
+                "values": list(zip(timestamps.tolist(), values.tolist())),
+            })
+        return {"queries": [{"sample_size": sample_size, "results": results}]}
+
     # sample aggregator function # query can be updated as per requirement
     def aggregate_kairosdb(self, metric, tags, start, end, aggregation_type, sampling_unit,
-                           sampling_value, tz):
-        query = {
-            KairosConstants.start_absolute: start,
-            KairosConstants.end_absolute: end,
-            KairosConstants.metrics: [
-                {
-                    KairosConstants.name: metric,
-                    KairosConstants.tags: tags,
-                    KairosConstants.aggregators: [
-                        {
-                            KairosConstants.name: aggregation_type,
-                            'sampling': {
-                                'value': sampling_value,
-                                'unit': sampling_unit
-                            },
-                            "align_sampling": True,
-                            "align_start_time": True
-                        }
-                    ]
-                }
-            ],
-            KairosConstants.plugins: [],
-            KairosConstants.cache_time: 0,
-            KairosConstants.time_zone: tz,
-        }
-
-        response = self.kairos_instance.read(query_json=query)
-        return response.json()
+                           sampling_value, tz, use_cache: bool = True, incremental: bool = False):
+        """
+        :param incremental: Window end follows "now" (AppTimeFormats.open_time_ranges), reuse closed buckets
+        """
+        query = KairosQueryBuilder.aggregate_query(metric, tags, start, end, aggregation_type, sampling_unit,
+                                                   sampling_value, tz)
+
+        def load():
+            if incremental:
+                return incremental_aggregator.evaluate(
+                    query, sampling_unit, sampling_value,
+                    lambda fetch_query: self.query_planner.execute(fetch_query, sampling_unit, sampling_value, tz),
+                    tz,
+                )
+            return self.query_planner.execute(query, sampling_unit, sampling_value, tz)
+
+        return result_cache.get_or_load(query, load) if use_cache else load()
 
     # sample aggregator group by function # query can be updated as per requirement
     def aggregate_kairosdb_group_by(self, metric, tags, start, end, aggregation_type, sampling_unit,
-                                    sampling_value, group_by_tag):
-        query = {
-            KairosConstants.start_absolute: start,
-            KairosConstants.end_absolute: end,
-            KairosConstants.metrics: [
-                {
-                    KairosConstants.name: metric,
-                    KairosConstants.tags: tags,
-                    KairosConstants.group_by: [
-                        {
-                            KairosConstants.name: "tag",
-                            KairosConstants.tags: [
-                                group_by_tag
-                            ]
-                        }
-                    ],
-                    KairosConstants.aggregators: [
-                        {
-                            KairosConstants.name: aggregation_type,
-                            'sampling': {
-                                'value': sampling_value,
-                                'unit': sampling_unit
-                            },
-                            "align_sampling": True,
-                            "align_start_time": True
-                        }
-                    ]
-                }
-            ],
-            KairosConstants.plugins: [],
-            KairosConstants.cache_time: 0
-        }
-        logger.info("Hitting to Kairos DataBase with query")
-        logger.info(query)
-        response = self.kairos_instance.read(query_json=query)
-        return response.json()
-
-    def insert_data(self, metric_json):
+                                    sampling_value, group_by_tag, use_cache: bool = True):
+        query = KairosQueryBuilder.group_by_query(metric, tags, start, end, aggregation_type, sampling_unit,
+                                                  sampling_value, group_by_tag)
+
+        def load():
+            logger.info("Hitting to Kairos DataBase with query")
+            logger.info(query)
+            return self.query_planner.execute(query, sampling_unit, sampling_value)
+
+        return result_cache.get_or_load(query, load) if use_cache else load()
+
+    def query_batch(self, specs, start, end, tz=None):
+        """
+        Queries many metrics over one window with as few Kairos requests as possible.
+
+        :param specs: List of KairosMetricSpec
+        :return: One Kairos `queries[]` entry per spec, in the order of specs
+        """
+        results = [None] * len(specs)
+        batches = KairosQueryBuilder.batch_queries(specs, start, end, tz)
+        executor = KairosQueryPlanner.executor(KairosConf.fanout_workers)
+        futures = [(indexes, executor.submit(self.kairos_instance.read, query_json=query))
+                   for indexes, query in batches]
+        for indexes, future in futures:
+            KairosQueryBuilder.split_batch_response(future.result().json(), indexes, results)
+        return results
+
+    def insert_data(self, metric_json, buffered: bool = False):
+        """
+        :param buffered: Hand the datapoints to the background write buffer instead of posting them now.
+                         Returns once they are queued, failures are reported by write_buffer.stats()
+        """
+        if buffered:
+            return write_buffer.put(metric_json)
         try:
             response = self.kairos_instance.write(metric_json=metric_json)
             if response.status_code not in [204, 200]:
@@ -141,12 +182,7 @@ class KairosConn:
 
     def delete_data(self, metric_json, from_time, to_time):
         try:
-            request_data = {
-                KairosConstants.metrics: metric_json,
-                KairosConstants.cache_time: 0,
-                KairosConstants.start_absolute: from_time,
-                KairosConstants.end_absolute: to_time
-            }
+            request_data = KairosQueryBuilder.delete_query(metric_json, from_time, to_time)
             response = self.kairos_instance.delete(delete_json=request_data)
             if response.status_code not in [204, 200]:
                 logger.info("error in deleting data")
@@ -159,4 +195,3 @@ class KairosConn:
             logger.error("Exception While deleting the data " + str(
                 e))
             return False
-
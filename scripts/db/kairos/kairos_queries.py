@@ -0,0 +1,181 @@
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+
+
+@dataclass
+class KairosMetricSpec:
+    """
+    One metric of a batched Kairos query.
+    Leave aggregation_type empty for raw datapoints.
+    """
+    metric: str
+    tags: dict = field(default_factory=dict)
+    aggregation_type: Optional[str] = None
+    sampling_unit: Optional[str] = None
+    sampling_value: Optional[int] = None
+    group_by_tag: Optional[str] = None
+
+
+class KairosQueryBuilder:
+    """
+    Builds the KairosDB query bodies shared by the sync and async connections.
+    """
+
+    @staticmethod
+    def metric_query(metric_name, tags, start_date, end_date):
+        return {
+            KairosConstants.start_absolute: start_date,
+            KairosConstants.end_absolute: end_date,
+            KairosConstants.metrics: [
+                {
+                    KairosConstants.name: metric_name,
+                    KairosConstants.tags: tags
+                }
+            ]
+        }
+
+    @staticmethod
+    def aggregator(aggregation_type, sampling_unit, sampling_value):
+        return {
+            KairosConstants.name: aggregation_type,
+            'sampling': {
+                'value': sampling_value,
+                'unit': sampling_unit
+            },
+            "align_sampling": True,
+            "align_start_time": True
+        }
+
+    @classmethod
+    def aggregate_query(cls, metric, tags, start, end, aggregation_type, sampling_unit, sampling_value, tz):
+        query = {
+            KairosConstants.start_absolute: start,
+            KairosConstants.end_absolute: end,
+            KairosConstants.metrics: [
+                {
+                    KairosConstants.name: metric,
+                    KairosConstants.tags: tags,
+                    KairosConstants.aggregators: [
+                        cls.aggregator(aggregation_type, sampling_unit, sampling_value)
+                    ]
+                }
+            ],
+            KairosConstants.plugins: [],
+            KairosConstants.cache_time: 0,
+        }
+        # Kairos rejects a null time_zone, leave it out to use the server's
+        if tz:
+            query[KairosConstants.time_zone] = tz
+        return query
+
+    @classmethod
+    def group_by_query(cls, metric, tags, start, end, aggregation_type, sampling_unit, sampling_value,
+                       group_by_tag):
+        return {
+            KairosConstants.start_absolute: start,
+            KairosConstants.end_absolute: end,
+            KairosConstants.metrics: [
+                {
+                    KairosConstants.name: metric,
+                    KairosConstants.tags: tags,
+                    KairosConstants.group_by: [
+                        {
+                            KairosConstants.name: "tag",
+                            KairosConstants.tags: [
+                                group_by_tag
+                            ]
+                        }
+                    ],
+                    KairosConstants.aggregators: [
+                        cls.aggregator(aggregation_type, sampling_unit, sampling_value)
+                    ]
+                }
+            ],
+            KairosConstants.plugins: [],
+            KairosConstants.cache_time: 0
+        }
+
+    @classmethod
+    def metric_entry(cls, spec: KairosMetricSpec):
+        entry = {
+            KairosConstants.name: spec.metric,
+            KairosConstants.tags: spec.tags or {},
+        }
+        if spec.group_by_tag:
+            entry[KairosConstants.group_by] = [{KairosConstants.name: "tag", KairosConstants.tags: [spec.group_by_tag]}]
+        if spec.aggregation_type:
+            entry[KairosConstants.aggregators] = [
+                cls.aggregator(spec.aggregation_type, spec.sampling_unit, spec.sampling_value)
+            ]
+        return entry
+
+    @classmethod
+    def batch_queries(cls, specs, start, end, tz=None, max_metrics: int = KairosConf.batch_max_metrics,
+                      max_bytes: int = KairosConf.batch_max_bytes):
+        """
+        Packs metric specs into as few Kairos queries as the metric count and body size limits allow.
+
+        :return: List of (spec indexes, query) in the order the specs were given
+        """
+        header = {
+            KairosConstants.start_absolute: start,
+            KairosConstants.end_absolute: end,
+            KairosConstants.plugins: [],
+            KairosConstants.cache_time: 0,
+        }
+        if tz:
+            header[KairosConstants.time_zone] = tz
+        header_bytes = len(json.dumps(header)) + len(f', "{KairosConstants.metrics}": []')
+        batches = []
+        indexes, entries, size = [], [], header_bytes
+        for index, spec in enumerate(specs):
+            entry = cls.metric_entry(spec)
+            entry_bytes = len(json.dumps(entry)) + 2
+            if entries and (len(entries) >= max_metrics or size + entry_bytes > max_bytes):
+                batches.append((indexes, {**header, KairosConstants.metrics: entries}))
+                indexes, entries, size = [], [], header_bytes
+            indexes.append(index)
+            entries.append(entry)
+            size += entry_bytes
+        if entries:
+            batches.append((indexes, {**header, KairosConstants.metrics: entries}))
+        return batches
+
+    @staticmethod
+    def split_batch_response(data, indexes, results: list):
+        """
+        Demultiplexes a batched Kairos response into results, one `queries[]` entry per spec index.
+        Kairos answers the metrics of a query in order, so queries[n] belongs to the n-th packed spec.
+        """
+        if "errors" in data:
+            for index in indexes:
+                results[index] = {"errors": data["errors"]}
+            return
+        for index, query in zip(indexes, data[KairosConstants.queries]):
+            results[index] = query
+
+    @staticmethod
+    def delete_query(metric_json, from_time, to_time):
+        return {
+            KairosConstants.metrics: metric_json,
+            KairosConstants.cache_time: 0,
+            KairosConstants.start_absolute: from_time,
+            KairosConstants.end_absolute: to_time
+        }
+
+    @staticmethod
+    def match_tag_key(data, tag_value):
+        """
+        Finds the tag key holding tag_value in a Kairos query response.
+
+        :return: {tag_key: tag_value} or None
+        """
+        tag_map = data[KairosConstants.queries][0][KairosConstants.results][0][KairosConstants.tags]
+        for key, values in tag_map.items():
+            if tag_value in values:
+                return {key: tag_value}
+        return None
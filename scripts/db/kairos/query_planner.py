@@ -0,0 +1,186 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytz
+from dateutil.relativedelta import relativedelta
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.logging.logging import logger
+from scripts.utils.kairos_util import KairosDBUtility
+
+SAMPLING_STEPS = {
+    "milliseconds": lambda n: relativedelta(microseconds=1000 * n),
+    "seconds": lambda n: relativedelta(seconds=n),
+    "minutes": lambda n: relativedelta(minutes=n),
+    "hours": lambda n: relativedelta(hours=n),
+    "days": lambda n: relativedelta(days=n),
+    "weeks": lambda n: relativedelta(weeks=n),
+    "months": lambda n: relativedelta(months=n),
+    "years": lambda n: relativedelta(years=n),
+}
+
+
+def truncate_to_unit(local_time: datetime, unit: str) -> datetime:
+    """
+    Truncates a naive local time to the start of its sampling unit, the same way Kairos aligns
+    aggregation ranges when `align_sampling` is set.
+    """
+    if unit == "milliseconds":
+        return local_time.replace(microsecond=local_time.microsecond // 1000 * 1000)
+    local_time = local_time.replace(microsecond=0)
+    if unit == "seconds":
+        return local_time
+    local_time = local_time.replace(second=0)
+    if unit == "minutes":
+        return local_time
+    local_time = local_time.replace(minute=0)
+    if unit == "hours":
+        return local_time
+    local_time = local_time.replace(hour=0)
+    if unit == "days":
+        return local_time
+    if unit == "weeks":
+        return local_time - relativedelta(days=local_time.weekday())
+    local_time = local_time.replace(day=1)
+    if unit == "months":
+        return local_time
+    return local_time.replace(month=1)
+
+
+class KairosQueryPlanner:
+    """
+    Splits long aggregation queries into sampling-aligned time slices, runs them concurrently
+    and merges the per-slice responses back into a single Kairos response.
+
+    Interior slice boundaries always fall on a sampling bucket boundary, so no bucket is split
+    across two slices. Every slice ends one millisecond before the next one starts, keeping the
+    inclusive-boundary convention of `time_calculator.get_time_range` (`to_time - 1`).
+    """
+
+    # max_workers -> pool shared by every planner of that size
+    _executors = {}
+    _executor_lock = threading.Lock()
+
+    def __init__(
+        self,
+        kairos_instance: KairosDBUtility = None,
+        chunk_buckets: int = KairosConf.fanout_chunk_buckets,
+        max_workers: int = KairosConf.fanout_workers,
+    ):
+        self._kairos_instance = kairos_instance
+        self.chunk_buckets = chunk_buckets
+        self.max_workers = max_workers
+
+    @property
+    def kairos_instance(self) -> KairosDBUtility:
+        if self._kairos_instance is None:
+            self._kairos_instance = KairosDBUtility()
+        return self._kairos_instance
+
+    @classmethod
+    def executor(cls, max_workers) -> ThreadPoolExecutor:
+        # one pool per size and process bounds the total fan-out load put on Kairos
+        executor = cls._executors.get(max_workers)
+        if executor is None:
+            with cls._executor_lock:
+                executor = cls._executors.get(max_workers)
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kairos-fanout")
+                    cls._executors[max_workers] = executor
+        return executor
+
+    def plan(self, start, end, sampling_unit, sampling_value, tz=None):
+        """
+        :return: List of inclusive (start, end) epoch millisecond pairs covering start..end
+        """
+        if sampling_unit not in SAMPLING_STEPS or not sampling_value or self.chunk_buckets <= 0:
+            return [(start, end)]
+        zone = pytz.timezone(tz or "UTC")
+        local_start = datetime.fromtimestamp(start / 1000, tz=pytz.utc).astimezone(zone).replace(tzinfo=None)
+        boundary = truncate_to_unit(local_start, sampling_unit)
+        step = SAMPLING_STEPS[sampling_unit](int(sampling_value) * self.chunk_buckets)
+        chunks = []
+        chunk_start = start
+        while True:
+            boundary = boundary + step
+            boundary_ms = int(zone.localize(boundary).timestamp() * 1000)
+            if boundary_ms > end:
+                break
+            chunks.append((chunk_start, boundary_ms - 1))
+            chunk_start = boundary_ms
+        chunks.append((chunk_start, end))
+        return chunks
+
+    def execute(self, query, sampling_unit, sampling_value, tz=None):
+        """
+        Runs a Kairos query, fanning it out over time slices when the window spans more than one chunk.
+
+        :return: Kairos response JSON
+        """
+        chunks = self.plan(query[KairosConstants.start_absolute], query[KairosConstants.end_absolute],
+                           sampling_unit, sampling_value, tz)
+        if len(chunks) == 1:
+            return self.kairos_instance.read(query_json=query).json()
+        logger.debug(f"Fanning out Kairos query over {len(chunks)} slices")
+        executor = self.executor(self.max_workers)
+        futures = [executor.submit(self._read_chunk, query, chunk_start, chunk_end)
+                   for chunk_start, chunk_end in chunks]
+        try:
+            responses = [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+        for response in responses:
+            if "errors" in response:
+                return response
+        return self.merge(responses)
+
+    def _read_chunk(self, query, chunk_start, chunk_end):
+        chunk_query = dict(query)
+        chunk_query[KairosConstants.start_absolute] = chunk_start
+        chunk_query[KairosConstants.end_absolute] = chunk_end
+        return self.kairos_instance.read(query_json=chunk_query).json()
+
+    @staticmethod
+    def merge(responses):
+        """
+        Merges time-sliced Kairos responses, given in time order, into one response.
+        Results are matched across slices on metric name and group_by.
+        """
+        merged_queries = []
+        for query_index in range(len(responses[0][KairosConstants.queries])):
+            groups = {}
+            sample_size = 0
+            for response in responses:
+                query = response[KairosConstants.queries][query_index]
+                sample_size += query.get("sample_size", 0)
+                for result in query[KairosConstants.results]:
+                    key = (result.get(KairosConstants.name), json.dumps(result.get(KairosConstants.group_by),
+                                                                         sort_keys=True))
+                    merged = groups.get(key)
+                    if merged is None:
+                        groups[key] = {
+                            **result,
+                            KairosConstants.tags: {k: list(v) for k, v in result.get(KairosConstants.tags, {}).items()},
+                            "values": list(result.get("values", [])),
+                        }
+                        continue
+                    for tag, values in result.get(KairosConstants.tags, {}).items():
+                        known = merged[KairosConstants.tags].setdefault(tag, [])
+                        known.extend(value for value in values if value not in known)
+                    values = result.get("values", [])
+                    merged_values = merged["values"]
+                    # a bucket reported by both neighbouring slices is kept from the later one
+                    while values and merged_values and merged_values[-1][0] >= values[0][0]:
+                        merged_values.pop()
+                    merged_values.extend(values)
+            results = list(groups.values())
+            named_with_data = {result.get(KairosConstants.name) for result in results if result["values"]}
+            results = [result for result in results
+                       if result["values"] or result.get(KairosConstants.name) not in named_with_data]
+            merged_queries.append({"sample_size": sample_size, KairosConstants.results: results})
+        return {KairosConstants.queries: merged_queries}
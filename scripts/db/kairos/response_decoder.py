@@ -0,0 +1,259 @@
+import codecs
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.errors import KairosDBError
+
+VALUES_KEY = re.compile(r'"values"\s*:\s*\[')
+VALUES_END = re.compile(r'\]\s*\]')
+BRACKETS = {ord("["): None, ord("]"): None}
+# longest text that can hold the start of a split `"values" : [` marker
+MARKER_TAIL = 32
+
+
+@dataclass
+class KairosSeries:
+    """
+    One result group of a Kairos response as typed columns.
+    In streaming mode a result may arrive as several pieces sharing query_index and result_index.
+    """
+    query_index: int
+    result_index: int
+    name: str
+    tags: dict = field(default_factory=dict)
+    group_by: list = field(default_factory=list)
+    timestamps: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    values: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def scan_values(text: str):
+    """
+    String aware scan of values array text, starting between two datapoints.
+
+    :return: (end of the last complete datapoint, index of the `]` closing the array or None if not reached yet)
+    """
+    depth, in_string, escaped, cut = 0, False, False, 0
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            if depth == 0:
+                return cut, index
+            depth -= 1
+            if depth == 0:
+                cut = index + 1
+    return cut, None
+
+
+def pairs_text(text: str) -> str:
+    return text.strip().lstrip(",").lstrip()
+
+
+def parse_pairs(segment: str):
+    """
+    Parses `[ts,value],[ts,value],...` text into int64 timestamps and float64 values.
+    Non numeric values (null, strings) become NaN.
+    """
+    if '"' in segment or "null" in segment:
+        pairs = json.loads("[" + segment + "]")
+        timestamps = np.fromiter((pair[0] for pair in pairs), dtype=np.int64, count=len(pairs))
+        values = np.fromiter(
+            (pair[1] if isinstance(pair[1], (int, float)) else np.nan for pair in pairs),
+            dtype=np.float64, count=len(pairs),
+        )
+        return timestamps, values
+    flat = np.fromstring(segment.translate(BRACKETS), dtype=np.float64, sep=",")
+    return flat[0::2].astype(np.int64), flat[1::2].copy()
+
+
+class KairosResponseDecoder:
+    """
+    Incremental decoder of Kairos query responses into NumPy columns.
+
+    Only the small skeleton of the response (query objects, names, tags, group_by) goes through
+    `json`; the `values` arrays are cut out of the byte stream as they arrive and parsed in bulk
+    straight into int64/float64 arrays, so no per-datapoint Python objects are created.
+    Kairos writes `values` as the last member of every result object, which the decoder relies on.
+
+    :param chunk_points: Yield results in pieces of about this many points instead of whole results
+    """
+
+    def __init__(self, chunk_points: int = None):
+        self.chunk_points = chunk_points
+
+    def decode(self, chunks: Iterable[bytes]) -> List[List[KairosSeries]]:
+        """
+        :return: Series per query, in the order of the query's metrics
+        """
+        queries = []
+        for series in self.iter_series(chunks):
+            while len(queries) <= series.query_index:
+                queries.append([])
+            queries[series.query_index].append(series)
+        return queries
+
+    def iter_series(self, chunks: Iterable[bytes]) -> Iterator[KairosSeries]:
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        state = _SkeletonState()
+        buffer = ""
+        current = None
+        for raw in chunks:
+            buffer += text_decoder.decode(raw)
+            while True:
+                if current is None:
+                    match = VALUES_KEY.search(buffer)
+                    if match is None:
+                        if len(buffer) > MARKER_TAIL:
+                            state.feed(buffer[:-MARKER_TAIL])
+                            buffer = buffer[-MARKER_TAIL:]
+                        break
+                    state.feed(buffer[:match.start()])
+                    if not state.at_result_member():
+                        # a tag named values, or text inside a string, not the datapoints of a result
+                        state.feed(buffer[match.start():match.end()])
+                        buffer = buffer[match.end():]
+                        continue
+                    current = _PendingSeries(state.current_result())
+                    buffer = buffer[match.end():]
+                    continue
+                if '"' in buffer:
+                    # string datapoints may hold brackets, only a string aware scan finds the ends
+                    cut, end = scan_values(buffer)
+                    if end is None:
+                        if cut:
+                            current.add(pairs_text(buffer[:cut]))
+                            buffer = buffer[cut:]
+                        if self.chunk_points and current.points >= self.chunk_points:
+                            yield current.flush()
+                        break
+                    if pairs_text(buffer[:end]):
+                        current.add(pairs_text(buffer[:end]))
+                    buffer = buffer[end + 1:]
+                else:
+                    stripped = buffer.lstrip()
+                    match = VALUES_END.search(buffer)
+                    if stripped.startswith("]"):
+                        buffer = stripped[1:]
+                    elif match is not None:
+                        current.add(pairs_text(buffer[:match.start() + 1]))
+                        buffer = buffer[match.end():]
+                    else:
+                        cut = buffer.rfind("],")
+                        if cut != -1:
+                            current.add(pairs_text(buffer[:cut + 1]))
+                            buffer = buffer[cut + 2:]
+                        if self.chunk_points and current.points >= self.chunk_points:
+                            yield current.flush()
+                        break
+                state.feed('"values":[]')
+                yield current.flush()
+                current = None
+        state.feed(buffer + text_decoder.decode(b"", final=True))
+        state.raise_on_errors()
+
+
+class _PendingSeries:
+    def __init__(self, meta):
+        self.meta = meta
+        self.timestamps = []
+        self.values = []
+        self.points = 0
+
+    def add(self, segment):
+        timestamps, values = parse_pairs(segment)
+        self.timestamps.append(timestamps)
+        self.values.append(values)
+        self.points += len(timestamps)
+
+    def flush(self) -> KairosSeries:
+        series = KairosSeries(
+            query_index=self.meta["query_index"],
+            result_index=self.meta["result_index"],
+            name=self.meta.get(KairosConstants.name),
+            tags=self.meta.get(KairosConstants.tags, {}),
+            group_by=self.meta.get(KairosConstants.group_by, []),
+            timestamps=np.concatenate(self.timestamps) if self.timestamps else np.empty(0, dtype=np.int64),
+            values=np.concatenate(self.values) if self.values else np.empty(0, dtype=np.float64),
+        )
+        self.timestamps, self.values, self.points = [], [], 0
+        return series
+
+
+class _SkeletonState:
+    """
+    Tracks the JSON structure of everything outside the values arrays.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.query_index = -1
+        self.result_index = -1
+
+    def feed(self, text):
+        for offset, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.stack.append((char, len(self.text) + offset))
+                # root { -> queries [ -> query { -> results [ -> result {
+                if char == "{" and len(self.stack) == 3:
+                    self.query_index += 1
+                    self.result_index = -1
+                elif char == "{" and len(self.stack) == 5:
+                    self.result_index += 1
+            elif char in "}]":
+                self.stack.pop()
+        self.text += text
+
+    def at_result_member(self) -> bool:
+        """
+        True between the members of a result object, where its `"values"` key can start.
+        """
+        return not self.in_string and len(self.stack) == 5 and self.stack[-1][0] == "{"
+
+    def current_result(self) -> dict:
+        object_text = self.text[self.stack[-1][1]:].rstrip()
+        if object_text.endswith(","):
+            object_text = object_text[:-1]
+        meta = json.loads(object_text + "}")
+        meta["query_index"] = self.query_index
+        meta["result_index"] = self.result_index
+        return meta
+
+    def raise_on_errors(self):
+        skeleton = self.text.strip()
+        if not skeleton:
+            return
+        try:
+            body = json.loads(skeleton)
+        except ValueError:
+            return
+        if isinstance(body, dict) and "errors" in body:
+            raise KairosDBError("; ".join(map(str, body["errors"])))
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+
+
+class CachedResult:
+    def __init__(self, value, fresh_for: float):
+        self.value = value
+        self.fresh_until = time.monotonic() + fresh_for
+        self.nbytes = estimate_size(value)
+
+    @property
+    def is_fresh(self):
+        return time.monotonic() < self.fresh_until
+
+
+def estimate_size(value) -> int:
+    """
+    Rough in-memory size of a Kairos response, counted per datapoint instead of walking every object.
+    """
+    size = 256
+    for query in value.get(KairosConstants.queries, []):
+        for result in query.get(KairosConstants.results, []):
+            size += 256 + 72 * len(result.get("values", []))
+    return size
+
+
+class KairosResultCache:
+    """
+    In-process cache of Kairos aggregate responses keyed on the normalized query JSON.
+
+    Entries for windows that end in the past are kept long, windows still open at "now" only briefly.
+    An entry past its fresh TTL is still served for `stale_ttl` seconds while a background refresh
+    runs, and concurrent misses on the same query share a single Kairos request.
+    Cached responses are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = KairosConf.cache_size,
+        maxbytes: int = KairosConf.cache_max_bytes,
+        open_ttl: float = KairosConf.cache_open_ttl,
+        recent_ttl: float = KairosConf.cache_recent_ttl,
+        closed_ttl: float = KairosConf.cache_closed_ttl,
+        stale_ttl: float = KairosConf.cache_stale_ttl,
+    ):
+        self.cache = LRUCache(maxsize=maxsize, maxbytes=maxbytes, sizeof=lambda entry: entry.nbytes)
+        self.open_ttl = open_ttl
+        self.recent_ttl = recent_ttl
+        self.closed_ttl = closed_ttl
+        self.stale_ttl = stale_ttl
+        self._inflight = {}
+        self._async_inflight = {}
+        # background refreshes, referenced until done so they are not garbage collected mid-refresh
+        self._refresh_tasks = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kairos-cache-refresh")
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @staticmethod
+    def key(query) -> str:
+        return json.dumps(query, sort_keys=True, separators=(",", ":"), default=str)
+
+    def ttl_for(self, query) -> float:
+        now_ms = time.time() * 1000
+        end = query.get(KairosConstants.end_absolute)
+        if end is None or end >= now_ms - self.open_ttl * 1000:
+            return self.open_ttl
+        if end >= now_ms - 24 * 60 * 60 * 1000:
+            # closed, but recent enough for late datapoints to still arrive
+            return self.recent_ttl
+        return self.closed_ttl
+
+    def get_or_load(self, query, loader):
+        """
+        :param query: Kairos query JSON
+        :param loader: Callable running the query and returning the response JSON
+        """
+        key = self.key(query)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if not entry.is_fresh:
+                self.stale_hits += 1
+                self._refresh(key, query, loader)
+            return entry.value
+        return self._load(key, query, loader)
+
+    async def aget_or_load(self, query, loader):
+        """
+        asyncio variant of get_or_load.
+
+        :param loader: Zero argument coroutine function running the query and returning the response JSON
+        """
+        key = self.key(query)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if not entry.is_fresh:
+                self.stale_hits += 1
+                if key not in self._async_inflight:
+                    task = asyncio.ensure_future(self._aload(key, query, loader, refresh=True))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+            return entry.value
+        return await self._aload(key, query, loader)
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "stale_hits": self.stale_hits,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+    def clear(self):
+        self.cache.clear()
+
+    def _store(self, key, query, value):
+        if value is None or "errors" in value:
+            return
+        self.cache.set(key, CachedResult(value, self.ttl_for(query)), ttl=self.ttl_for(query) + self.stale_ttl)
+
+    def _load(self, key, query, loader):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            value = loader()
+            self._store(key, query, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh(self, key, query, loader):
+        with self._lock:
+            if key in self._inflight:
+                return
+
+        def refresh():
+            try:
+                self._load(key, query, loader)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"Background refresh of Kairos query failed: {e}")
+
+        self._refresher.submit(refresh)
+
+    async def _aload(self, key, query, loader, refresh=False):
+        future = self._async_inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+            self._store(key, query, value)
+            future.set_result(value)
+            if refresh:
+                self.refreshes += 1
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # waiters re-raise it themselves, mark it retrieved for the loop's unhandled-error check
+            future.exception()
+            if refresh:
+                self.refresh_failures += 1
+                logger.warning(f"Background refresh of Kairos query failed: {e}")
+                return None
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+
+result_cache = KairosResultCache()
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+from scripts.utils.kairos_util import KairosDBUtility
+
+
+class MetricTagIndex:
+    """
+    Tag metadata of one metric: tag key -> values, and the reverse tag value -> tag key map.
+    """
+
+    def __init__(self, metric_name, tag_map: dict, covers_from: int):
+        self.metric_name = metric_name
+        self.tag_map = tag_map
+        self.covers_from = covers_from
+        self.last_used = self.loaded_at = time.monotonic()
+        self.key_by_value = {}
+        for key, values in tag_map.items():
+            for value in values:
+                # first key wins, same as iterating the tag map in KairosConn.find_key
+                self.key_by_value.setdefault(value, key)
+
+    def find_key(self, tag_value):
+        self.last_used = time.monotonic()
+        return self.key_by_value.get(tag_value)
+
+
+class KairosTagIndex:
+    """
+    Process wide metric -> tag-key -> values index loaded from Kairos's tag metadata endpoint.
+
+    Indexes are kept in a bounded TTL cache and refreshed in the background for as long as
+    they stay in the cache, so find_key lookups never have to query datapoints. A lookup that misses
+    reloads the index, at most once every `miss_reload` seconds, so a tag value first written after
+    the load is found before the next refresh.
+    """
+
+    def __init__(
+        self,
+        kairos_instance: KairosDBUtility = None,
+        maxsize: int = KairosConf.tag_index_size,
+        ttl: float = KairosConf.tag_index_ttl,
+        refresh_interval: float = KairosConf.tag_index_refresh,
+        lookback_days: int = KairosConf.tag_index_lookback_days,
+        miss_reload: float = KairosConf.tag_index_miss_reload,
+    ):
+        self._kairos_instance = kairos_instance
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.refresh_interval = refresh_interval
+        self.lookback_ms = lookback_days * 24 * 60 * 60 * 1000
+        self.miss_reload = miss_reload
+        # metric -> in flight asyncio reload shared by AsyncKairosConn lookups
+        self.async_reloads = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+
+    @property
+    def kairos_instance(self) -> KairosDBUtility:
+        if self._kairos_instance is None:
+            self._kairos_instance = KairosDBUtility()
+        return self._kairos_instance
+
+    def tags_query(self, metric_name):
+        covers_from = int(time.time() * 1000) - self.lookback_ms
+        query = {
+            KairosConstants.start_absolute: covers_from,
+            KairosConstants.metrics: [{KairosConstants.name: metric_name, KairosConstants.tags: {}}],
+        }
+        return query, covers_from
+
+    @staticmethod
+    def build(metric_name, data, covers_from) -> MetricTagIndex:
+        tag_map = {}
+        for result in data[KairosConstants.queries][0][KairosConstants.results]:
+            for key, values in result.get(KairosConstants.tags, {}).items():
+                tag_map.setdefault(key, {}).update(dict.fromkeys(values))
+        return MetricTagIndex(metric_name, {key: list(values) for key, values in tag_map.items()}, covers_from)
+
+    def store(self, index: MetricTagIndex):
+        self.cache.set(index.metric_name, index)
+        self.start_refresher()
+
+    def peek(self, metric_name) -> MetricTagIndex:
+        return self.cache.get(metric_name)
+
+    def load(self, metric_name) -> MetricTagIndex:
+        query, covers_from = self.tags_query(metric_name)
+        response = self.kairos_instance.read_tags(query_json=query)
+        response.raise_for_status()
+        index = self.build(metric_name, response.json(), covers_from)
+        self.store(index)
+        return index
+
+    def get(self, metric_name) -> MetricTagIndex:
+        index = self.peek(metric_name)
+        if index is not None:
+            return index
+        return self._single_flight_load(metric_name)
+
+    def reload_due(self, index: MetricTagIndex) -> bool:
+        return time.monotonic() - index.loaded_at >= self.miss_reload
+
+    def reload(self, index: MetricTagIndex) -> MetricTagIndex:
+        """
+        Reloads an index a lookup missed in, when due. Concurrent misses share one load.
+
+        :return: The reloaded index, or `index` when not due or the reload failed
+        """
+        if not self.reload_due(index):
+            return index
+        try:
+            return self._single_flight_load(index.metric_name, stale=index)
+        except Exception as e:
+            self.reload_failed(index, e)
+            return index
+
+    def reload_failed(self, index: MetricTagIndex, error):
+        # retry after the interval instead of on every miss
+        index.loaded_at = time.monotonic()
+        logger.warning(f"Failed to reload tag index of {index.metric_name}: {error}")
+
+    def _single_flight_load(self, metric_name, stale: MetricTagIndex = None) -> MetricTagIndex:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(metric_name, threading.Lock())
+        with load_lock:
+            # another thread may have loaded it while this one waited
+            index = self.peek(metric_name)
+            if index is None or index is stale:
+                index = self.load(metric_name)
+        with self._lock:
+            self._load_locks.pop(metric_name, None)
+        return index
+
+    def find_key(self, metric_name, tag_value):
+        return self.get(metric_name).find_key(tag_value)
+
+    def invalidate(self, metric_name=None):
+        if metric_name is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(metric_name)
+
+    def start_refresher(self):
+        if self._refresher is not None or not self.refresh_interval:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._stop.clear()
+                self._refresher = threading.Thread(target=self._refresh_loop, name="kairos-tag-index", daemon=True)
+                self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+        with self._lock:
+            self._refresher = None
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            for metric_name in self.cache.keys():
+                index = self.cache.get(metric_name, count=False)
+                if index is None:
+                    continue
+                if self.cache.ttl and time.monotonic() - index.last_used > self.cache.ttl:
+                    # not looked up for a full TTL, let it go instead of refreshing forever
+                    self.cache.pop(metric_name)
+                    continue
+                try:
+                    self.load(metric_name).last_used = index.last_used
+                except Exception as e:
+                    logger.warning(f"Failed to refresh tag index of {metric_name}: {e}")
+
+
+tag_index = KairosTagIndex()
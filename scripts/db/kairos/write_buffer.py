@@ -0,0 +1,232 @@
+import atexit
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from scripts.config.app_configurations import KairosConf
+from scripts.core.constants.app_constants import KairosConstants
+from scripts.logging.logging import logger
+
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+class KairosWriteBuffer:
+    """
+    Background writer batching KairosDB datapoints.
+
+    Callers enqueue metric JSON in the regular `/api/v1/datapoints` format. A single worker thread
+    merges datapoints of the same metric, tags, type and ttl, and posts them as one (gzip) body once
+    `max_points` are pending or the oldest point waited `max_age` seconds.
+    The queue is bounded, so producers block (backpressure) when Kairos cannot keep up.
+    """
+
+    def __init__(
+        self,
+        kairos_instance=None,
+        max_points: int = KairosConf.write_max_points,
+        max_age: float = KairosConf.write_max_age,
+        queue_size: int = KairosConf.write_queue_size,
+        max_retries: int = KairosConf.write_retries,
+        retry_backoff: float = KairosConf.retry_backoff,
+    ):
+        self._kairos_instance = kairos_instance
+        self.max_points = max_points
+        self.max_age = max_age
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        # set while stop() waits for the worker to drain, so put() does not start a second one
+        self._stopping = False
+        self._recent = deque()
+        self.points_written = 0
+        self.batches_written = 0
+        self.failed_batches = 0
+        self.dropped_points = 0
+        self.rejected_points = 0
+        self.retries = 0
+        self.flush_ms_last = 0.0
+        self.flush_ms_max = 0.0
+        self.flush_ms_total = 0.0
+        # stop() is a no-op while the worker is not running, one hook covers every start
+        atexit.register(self.stop)
+
+    @property
+    def kairos_instance(self):
+        if self._kairos_instance is None:
+            from scripts.utils.kairos_util import KairosDBUtility
+
+            self._kairos_instance = KairosDBUtility()
+        return self._kairos_instance
+
+    def put(self, metric_json, timeout: float = None) -> bool:
+        """
+        :param metric_json: One metric dict or a list of them, as accepted by Kairos `/api/v1/datapoints`
+        :param timeout: Seconds to wait for queue space, None waits until there is room
+        :return: False when the queue stayed full for `timeout` seconds and the points were not accepted
+        """
+        metrics = metric_json if isinstance(metric_json, list) else [metric_json]
+        self.start()
+        try:
+            self._queue.put(metrics, timeout=timeout)
+            return True
+        except queue.Full:
+            self.rejected_points += sum(len(self.datapoints(metric)) for metric in metrics)
+            logger.warning("Kairos write buffer is full, datapoints rejected")
+            return False
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Writes everything queued before this call.
+
+        :return: False if the flush did not finish within timeout
+        """
+        if not self.is_running:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        with self._lock:
+            if not self.is_running and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name="kairos-write-buffer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """
+        Flushes the pending datapoints and stops the worker, waiting at most timeout seconds.
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive() or self._stopping:
+                return
+            self._stopping = True
+        try:
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put((_STOP, None), timeout=timeout)
+            except queue.Full:
+                logger.warning("Kairos write buffer stayed full, worker not stopped")
+                return
+            thread.join(max(0.0, deadline - time.monotonic()))
+        finally:
+            with self._lock:
+                self._stopping = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire_recent()
+            recent_points = sum(points for _, points in self._recent)
+        return {
+            "queued_batches": self._queue.qsize(),
+            "points_written": self.points_written,
+            "batches_written": self.batches_written,
+            "failed_batches": self.failed_batches,
+            "dropped_points": self.dropped_points,
+            "rejected_points": self.rejected_points,
+            "retries": self.retries,
+            "points_per_sec": round(recent_points / 60, 1),
+            "flush_ms_last": round(self.flush_ms_last, 2),
+            "flush_ms_max": round(self.flush_ms_max, 2),
+            "flush_ms_avg": round(self.flush_ms_total / self.batches_written, 2) if self.batches_written else 0.0,
+        }
+
+    @staticmethod
+    def datapoints(metric) -> list:
+        if "datapoints" in metric:
+            return metric["datapoints"]
+        if "timestamp" in metric:
+            return [[metric["timestamp"], metric.get("value")]]
+        return []
+
+    @staticmethod
+    def key(metric):
+        tags = tuple(sorted((metric.get(KairosConstants.tags) or {}).items()))
+        return metric.get(KairosConstants.name), tags, metric.get("type"), metric.get("ttl")
+
+    def _run(self):
+        pending, pending_points, oldest = {}, 0, None
+        while True:
+            timeout = None if oldest is None else max(0.0, oldest + self.max_age - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            control = item[0] if isinstance(item, tuple) else None
+            if item is not None and control is None:
+                for metric in item:
+                    points = self.datapoints(metric)
+                    if not points:
+                        continue
+                    key = self.key(metric)
+                    if key not in pending:
+                        pending[key] = {**{k: v for k, v in metric.items() if k not in {"timestamp", "value"}},
+                                        "datapoints": []}
+                    pending[key]["datapoints"].extend(points)
+                    pending_points += len(points)
+                if oldest is None and pending_points:
+                    oldest = time.monotonic()
+            due = oldest is not None and time.monotonic() - oldest >= self.max_age
+            if pending_points and (control or due or pending_points >= self.max_points):
+                self._write(list(pending.values()), pending_points)
+                pending, pending_points, oldest = {}, 0, None
+            if control == _FLUSH:
+                item[1].set()
+            elif control == _STOP:
+                return
+
+    def _write(self, body, points):
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.kairos_instance.write(metric_json=body)
+                if response.status_code in (200, 204):
+                    self._record(points, started)
+                    return
+                if response.status_code < 500:
+                    # malformed datapoints will not succeed on a retry
+                    logger.error(f"Kairos rejected {points} buffered datapoints: {response.text}")
+                    break
+                logger.warning(f"Kairos returned {response.status_code} for buffered write, retrying")
+            except Exception as e:
+                logger.warning(f"Buffered Kairos write failed: {e}, retrying")
+            if attempt < self.max_retries:
+                self.retries += 1
+                time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+        self.failed_batches += 1
+        self.dropped_points += points
+        logger.error(f"Dropped {points} buffered Kairos datapoints")
+
+    def _record(self, points, started):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._recent.append((time.monotonic(), points))
+            self._expire_recent()
+        self.points_written += points
+        self.batches_written += 1
+        self.flush_ms_last = elapsed_ms
+        self.flush_ms_max = max(self.flush_ms_max, elapsed_ms)
+        self.flush_ms_total += elapsed_ms
+
+    def _expire_recent(self):
+        horizon = time.monotonic() - 60
+        while self._recent and self._recent[0][0] < horizon:
+            self._recent.popleft()
+
+
+write_buffer = KairosWriteBuffer()
@@ -1,10 +1,13 @@
+import io
+import json
+
 import psycopg2
 from psycopg2.errorcodes import CARDINALITY_VIOLATION, UNDEFINED_COLUMN
-from sqlalchemy import Column, MetaData, Table, exc
+from sqlalchemy import Column, Integer, MetaData, Table, exc
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.schema import DDL
 
-from scripts.config.app_configurations import DBConf
+from scripts.config.app_configurations import DBConf, PostgresConf
+from scripts.db.psql.schema_cache import schema_cache
 from scripts.logging.logging import logger
 
 
@@ -34,15 +37,28 @@ class TableDDL:
         ]
 
         metadata.create_all(self.engine_ref)
+        schema_cache.mark_created(self.engine_ref, table)
 
-    def insert_data(self, data_df, data_types, primary_keys):
+    def insert_data(self, data_df, data_types, primary_keys, bulk: bool = None):
+        """
+        :param bulk: Load through COPY and a staging table, defaults to frames of at least copy_min_rows rows
+        """
         table_model = self.create_model(data_types)
+        if bulk is None:
+            bulk = len(data_df) >= PostgresConf.copy_min_rows
+        upsert = self.copy_upsert_to_table if bulk else self.upsert_to_table
+        known = schema_cache.peek(self.engine_ref, self.table_name, DBConf.pg_schema)
+        if known is not None and not set(data_types) <= known.columns:
+            # the cached schema already tells the frame brings new columns, add them before failing
+            self.alter_add_column(data_types, invalidate=False)
         try:
-            self.upsert_to_table(table_model, primary_keys, data_df)
+            upsert(table_model, primary_keys, data_df)
         except (exc.SQLAlchemyError, psycopg2.Error) as e:
-            if e.orig.pgcode == UNDEFINED_COLUMN:
+            if getattr(e, "orig", e).pgcode == UNDEFINED_COLUMN:
                 self.alter_add_column(data_types)
-                self.upsert_to_table(table_model, primary_keys, data_df)
+                upsert(table_model, primary_keys, data_df)
+            else:
+                raise
         except Exception as e:
             logger.exception(e)
 
@@ -65,19 +81,91 @@ class TableDDL:
             logger.exception(e)
             raise
 
-    def alter_add_column(self, data_types):
+    def copy_upsert_to_table(self, table_model, primary_keys, data_df, chunk_rows: int = PostgresConf.copy_chunk_rows):
+        """
+        Streams the frame into a temporary staging table with COPY, chunk_rows rows at a time,
+        then merges it with one INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+        No per-row Python objects and no bind parameter limit, whatever the size of the frame.
+        """
+        unknown = [name for name in data_df.columns if name not in table_model.columns]
+        if unknown:
+            # the VALUES path fails on them too, COPY would write the frame without them
+            raise ValueError(f"Columns not in the {self.table_name} model: {', '.join(map(str, unknown))}")
+        preparer = self.engine_ref.dialect.identifier_preparer
+        columns = [column for column in table_model.columns if column.name in data_df.columns]
+        names = ", ".join(preparer.quote(column.name) for column in columns)
+        stage = preparer.quote(f"stage_{self.table_name}")
+        stage_ddl = ", ".join(
+            f"{preparer.quote(column.name)} {column.type.compile(self.engine_ref.dialect)}" for column in columns
+        )
+        updates = [preparer.quote(column.name) for column in columns if column.name not in primary_keys]
+        conflict = (
+            f"DO UPDATE SET {', '.join(f'{name} = EXCLUDED.{name}' for name in updates)}" if updates
+            else "DO NOTHING"
+        )
+        merge = (
+            f"INSERT INTO {preparer.format_table(table_model)} ({names}) SELECT {names} FROM {stage} "
+            f"ON CONFLICT ({', '.join(preparer.quote(key) for key in primary_keys)}) {conflict}"
+        )
+        frame = data_df[[column.name for column in columns]]
+        connection = self.engine_ref.raw_connection()
         try:
-            metadata = MetaData(bind=self.engine_ref)
-            existing_table = Table(self.table_name, metadata, autoload=True, schema=DBConf.pg_schema)
-            existing_columns = existing_table.columns.keys()
-            missing_columns = set(data_types.keys()) - set(existing_columns)
-            for col in missing_columns:
-                column = Column(col, data_types[col][0], primary_key=data_types[col][1])
-                alter_table_stmt = DDL(
-                    f"ALTER TABLE {self.table_name} ADD COLUMN {column.compile(metadata.bind)} "
-                    f"{column.type.compile(self.engine_ref.dialect)}"
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE TEMP TABLE {stage} ({stage_ddl}) ON COMMIT DROP")
+                for start in range(0, len(frame), chunk_rows):
+                    buffer = io.StringIO()
+                    self.csv_ready(frame.iloc[start:start + chunk_rows], columns).to_csv(
+                        buffer, index=False, header=False, na_rep="\\N"
+                    )
+                    buffer.seek(0)
+                    cursor.copy_expert(f"COPY {stage} ({names}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+                cursor.execute(merge)
+            connection.commit()
+        except psycopg2.Error as e:
+            connection.rollback()
+            if e.pgcode == CARDINALITY_VIOLATION:
+                logger.error("Primary key values not unique")
+            elif e.pgcode == UNDEFINED_COLUMN:
+                raise
+            else:
+                logger.error(f"Other Errors: {str(e)}")
+                raise
+        except Exception as e:
+            connection.rollback()
+            logger.exception(e)
+            raise
+        finally:
+            connection.close()
+
+    @staticmethod
+    def csv_ready(chunk, columns=()):
+        """
+        JSON encodes dict and list cells, which would otherwise be written as Python reprs, and writes float
+        columns of integer table columns without the ".0" COPY rejects (pandas makes NaN holding ints floats).
+
+        :param columns: Table columns of the chunk
+        """
+        changes = {
+            column.name: chunk[column.name].astype("Int64") for column in columns
+            if isinstance(column.type, Integer) and chunk[column.name].dtype.kind == "f"
+        }
+        for name in chunk.columns:
+            if chunk[name].dtype == object and chunk[name].map(lambda value: isinstance(value, (dict, list))).any():
+                changes[name] = chunk[name].map(
+                    lambda value: json.dumps(value) if isinstance(value, (dict, list)) else value
                 )
-                with self.engine_ref.connect() as connection:
-                    connection.execute(alter_table_stmt)
+        return chunk.assign(**changes) if changes else chunk
+
+    def alter_add_column(self, data_types, invalidate: bool = True):
+        """
+        Adds every column of data_types missing from the table in a single ALTER TABLE.
+
+        :param invalidate: Re-reflect the table first, the cached column set is stale after UNDEFINED_COLUMN
+        """
+        try:
+            if invalidate:
+                schema_cache.invalidate(self.engine_ref, self.table_name, DBConf.pg_schema)
+            columns = [Column(name, d_type[0], primary_key=d_type[1]) for name, d_type in data_types.items()]
+            schema_cache.ensure_columns(self.engine_ref, self.table_name, columns, DBConf.pg_schema)
         except Exception as e:
             logger.exception(e)
@@ -0,0 +1,136 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from scripts.config.app_configurations import DBConf, PostgresConf
+from scripts.db.psql.engine_registry import prepare_database
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+
+
+class AsyncRegisteredEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.session_factory = sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+class AsyncEngineRegistry:
+    """
+    asyncio counterpart of EngineRegistry: one asyncpg backed engine per project database.
+
+    The database and schema are prepared once, on a worker thread with a throwaway synchronous engine,
+    so the event loop never waits on them.
+    """
+
+    def __init__(
+        self,
+        base_uri: str = None,
+        schema: str = DBConf.pg_schema,
+        max_engines: int = PostgresConf.max_engines,
+        driver: str = "postgresql+asyncpg",
+        **engine_options,
+    ):
+        """
+        :param base_uri: Server URI without the database name, defaults to the assistant DB server
+        :param driver: SQLAlchemy async driver name replacing the one of base_uri
+        :param engine_options: Overrides of the create_async_engine pool options
+        """
+        self._base_uri = base_uri
+        self.schema = schema
+        self.driver = driver
+        self.engine_options = {
+            "pool_size": PostgresConf.pool_size,
+            "max_overflow": PostgresConf.max_overflow,
+            "pool_timeout": PostgresConf.pool_timeout,
+            "pool_recycle": PostgresConf.pool_recycle,
+            "pool_pre_ping": PostgresConf.pool_pre_ping,
+            **engine_options,
+        }
+        # disposals of evicted engines, referenced until done so they are not garbage collected midway
+        self._dispose_tasks = set()
+        self.engines = LRUCache(maxsize=max_engines, on_evict=self._dispose)
+        self._locks = {}
+
+    @property
+    def base_uri(self):
+        if self._base_uri is None:
+            self._base_uri = DBConf.ASSISTANT_DB_URI.rsplit("/", 1)[0]
+        return self._base_uri
+
+    async def get(self, db_name: str) -> AsyncRegisteredEngine:
+        registered = self.engines.get(db_name)
+        if registered is not None:
+            return registered
+        lock = self._locks.setdefault(db_name, asyncio.Lock())
+        async with lock:
+            registered = self.engines.get(db_name, count=False)
+            if registered is None:
+                registered = AsyncRegisteredEngine(await self._create(db_name))
+                self.engines.set(db_name, registered)
+        self._locks.pop(db_name, None)
+        return registered
+
+    async def session(self, db_name: str) -> AsyncSession:
+        return (await self.get(db_name)).session_factory()
+
+    async def dispose(self, db_name: str = None):
+        """
+        Disposes one engine, or all of them when db_name is None.
+        """
+        for key in [db_name] if db_name else self.engines.keys():
+            registered = self.engines.pop(key)
+            if registered is not None:
+                await registered.engine.dispose()
+
+    def stats(self) -> dict:
+        engines = {}
+        for db_name in self.engines.keys():
+            registered = self.engines.get(db_name, count=False)
+            if registered is None:
+                continue
+            pool = registered.engine.sync_engine.pool
+            engines[db_name] = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+        return {**self.engines.stats(), "engines": engines}
+
+    async def _create(self, db_name):
+        url = make_url(f"{self.base_uri}/{db_name}")
+        await asyncio.get_running_loop().run_in_executor(None, self._prepare, url)
+        engine = create_async_engine(url.set(drivername=self.driver), **self.engine_options)
+        logger.info(f"Created async Postgres engine for {db_name}")
+        return engine
+
+    def _prepare(self, url):
+        engine = create_engine(url, poolclass=NullPool)
+        try:
+            prepare_database(engine, self.schema)
+        finally:
+            engine.dispose()
+
+    def _dispose(self, db_name, registered):
+        logger.info(f"Disposing async Postgres engine for {db_name}")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # evicted outside the event loop, drop the pooled connections without awaiting
+            registered.engine.sync_engine.dispose()
+            return
+        task = loop.create_task(registered.engine.dispose())
+        self._dispose_tasks.add(task)
+        task.add_done_callback(lambda done: self._disposed(db_name, done))
+
+    def _disposed(self, db_name, task):
+        self._dispose_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to dispose async Postgres engine for {db_name}: {task.exception()}")
+
+
+async_engine_registry = AsyncEngineRegistry()
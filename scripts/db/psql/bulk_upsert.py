@@ -0,0 +1,87 @@
+"""
+Statement building for chunked multi-row INSERT ... ON CONFLICT upserts, shared by PostgresUtility and
+AsyncPostgresUtility.
+"""
+from typing import List
+
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+# xmax is 0 on a freshly inserted row version and set on one written by ON CONFLICT DO UPDATE
+INSERTED = literal_column("(xmax = 0)").label("inserted")
+
+
+def upsert_batches(records: List[dict], conflict_keys: List[str], chunk_size: int):
+    """
+    Splits records into batches of at most chunk_size rows sharing the same columns.
+    A key repeated in the input keeps its last record only, Postgres rejects a key twice in one statement.
+    Records with a conflict key missing or None are kept as they are: NULL never conflicts (e.g. a serial key
+    left to its default), so each of them is a new row.
+
+    :return: (list of (first input index, rows), number of duplicate records dropped)
+    """
+    latest, keyless = {}, []
+    for index, record in enumerate(records):
+        key = tuple(record.get(name) for name in conflict_keys)
+        if None in key:
+            keyless.append(index)
+        else:
+            latest[key] = index
+    kept = sorted([*latest.values(), *keyless])
+    groups = {}
+    for index in kept:
+        groups.setdefault(tuple(sorted(records[index])), []).append(index)
+    batches = []
+    for indexes in groups.values():
+        for start in range(0, len(indexes), chunk_size):
+            chunk = indexes[start:start + chunk_size]
+            batches.append((chunk[0], [records[index] for index in chunk]))
+    batches.sort(key=lambda batch: batch[0])
+    return batches, len(records) - len(kept)
+
+
+def upsert_statement(table, rows: List[dict], conflict_keys: List[str], update_columns: List[str] = None):
+    """
+    :param update_columns: Columns overwritten on conflict, defaults to every non-key column in rows
+    """
+    statement = insert(table).values(rows)
+    if update_columns is None:
+        update_columns = [name for name in rows[0] if name not in conflict_keys]
+    if update_columns:
+        statement = statement.on_conflict_do_update(
+            index_elements=conflict_keys,
+            set_={name: getattr(statement.excluded, name) for name in update_columns},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=conflict_keys)
+    return statement.returning(INSERTED)
+
+
+def batch_report(number: int, first_index: int, rows: List[dict], inserted_flags=None, error=None,
+                 conflict_keys: List[str] = None) -> dict:
+    """
+    :param conflict_keys: With error, lists the key values of the rows that were not written
+    """
+    report = {"batch": number, "first_index": first_index, "rows": len(rows)}
+    if error is not None:
+        report["error"] = str(getattr(error, "orig", error))
+        if conflict_keys:
+            report["keys"] = [[row.get(key) for key in conflict_keys] for row in rows]
+        return report
+    inserted = sum(1 for flag in inserted_flags if flag)
+    report.update(inserted=inserted, updated=len(inserted_flags) - inserted,
+                  skipped=len(rows) - len(inserted_flags))
+    return report
+
+
+def summary(batches: List[dict], duplicates: int) -> dict:
+    failed = [batch for batch in batches if "error" in batch]
+    return {
+        "inserted": sum(batch.get("inserted", 0) for batch in batches),
+        "updated": sum(batch.get("updated", 0) for batch in batches),
+        "skipped": sum(batch.get("skipped", 0) for batch in batches),
+        "duplicates": duplicates,
+        "failed_rows": sum(batch["rows"] for batch in failed),
+        "failed_batches": failed,
+        "batches": batches,
+    }
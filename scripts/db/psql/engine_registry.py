@@ -0,0 +1,130 @@
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateSchema
+from sqlalchemy_utils import create_database, database_exists
+
+from scripts.config.app_configurations import DBConf, PostgresConf
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+
+
+def prepare_database(engine, schema: str = None):
+    """
+    Creates the database of the engine and the schema in it when they do not exist yet.
+    """
+    if not database_exists(engine.url):
+        create_database(engine.url)
+    if schema and schema not in Inspector.from_engine(engine).get_schema_names():
+        with engine.begin() as connection:
+            connection.execute(CreateSchema(schema, quote=True))
+
+
+class RegisteredEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class EngineRegistry:
+    """
+    One pooled SQLAlchemy engine per project database, created on first use and kept for the process.
+
+    The database and schema are checked (and created) once when the engine is built instead of on every
+    request. At most `max_engines` engines stay alive, the least recently used one is disposed beyond that.
+    """
+
+    def __init__(
+        self,
+        base_uri: str = None,
+        schema: str = DBConf.pg_schema,
+        max_engines: int = PostgresConf.max_engines,
+        **engine_options,
+    ):
+        """
+        :param base_uri: Server URI without the database name, defaults to the assistant DB server
+        :param engine_options: Overrides of the create_engine pool options
+        """
+        self._base_uri = base_uri
+        self.schema = schema
+        self.engine_options = {
+            "poolclass": QueuePool,
+            "pool_size": PostgresConf.pool_size,
+            "max_overflow": PostgresConf.max_overflow,
+            "pool_timeout": PostgresConf.pool_timeout,
+            "pool_recycle": PostgresConf.pool_recycle,
+            "pool_pre_ping": PostgresConf.pool_pre_ping,
+            **engine_options,
+        }
+        self.engines = LRUCache(maxsize=max_engines, on_evict=self._dispose)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_uri(self):
+        if self._base_uri is None:
+            self._base_uri = DBConf.ASSISTANT_DB_URI.rsplit("/", 1)[0]
+        return self._base_uri
+
+    def get(self, db_name: str) -> RegisteredEngine:
+        registered = self.engines.get(db_name)
+        if registered is not None:
+            return registered
+        with self._lock:
+            lock = self._locks.setdefault(db_name, threading.Lock())
+        with lock:
+            registered = self.engines.get(db_name, count=False)
+            if registered is None:
+                registered = RegisteredEngine(self._create(db_name))
+                self.engines.set(db_name, registered)
+        with self._lock:
+            self._locks.pop(db_name, None)
+        return registered
+
+    def session(self, db_name: str):
+        return self.get(db_name).session_factory()
+
+    def dispose(self, db_name: str = None):
+        """
+        Disposes one engine, or all of them when db_name is None.
+        """
+        for key in [db_name] if db_name else self.engines.keys():
+            registered = self.engines.pop(key)
+            if registered is not None:
+                self._dispose(key, registered)
+
+    def stats(self) -> dict:
+        engines = {}
+        for db_name in self.engines.keys():
+            registered = self.engines.get(db_name, count=False)
+            if registered is None:
+                continue
+            pool = registered.engine.pool
+            engines[db_name] = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+        return {**self.engines.stats(), "engines": engines}
+
+    def _create(self, db_name):
+        engine = create_engine(f"{self.base_uri}/{db_name}", **self.engine_options)
+        try:
+            prepare_database(engine, self.schema)
+        except Exception:
+            engine.dispose()
+            raise
+        logger.info(f"Created Postgres engine for {db_name}")
+        return engine
+
+    @staticmethod
+    def _dispose(db_name, registered):
+        logger.info(f"Disposing Postgres engine for {db_name}")
+        registered.engine.dispose()
+
+
+engine_registry = EngineRegistry()
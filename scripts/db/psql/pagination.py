@@ -0,0 +1,143 @@
+"""
+Keyset (cursor) pagination shared by PostgresUtility and AsyncPostgresUtility.
+
+A page continues after the ordered key of the last row of the previous page, so page N costs the same as
+page 1, instead of Postgres reading and discarding every OFFSET row first.
+"""
+import base64
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import func, literal, select, text, tuple_
+
+TOTAL_COLUMN = "__total_records"
+RESTORE_TYPES = {
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    time: time.fromisoformat,
+    Decimal: Decimal,
+    uuid.UUID: uuid.UUID,
+}
+
+
+class CountMode:
+    none = None
+    exact = "exact"
+    window = "window"
+    estimated = "estimated"
+
+
+def encode_cursor(key_values: list, seen: int) -> str:
+    payload = json.dumps({"k": key_values, "n": seen}, separators=(",", ":"),
+                         default=lambda value: value.isoformat() if hasattr(value, "isoformat") else str(value))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]):
+    """
+    :return: (key values of the last row returned, number of rows returned so far)
+    """
+    if not cursor:
+        return None, 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return payload["k"], payload["n"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {e}") from e
+
+
+def key_literal(value, column):
+    """
+    Binds a cursor key value with the type of its column, restoring values JSON turned into strings.
+    """
+    try:
+        restore = RESTORE_TYPES.get(column.type.python_type)
+    except NotImplementedError:
+        restore = None
+    if restore is not None and isinstance(value, str):
+        value = restore(value)
+    return literal(value, column.type)
+
+
+def filtered(table, statement, filters: dict = None):
+    if filters:
+        statement = statement.where(*[getattr(table, key) == value for key, value in filters.items()])
+    return statement
+
+
+def keyset_statement(table, order_by: List[str], cursor: str = None, page_size: int = 50, filters: dict = None,
+                     columns: list = None, descending: bool = False, window_total: bool = False):
+    """
+    :param order_by: Columns forming a unique, ordered key, e.g. ["created_at", "id"]
+    :param descending: Walk the key in descending order (all key columns)
+    :param window_total: Add count(*) over () so the page also carries the number of rows left
+    :return: (statement fetching page_size + 1 rows, rows returned before this page)
+    """
+    key_columns = [getattr(table, name) for name in order_by]
+    selected = [getattr(table, name) for name in columns] if columns else list(table.__table__.columns)
+    selected_names = {column.key for column in selected}
+    selected += [column for column in key_columns if column.key not in selected_names]
+    if window_total:
+        selected.append(func.count().over().label(TOTAL_COLUMN))
+    statement = filtered(table, select(*selected), filters)
+    after, seen = decode_cursor(cursor)
+    if after is not None:
+        key = tuple_(*key_columns)
+        last = tuple_(*[key_literal(value, column) for value, column in zip(after, key_columns)])
+        statement = statement.where(key < last if descending else key > last)
+    ordering = [column.desc() if descending else column.asc() for column in key_columns]
+    return statement.order_by(*ordering).limit(page_size + 1), seen
+
+
+def keyset_page(rows, order_by: List[str], page_size: int, seen: int, columns: list = None,
+                column_mappings: dict = None, window_total: bool = False):
+    """
+    :param rows: Row mappings returned by keyset_statement
+    :return: (records, next cursor or None on the last page, total from the window count or None)
+    """
+    total = seen + rows[0][TOTAL_COLUMN] if window_total and rows else (seen if window_total else None)
+    page = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = page[-1]
+        next_cursor = encode_cursor([last[name] for name in order_by], seen + len(page))
+    drop = {TOTAL_COLUMN} | ({name for name in order_by if name not in columns} if columns else set())
+    records = []
+    for row in page:
+        record = {key: value for key, value in row.items() if key not in drop}
+        if column_mappings:
+            record.update({label: row[value] for label, value in column_mappings.items()})
+        records.append(record)
+    return records, next_cursor, total
+
+
+def count_statement(table, filters: dict = None):
+    return filtered(table, select(func.count()).select_from(table), filters)
+
+
+def reltuples_statement(table):
+    """
+    Planner row estimate of the whole table from pg_class, kept current by autovacuum / ANALYZE.
+    """
+    name = table.__table__.fullname
+    return text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)").bindparams(name=name)
+
+
+def explain_sql(table, filters: dict, dialect):
+    """
+    :return: (EXPLAIN (FORMAT JSON) statement of the filtered table, driver parameters)
+    """
+    compiled = filtered(table, select(*table.__table__.columns), filters).compile(dialect=dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return f"EXPLAIN (FORMAT JSON) {compiled}", params
+
+
+def explain_rows(plan) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,57 @@
+"""
+Conversion of Core result rows into dicts, tuples or columns, without hydrating ORM objects.
+"""
+from functools import lru_cache
+from typing import Tuple
+
+
+class RowOutput:
+    dict = "dict"
+    tuple = "tuple"
+    columns = "columns"
+
+
+class RowConverter:
+    """
+    Converter for rows of a fixed column list.
+    Rows are zipped with the column names computed once, which avoids the per cell getattr and
+    column loop of fetch_records_from_object.
+    """
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+
+    def to_dict(self, row) -> dict:
+        return dict(zip(self.names, row))
+
+    def records(self, rows) -> list:
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+    def tuples(self, rows) -> list:
+        return list(map(tuple, rows))
+
+    def columns(self, rows) -> dict:
+        """
+        Dict of lists, one list per column, as chart series consume it.
+        """
+        if not rows:
+            return {name: [] for name in self.names}
+        return dict(zip(self.names, map(list, zip(*rows))))
+
+    def convert(self, rows, output: str = RowOutput.dict):
+        if output == RowOutput.tuple:
+            return self.tuples(rows)
+        if output == RowOutput.columns:
+            return self.columns(rows)
+        return self.records(rows)
+
+
+@lru_cache(maxsize=512)
+def converter_for(table, columns: Tuple[str, ...] = None) -> RowConverter:
+    """
+    Cached per model and column list.
+
+    :param columns: Projected column names, None for every column of the model
+    """
+    return RowConverter(columns or tuple(column.name for column in table.__table__.columns))
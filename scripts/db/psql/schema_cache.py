@@ -0,0 +1,112 @@
+import hashlib
+import threading
+
+from sqlalchemy import inspect
+
+from scripts.config.app_configurations import PostgresConf
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+
+
+def fingerprint(columns) -> str:
+    """
+    Stable digest of a column set, from the names and SQL types.
+    """
+    parts = sorted(f"{column.name}:{column.type}" for column in columns)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+class TableState:
+    def __init__(self, columns):
+        self.columns = set(columns)
+        # fingerprints of column sets already known to be present, checked without touching the catalog
+        self.ensured = set()
+
+
+class SchemaCache:
+    """
+    Known column sets of live tables, per engine, schema and table.
+
+    The catalog is reflected only on a cache miss or after `invalidate` (e.g. on an UNDEFINED_COLUMN error).
+    Missing columns are added with one ALTER TABLE in one transaction, so repeated ingestion of an unchanged
+    model runs no catalog query at all.
+    """
+
+    def __init__(self, maxsize: int = PostgresConf.schema_cache_size):
+        self.tables = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.reflections = 0
+        self.alters = 0
+
+    @staticmethod
+    def key(engine, table_name, schema=None):
+        return str(engine.url), schema, table_name
+
+    def peek(self, engine, table_name, schema=None):
+        """
+        :return: Cached TableState, or None when unknown, without reflecting
+        """
+        return self.tables.get(self.key(engine, table_name, schema))
+
+    def get(self, engine, table_name, schema=None):
+        """
+        :return: TableState, reflected on a miss, None when the table does not exist
+        """
+        state = self.peek(engine, table_name, schema)
+        if state is not None:
+            return state
+        inspector = inspect(engine)
+        self.reflections += 1
+        if not inspector.has_table(table_name, schema=schema):
+            return None
+        state = TableState(column["name"] for column in inspector.get_columns(table_name, schema=schema))
+        self.tables.set(self.key(engine, table_name, schema), state)
+        return state
+
+    def mark_created(self, engine, table):
+        state = TableState(column.name for column in table.columns)
+        state.ensured.add(fingerprint(table.columns))
+        self.tables.set(self.key(engine, table.name, table.schema), state)
+
+    def invalidate(self, engine, table_name, schema=None):
+        self.tables.pop(self.key(engine, table_name, schema))
+
+    def ensure_columns(self, engine, table_name, columns, schema=None) -> list:
+        """
+        Adds the columns missing from the live table in a single ALTER TABLE.
+
+        :param columns: sqlalchemy Column objects the table must have
+        :return: Names of the columns added
+        """
+        digest = fingerprint(columns)
+        state = self.peek(engine, table_name, schema)
+        if state is not None and digest in state.ensured:
+            return []
+        with self._lock:
+            state = self.get(engine, table_name, schema)
+            if state is None:
+                raise LookupError(f"Table {table_name} does not exist")
+            missing = [column for column in columns if column.name not in state.columns]
+            if missing:
+                self._alter(engine, table_name, schema, missing)
+                state.columns.update(column.name for column in missing)
+            state.ensured.add(digest)
+        return [column.name for column in missing]
+
+    def stats(self) -> dict:
+        return {**self.tables.stats(), "reflections": self.reflections, "alters": self.alters}
+
+    def _alter(self, engine, table_name, schema, missing):
+        preparer = engine.dialect.identifier_preparer
+        target = f"{preparer.quote_schema(schema)}.{preparer.quote(table_name)}" if schema else preparer.quote(table_name)
+        clauses = ", ".join(
+            f"ADD COLUMN IF NOT EXISTS {preparer.quote(column.name)} {column.type.compile(engine.dialect)}"
+            for column in missing
+        )
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"ALTER TABLE {target} {clauses}")
+        self.alters += 1
+        logger.info(f"Added columns {[column.name for column in missing]} to {table_name}")
+
+
+schema_cache = SchemaCache()
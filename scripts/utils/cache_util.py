@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional per-entry TTL and an optional byte budget.
+
+    :param maxsize: Maximum number of entries kept
+    :param ttl: Default time to live in seconds, None keeps entries until evicted
+    :param maxbytes: Maximum total size of the entries, requires `sizeof`
+    :param sizeof: Callable returning the size in bytes of a value
+    :param on_evict: Callable receiving (key, value) of entries dropped for size or TTL, called outside the lock
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, maxbytes: int = None, sizeof=None, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count: bool = True):
+        expired = None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                expired = self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+        if expired is not None:
+            self._evicted([(key, expired)])
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(value) if self.sizeof else 0
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes and self.bytes > self.maxbytes and len(self._data) > 1):
+                oldest = next(iter(self._data))
+                evicted.append((oldest, self._remove(oldest)))
+                self.evictions += 1
+        self._evicted(evicted)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def pop_where(self, predicate):
+        """
+        Removes every entry whose key satisfies predicate(key).
+
+        :return: Number of entries removed
+        """
+        with self._lock:
+            matched = [key for key in self._data if predicate(key)]
+            for key in matched:
+                self._remove(key)
+            return len(matched)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.maxbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _evicted(self, entries):
+        if self.on_evict is not None:
+            for key, value in entries:
+                self.on_evict(key, value)
+
+    def _remove(self, key):
+        value, _, size = self._data.pop(key)
+        self.bytes -= size
+        return value
+
@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+
+from scripts.config.app_configurations import DBConf, KairosConf
+from scripts.logging.logging import logger
+
+
+class AsyncKairosSession:
+    """
+    Process wide httpx.AsyncClient shared by every AsyncKairosDBUtility.
+    The client is bound to the event loop it was created on, so it is created lazily on first use.
+    """
+
+    _client = None
+
+    @classmethod
+    def get(cls) -> httpx.AsyncClient:
+        if cls._client is None or cls._client.is_closed:
+            cls._client = cls.create()
+        return cls._client
+
+    @staticmethod
+    def create(
+        max_connections: int = KairosConf.pool_connections * KairosConf.pool_maxsize,
+        max_keepalive_connections: int = KairosConf.pool_maxsize,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(KairosConf.read_timeout, connect=KairosConf.connect_timeout),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+
+    @classmethod
+    async def close(cls):
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+
+class AsyncKairosDBUtility:
+    def __init__(self, client: httpx.AsyncClient = None):
+        self.base_url = DBConf.KAIROS_URI
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or AsyncKairosSession.get()
+
+    async def read(self, query_json, deadline: float = None):
+        """
+        Reads data from KairosDB, retrying connection and gateway errors with backoff.
+
+        :param query_json: JSON object containing the query
+        :param deadline: Overall time budget in seconds including retries
+        :return: httpx.Response
+        """
+        url = self.base_url + "/api/v1/datapoints/query"
+        return await asyncio.wait_for(self._post_with_retry(url, query_json), timeout=deadline)
+
+    async def read_tags(self, query_json, deadline: float = None):
+        """
+        Reads the tag names and values of metrics from KairosDB without fetching datapoints.
+
+        :param query_json: JSON object containing the query
+        :param deadline: Overall time budget in seconds including retries
+        :return: httpx.Response
+        """
+        url = self.base_url + "/api/v1/datapoints/query/tags"
+        return await asyncio.wait_for(self._post_with_retry(url, query_json), timeout=deadline)
+
+    async def write(self, metric_json, deadline: float = None):
+        """
+        Writes data to KairosDB.
+
+        :param metric_json: JSON object containing the data to be written
+        :param deadline: Overall time budget in seconds
+        :return: httpx.Response
+        """
+        url = self.base_url + "/api/v1/datapoints"
+        return await asyncio.wait_for(self._post(url, metric_json, compress=KairosConf.gzip_requests),
+                                      timeout=deadline)
+
+    async def delete(self, delete_json, deadline: float = None):
+        """
+        Deletes data from KairosDB.
+
+        :param delete_json: JSON object containing the deletion criteria
+        :param deadline: Overall time budget in seconds
+        :return: httpx.Response
+        """
+        url = self.base_url + "/api/v1/datapoints/delete"
+        return await asyncio.wait_for(self._post(url, delete_json), timeout=deadline)
+
+    async def _post(self, url, payload, compress=False):
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if compress and len(body) >= KairosConf.gzip_min_bytes:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return await self.client.post(url, content=body, headers=headers)
+
+    async def _post_with_retry(self, url, payload):
+        attempt = 0
+        while True:
+            try:
+                response = await self._post(url, payload)
+                if response.status_code not in KairosConf.retry_statuses or attempt >= KairosConf.read_retries:
+                    return response
+                logger.warning(f"Kairos returned {response.status_code}, retrying ({attempt + 1})")
+            except (httpx.ConnectError, httpx.TimeoutException) as e:
+                if attempt >= KairosConf.read_retries:
+                    raise
+                logger.warning(f"Kairos read failed: {e}, retrying ({attempt + 1})")
+            await asyncio.sleep(KairosConf.retry_backoff * (2**attempt))
+            attempt += 1
@@ -1,20 +1,93 @@
+import gzip
+import json
+import threading
+import time
+
 import requests
-from scripts.config.app_configurations import DBConf
+from requests.adapters import HTTPAdapter
+
+from scripts.config.app_configurations import DBConf, KairosConf
+from scripts.logging.logging import logger
+
+
+class KairosSession:
+    """
+    Process wide, connection pooled HTTP session shared by every KairosDBUtility.
+
+    Keeping a single session alive lets urllib3 reuse the TCP connections to KairosDB
+    instead of paying a new handshake on every widget refresh.
+    """
+
+    _session = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> requests.Session:
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    cls._session = cls.create()
+        return cls._session
+
+    @staticmethod
+    def create(
+        pool_connections: int = KairosConf.pool_connections,
+        pool_maxsize: int = KairosConf.pool_maxsize,
+        pool_block: bool = KairosConf.pool_block,
+    ) -> requests.Session:
+        """
+        :param pool_connections: Number of per-host connection pools to keep
+        :param pool_maxsize: Maximum connections kept alive per host
+        :param pool_block: Block instead of opening extra connections once a host pool is exhausted
+        :return: Configured session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        return session
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
 
 
 class KairosDBUtility:
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
         self.base_url = DBConf.KAIROS_URI
+        self.session = session or KairosSession.get()
+        self.timeout = (KairosConf.connect_timeout, KairosConf.read_timeout)
 
-    def read(self, query_json):
+    def read(self, query_json, stream: bool = False):
         """
         Reads data from KairosDB.
+        Reads are idempotent, so connection errors and gateway errors are retried with backoff.
 
         :param query_json: JSON object containing the query
+        :param stream: Leave the body unread so it can be decoded chunk by chunk (caller closes the response)
         :return: JSON object with the data or status
         """
         url = self.base_url + "/api/v1/datapoints/query"
-        return requests.post(url, json=query_json)
+        return self._post_with_retry(url, query_json, stream=stream)
+
+    def read_tags(self, query_json):
+        """
+        Reads the tag names and values of metrics from KairosDB without fetching datapoints.
+
+        :param query_json: JSON object containing the query
+        :return: JSON object with the tags
+        """
+        url = self.base_url + "/api/v1/datapoints/query/tags"
+        return self._post_with_retry(url, query_json)
 
     def write(self, metric_json):
         """
@@ -24,7 +97,7 @@ class KairosDBUtility:
         :return: JSON object with the status or response
         """
         url = self.base_url + "/api/v1/datapoints"
-        return requests.post(url, json=metric_json)
+        return self._post(url, metric_json, compress=KairosConf.gzip_requests)
 
     def delete(self, delete_json):
         """
@@ -34,4 +107,28 @@ class KairosDBUtility:
         :return: JSON object with the status or response
         """
         url = self.base_url + "/api/v1/datapoints/delete"
-        return requests.post(url, json=delete_json)
+        return self._post(url, delete_json)
+
+    def _post(self, url, payload, compress=False, stream=False):
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if compress and len(body) >= KairosConf.gzip_min_bytes:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return self.session.post(url, data=body, headers=headers, timeout=self.timeout, stream=stream)
+
+    def _post_with_retry(self, url, payload, stream=False):
+        attempt = 0
+        while True:
+            try:
+                response = self._post(url, payload, stream=stream)
+                if response.status_code not in KairosConf.retry_statuses or attempt >= KairosConf.read_retries:
+                    return response
+                response.close()
+                logger.warning(f"Kairos returned {response.status_code}, retrying ({attempt + 1})")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= KairosConf.read_retries:
+                    raise
+                logger.warning(f"Kairos read failed: {e}, retrying ({attempt + 1})")
+            time.sleep(KairosConf.retry_backoff * (2**attempt))
+            attempt += 1
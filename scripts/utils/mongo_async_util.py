@@ -0,0 +1,293 @@
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCursor
+
+from scripts.config.app_configurations import DBConf, MongoConf
+from scripts.logging.logging import logger
+from scripts.utils.db_name_util import get_db_name
+from scripts.utils import mongo_pagination_util as pagination
+from scripts.utils.mongo_pagination_util import MongoCountMode
+from scripts.utils.mongo_soft_delete_util import AsyncSoftDeleteEngine
+from scripts.utils.mongo_util import META_SOFT_DEL, pool_options
+
+
+class AsyncMongoConnect:
+    """
+    Shared Motor (asyncio) client, one connection pool for every async collection class.
+    """
+
+    def __init__(self, uri, **overrides):
+        """
+        :param overrides: Overrides of the MongoConf pool settings (maxPoolSize, minPoolSize, ...)
+        """
+        try:
+            self.uri = uri
+            self.client = AsyncIOMotorClient(
+                self.uri,
+                connect=False,
+                **{**pool_options(), **overrides},
+            )
+        except Exception:
+            raise
+
+    def __call__(self, *args, **kwargs):
+        return self.client
+
+    def __repr__(self):
+        return f"Async Mongo Client(uri:{self.uri})"
+
+
+class AsyncMongoCollectionBaseClass:
+    """
+    asyncio counterpart of MongoCollectionBaseClass on Motor, same methods awaited.
+    find, find_with_count and aggregate return Motor cursors, consume them with `async for`,
+    `await cursor.to_list(None)` or fetch_records_from_object.
+    """
+
+    def __init__(
+        self,
+        mongo_client,
+        database,
+        collection,
+        soft_delete: bool = META_SOFT_DEL,
+    ):
+        self.client = mongo_client
+        self.database = database
+        self.collection = collection
+        self.__database = None
+        self._project_id = None
+        self.soft_delete = soft_delete
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(database={self.database}, collection={self.collection})"
+
+    @property
+    def project_id(self):
+        return self._project_id
+
+    @project_id.setter
+    def project_id(self, project_id):
+        if self.__database is None:
+            # storing original db name if None
+            self.__database = self.database
+        self._project_id = project_id
+        self.database = get_db_name(project_id=project_id, database=self.__database)
+
+    @property
+    def _collection(self):
+        return self.client[self.database][self.collection]
+
+    async def insert_one(self, data: Dict):
+        """
+        :param data: Data to be inserted
+        :return: Insert ID
+        """
+        response = await self._collection.insert_one(data)
+        logger.debug(data)
+        return response.inserted_id
+
+    async def insert_many(self, data: List):
+        """
+        :param data: List of Data to be inserted
+        :return: Insert IDs
+        """
+        response = await self._collection.insert_many(data)
+        logger.debug(data)
+        return response.inserted_ids
+
+    def find(
+        self,
+        query: Dict,
+        filter_dict: Optional[Dict] = None,
+        sort=None,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = None,
+    ) -> AsyncIOMotorCursor:
+        """
+        :param query: Query Dictionary
+        :param filter_dict: Filter Dictionary
+        :param sort: List of tuple with key and direction. [(key, -1), ...]
+        :param skip: Skip Number
+        :param limit: Limit Number
+        :return: Motor cursor over the documents
+        """
+        if filter_dict is None:
+            filter_dict = {"_id": 0}
+        cursor = self._collection.find(query, filter_dict)
+        if sort:
+            cursor = cursor.sort(sort)
+        cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def find_iter(
+        self,
+        query: Dict,
+        filter_dict: Optional[Dict] = None,
+        fields: Optional[List[str]] = None,
+        sort=None,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = None,
+        batch_size: int = MongoConf.stream_batch_size,
+        chunk_size: Optional[int] = None,
+        raw: bool = False,
+        allow_disk_use: Optional[bool] = None,
+    ) -> AsyncIterator:
+        """
+        Async generator counterpart of MongoCollectionBaseClass.find_iter, same parameters.
+        """
+        if fields:
+            filter_dict = {**dict.fromkeys(fields, 1), "_id": 0}
+        elif filter_dict is None:
+            filter_dict = {"_id": 0}
+        collection = self._collection
+        if raw:
+            collection = collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+        cursor = collection.find(query, filter_dict, skip=skip, limit=limit or 0, sort=sort or None,
+                                 batch_size=batch_size, allow_disk_use=allow_disk_use)
+        try:
+            chunk = []
+            async for document in cursor:
+                if not chunk_size:
+                    yield document
+                    continue
+                chunk.append(document)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            await cursor.close()
+
+    async def find_one(self, query: Dict, filter_dict: Optional[Dict] = None):
+        if filter_dict is None:
+            filter_dict = {"_id": 0}
+        return await self._collection.find_one(query, filter_dict)
+
+    async def find_with_count(
+        self,
+        query: Dict,
+        filter_dict: Optional[Dict] = None,
+        sort=None,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = None,
+        count_mode: Optional[str] = MongoCountMode.exact,
+    ):
+        """
+        :param count_mode: MongoCountMode, see MongoCollectionBaseClass.find_with_count
+        :return: (Motor cursor over the page, a list in facet mode, total number of matching documents)
+        """
+        if count_mode == MongoCountMode.facet:
+            pipeline = pagination.facet_pipeline(query, filter_dict or {"_id": 0}, sort, skip, limit)
+            return pagination.facet_result(await self._collection.aggregate(pipeline).to_list(length=None))
+        total_count = await self.count_documents(query, count_mode)
+        return self.find(query, filter_dict, sort, skip, limit), total_count
+
+    async def count_documents(self, query: Dict, count_mode: Optional[str] = MongoCountMode.exact) -> Optional[int]:
+        if count_mode is MongoCountMode.none:
+            return None
+        if count_mode == MongoCountMode.cached:
+            key = pagination.count_key(self.database, self.collection, query)
+            total_count = pagination.count_cache.get(key)
+            if total_count is None:
+                total_count = await self.count_documents(query, MongoCountMode.estimated)
+                pagination.count_cache.set(key, total_count)
+            return total_count
+        if count_mode == MongoCountMode.estimated and not query:
+            return await self._collection.estimated_document_count()
+        return await self._collection.count_documents(query)
+
+    async def find_by_range(
+        self,
+        query: Dict,
+        sort_key: str = "_id",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False,
+        filter_dict: Optional[Dict] = None,
+    ):
+        """
+        :return: List of Documents, cursor of the next page (None on the last page)
+        """
+        projection, strip = pagination.range_projection(filter_dict, sort_key)
+        range_query = pagination.range_query(query, sort_key, pagination.decode_range_cursor(cursor), descending)
+        documents = await (
+            self._collection.find(range_query, projection)
+            .sort(pagination.range_sort(sort_key, descending))
+            .limit(limit)
+            .to_list(length=None)
+        )
+        return pagination.range_page(documents, sort_key, limit, strip)
+
+    async def update_one(self, query: Dict, data: Dict, upsert: bool = False):
+        response = await self._collection.update_one(query, {"$set": data}, upsert=upsert)
+        return response.modified_count
+
+    async def update_to_set(self, query: Dict, param: str, data: Dict, upsert: bool = False):
+        response = await self._collection.update_one(query, {"$addToSet": {param: data}}, upsert=upsert)
+        return response.modified_count
+
+    async def update_many(self, query: Dict, data: Dict, upsert: bool = False):
+        response = await self._collection.update_many(filter=query, update={"$set": data}, upsert=upsert)
+        return response.modified_count
+
+    async def delete_many(self, query: Dict):
+        if self.soft_delete:
+            return await AsyncSoftDeleteEngine(self._collection, self.database, self.collection).delete_many(query)
+        response = await self._collection.delete_many(query)
+        return response.deleted_count
+
+    async def delete_one(self, query: Dict):
+        if self.soft_delete:
+            return await AsyncSoftDeleteEngine(self._collection, self.database, self.collection).delete_one(query)
+        response = await self._collection.delete_one(query)
+        return response.deleted_count
+
+    async def distinct(self, query_key: str, filter_json: Optional[Dict] = None):
+        return await self._collection.distinct(query_key, filter_json)
+
+    def aggregate(
+        self,
+        pipelines: List,
+    ):
+        return self._collection.aggregate(pipelines)
+
+    async def upsert_document(self, query_condition, records_to_insert):
+        result = await self._collection.update_one(query_condition, {"$set": records_to_insert}, upsert=True)
+        return result.modified_count
+
+    async def fetch_records_from_object(self, body):
+        """
+        :param body: Motor cursor
+        :return: List of documents
+        """
+        try:
+            return await body.to_list(length=None)
+        except Exception as e:
+            status_message = "could not fetch records from object", str(e)
+            logger.exception(status_message)
+            raise e
+
+
+class AsyncMongoAggregateBaseClass:
+    def __init__(
+        self,
+        mongo_client,
+        database,
+    ):
+        self.client = mongo_client
+        self.database = database
+
+    def aggregate(
+        self,
+        collection,
+        pipelines: List,
+    ):
+        return self.client[self.database][collection].aggregate(pipelines)
+
+
+async_mongo_client = AsyncMongoConnect(uri=DBConf.MONGO_URI)()
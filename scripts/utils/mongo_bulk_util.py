@@ -0,0 +1,220 @@
+from typing import Dict, List, Optional
+
+from bson import json_util
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from scripts.config.app_configurations import MongoConf
+from scripts.logging.logging import logger
+from scripts.utils.mongo_soft_delete_util import SoftDeleteEngine
+
+
+class MongoBulkOperations:
+    """
+    Builder of mixed insert, update, upsert and delete operations on one collection,
+    executed with unordered bulk_write in chunks of `chunk_size`, one round-trip per chunk.
+
+    With a SoftDeleteEngine (soft delete on), the deletes go through the engine instead of the bulk write, so
+    every deleted document is archived first. Writes and deletes keep their queue order: a chunk is split into
+    runs of consecutive writes (one bulk_write each) and of consecutive deletes. The delete_one filters of a
+    run are resolved to distinct _ids in one aggregate, _id equality filters without a read, and all of them
+    archived and deleted together; the delete_many of a run go through one engine delete_many. Each
+    delete_one removes the document sequential calls would leave it, so two delete_one with the same filter
+    remove two documents, and one matching nothing deletes nothing.
+    """
+
+    def __init__(self, collection, soft_delete: Optional[SoftDeleteEngine] = None, chunk_size: int = None):
+        """
+        :param collection: pymongo Collection
+        :param soft_delete: Engine archiving deleted documents to the deleted__ database, None to hard delete
+        :param chunk_size: Operations per bulk_write, MongoConf.bulk_chunk_size by default
+        """
+        self.collection = collection
+        self.soft_delete = soft_delete
+        self.chunk_size = chunk_size or MongoConf.bulk_chunk_size
+        # (operation, filter of the deletes) in queue order
+        self.operations = []
+        # called once every chunk is written, e.g. to drop cached reads of the collection
+        self.after_execute = None
+
+    def __len__(self):
+        return len(self.operations)
+
+    def insert_one(self, data: Dict):
+        self.operations.append((InsertOne(data), None))
+        return self
+
+    def update_one(self, query: Dict, data: Dict, upsert: bool = False):
+        self.operations.append((UpdateOne(query, {"$set": data}, upsert=upsert), None))
+        return self
+
+    def update_many(self, query: Dict, data: Dict, upsert: bool = False):
+        self.operations.append((UpdateMany(query, {"$set": data}, upsert=upsert), None))
+        return self
+
+    def update_to_set(self, query: Dict, param: str, data: Dict, upsert: bool = False):
+        self.operations.append((UpdateOne(query, {"$addToSet": {param: data}}, upsert=upsert), None))
+        return self
+
+    def upsert_document(self, query_condition: Dict, records_to_insert: Dict):
+        return self.update_one(query_condition, records_to_insert, upsert=True)
+
+    def delete_one(self, query: Dict):
+        self.operations.append((DeleteOne(query), query))
+        return self
+
+    def delete_many(self, query: Dict):
+        self.operations.append((DeleteMany(query), query))
+        return self
+
+    def execute(self) -> Dict:
+        """
+        Writes every queued operation and clears the queue.
+        A failing operation does not stop the others (unordered writes).
+
+        :return: Aggregated counts, upserted ids by operation index and per operation errors
+        """
+        operations, self.operations = self.operations, []
+        result = {
+            "inserted": 0,
+            "matched": 0,
+            "modified": 0,
+            "upserted": 0,
+            "deleted": 0,
+            "upserted_ids": {},
+            "errors": [],
+        }
+        try:
+            for offset in range(0, len(operations), self.chunk_size):
+                for deletes, run in self._runs(operations[offset: offset + self.chunk_size], offset):
+                    if deletes:
+                        self._soft_delete(run, result)
+                    else:
+                        self._write_chunk(run, result)
+        finally:
+            if self.after_execute is not None:
+                self.after_execute()
+        if result["errors"]:
+            logger.error(f"Bulk write on {self.collection.name}: {len(result['errors'])} of "
+                         f"{len(operations)} operations failed")
+        return result
+
+    def _runs(self, chunk: List, offset: int):
+        """
+        Consecutive soft deletes and consecutive writes of a chunk, in queue order.
+
+        :return: (is a delete run, [(index, operation, filter of the deletes)])
+        """
+        runs = []
+        for index, (operation, query) in enumerate(chunk, offset):
+            deletes = self.soft_delete is not None and query is not None
+            if not runs or runs[-1][0] != deletes:
+                runs.append((deletes, []))
+            runs[-1][1].append((index, operation, query))
+        return runs
+
+    @staticmethod
+    def _error(index: int, operation, code, message) -> Dict:
+        return {"index": index, "operation": type(operation).__name__, "code": code, "message": message}
+
+    def _errors(self, result: Dict, deletes: List, error: PyMongoError):
+        result["errors"].extend(self._error(index, operation, getattr(error, "code", None), str(error))
+                                for index, operation, _ in deletes)
+
+    @staticmethod
+    def _id_equality(query: Dict) -> bool:
+        if set(query) != {"_id"}:
+            return False
+        value = query["_id"]
+        return not (isinstance(value, dict) and any(str(key).startswith("$") for key in value))
+
+    def _soft_delete(self, deletes: List, result: Dict):
+        many = [delete for delete in deletes if isinstance(delete[1], DeleteMany)]
+        ones = []
+        for index, operation, query in deletes:
+            if isinstance(operation, DeleteMany):
+                continue
+            # a delete_one queued after a delete_many can only delete what that delete_many left
+            earlier = [many_query for many_index, _, many_query in many if many_index < index]
+            ones.append((index, operation, {"$and": [query, {"$nor": earlier}]} if earlier else query))
+        pinned = self._pin(ones, result) if ones else []
+        if many:
+            queries = [query for _, _, query in many]
+            try:
+                result["deleted"] += self.soft_delete.delete_many(queries[0] if len(queries) == 1
+                                                                  else {"$or": queries})
+            except PyMongoError as e:
+                self._errors(result, many, e)
+        if not pinned:
+            return
+        try:
+            result["deleted"] += self.soft_delete.archive_and_delete([_id for _, _id in pinned])
+        except PyMongoError as e:
+            self._errors(result, [(index, operation, None) for (index, operation, _), _ in pinned], e)
+
+    def _pin(self, ones: List, result: Dict) -> List:
+        """
+        Distinct _id of each delete_one, in queue order, skipping the filters matching nothing.
+        Filters other than _id equality are read in one aggregate, up to as many documents per filter
+        as it has delete_one.
+
+        :return: [((index, operation, filter), _id)]
+        """
+        keys = [None if self._id_equality(query) else json_util.dumps(query, sort_keys=True) for _, _, query in ones]
+        resolve = {}
+        for key, (_, _, query) in zip(keys, ones):
+            if key is not None:
+                resolve.setdefault(key, [query, 0])[1] += 1
+        candidates, matched = {}, {}
+        if resolve:
+            facets = {
+                f"f{position}": [{"$match": query}, {"$limit": limit}, {"$project": {"_id": 1}}]
+                for position, (query, limit) in enumerate(resolve.values())
+            }
+            # the top level $match can use indexes, the $facet sub-pipelines cannot
+            pipeline = [{"$match": {"$or": [query for query, _ in resolve.values()]}}, {"$facet": facets}]
+            try:
+                matched = next(iter(self.collection.aggregate(pipeline)), {})
+            except PyMongoError as e:
+                self._errors(result, [one for key, one in zip(keys, ones) if key is not None], e)
+                matched = None
+            for position, key in enumerate(resolve):
+                candidates[key] = [document["_id"] for document in (matched or {}).get(f"f{position}", [])]
+        pinned, pinned_ids = [], []
+        for key, one in zip(keys, ones):
+            query = one[2]
+            if key is not None and matched is None:
+                continue
+            found = [query["_id"]] if key is None else candidates[key]
+            _id = next((_id for _id in found if _id not in pinned_ids), None)
+            if _id is None and key is not None and len(found) == resolve[key][1]:
+                # every candidate was taken by an overlapping filter, more documents may match
+                try:
+                    document = self.collection.find_one({"$and": [query, {"_id": {"$nin": pinned_ids}}]},
+                                                        {"_id": 1})
+                except PyMongoError as e:
+                    self._errors(result, [one], e)
+                    continue
+                _id = document and document["_id"]
+            if _id is not None:
+                pinned_ids.append(_id)
+                pinned.append((one, _id))
+        return pinned
+
+    def _write_chunk(self, writes: List, result: Dict):
+        chunk = [operation for _, operation, _ in writes]
+        try:
+            response = self.collection.bulk_write(chunk, ordered=False)
+            counts = response.bulk_api_result
+        except BulkWriteError as e:
+            counts = e.details
+            for error in counts.get("writeErrors", []):
+                index, operation, _ = writes[error["index"]]
+                result["errors"].append(self._error(index, operation, error.get("code"), error.get("errmsg")))
+        result["inserted"] += counts.get("nInserted", 0)
+        result["matched"] += counts.get("nMatched", 0)
+        result["modified"] += counts.get("nModified", 0)
+        result["upserted"] += counts.get("nUpserted", 0)
+        result["deleted"] += counts.get("nRemoved", 0)
+        for upserted in counts.get("upserted", []):
+            result["upserted_ids"][writes[upserted["index"]][0]] = upserted["_id"]
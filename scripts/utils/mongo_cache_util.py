@@ -0,0 +1,271 @@
+import copy
+import threading
+from typing import Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import OperationFailure, PyMongoError
+
+from scripts.config.app_configurations import MongoConf
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+from scripts.utils.mongo_util import MongoCollectionBaseClass
+
+# server codes of a deployment without change streams (standalone server, or not allowed on the database)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324, 13, 73}
+_MISSING = object()
+
+
+class MongoReadCache:
+    """
+    Process wide cache of Mongo reads, one LRU per (database, collection), each with its own size limit.
+
+    While a database is watched through a change stream, any change to a collection drops the cached reads of
+    that collection only, and entries otherwise live `watch_ttl` seconds. Where change streams are unavailable
+    (standalone server, missing privileges) or the stream is reconnecting, entries expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = MongoConf.read_cache_size,
+        ttl: float = MongoConf.read_cache_ttl,
+        watch_ttl: float = MongoConf.read_cache_watch_ttl,
+        retry_interval: float = 5,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.watch_ttl = watch_ttl
+        self.retry_interval = retry_interval
+        self.caches = {}
+        self._generations = {}
+        self._watchers = {}
+        self._watching = set()
+        self._unsupported = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.invalidations = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        return json_util.dumps(parts, sort_keys=True)
+
+    def collection_cache(self, database: str, collection: str, maxsize: Optional[int] = None) -> LRUCache:
+        cache = self.caches.get((database, collection))
+        if cache is None:
+            with self._lock:
+                cache = self.caches.setdefault((database, collection), LRUCache(maxsize=maxsize or self.maxsize))
+        return cache
+
+    def generation(self, database: str, collection: str) -> int:
+        return self._generations.get((database, collection), 0)
+
+    def get(self, database: str, collection: str, key: str, default=_MISSING):
+        cache = self.caches.get((database, collection))
+        return default if cache is None else cache.get(key, default)
+
+    def set(self, database: str, collection: str, key: str, value, generation: int, maxsize: Optional[int] = None):
+        """
+        Stores a read, unless the collection changed since `generation` was taken before the read.
+        """
+        cache = self.collection_cache(database, collection, maxsize)
+        ttl = self.watch_ttl if database in self._watching else self.ttl
+        with self._lock:
+            if self.generation(database, collection) == generation:
+                cache.set(key, value, ttl=ttl)
+
+    def invalidate(self, database: str, collection: Optional[str] = None):
+        """
+        Drops the cached reads of a collection, or of every collection of the database when collection is None.
+        """
+        with self._lock:
+            targets = [ns for ns in self.caches if ns[0] == database and collection in (None, ns[1])]
+            if collection is not None and (database, collection) not in targets:
+                targets.append((database, collection))
+            for ns in targets:
+                self._generations[ns] = self._generations.get(ns, 0) + 1
+                if ns in self.caches:
+                    self.caches[ns].clear()
+            self.invalidations += 1
+
+    def watch(self, client, database: str):
+        """
+        Starts the change stream watcher of a database, once per process.
+        """
+        if database in self._watchers or database in self._unsupported or not self.watch_ttl:
+            return
+        with self._lock:
+            if database in self._watchers:
+                return
+            self._stop.clear()
+            watcher = threading.Thread(target=self._watch_loop, args=(client, database),
+                                       name=f"mongo-read-cache-{database}", daemon=True)
+            self._watchers[database] = watcher
+        watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            self._watchers.clear()
+            self._watching.clear()
+
+    def stats(self) -> dict:
+        return {
+            "collections": {f"{database}.{collection}": cache.stats()
+                            for (database, collection), cache in list(self.caches.items())},
+            "watching": sorted(self._watching),
+            "ttl_fallback": sorted(self._unsupported),
+            "invalidations": self.invalidations,
+        }
+
+    def _watch_loop(self, client, database: str):
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                with client[database].watch(resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    self._watching.add(database)
+                    # changes made before the stream opened are not in it
+                    self.invalidate(database)
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        resume_token = stream.resume_token
+                        if change is not None:
+                            self._on_change(database, change)
+                            if change.get("operationType") == "invalidate":
+                                resume_token = None
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.info(f"Change streams unavailable on {database}, Mongo read cache falls back to "
+                                f"a {self.ttl}s TTL: {e}")
+                    self._unsupported.add(database)
+                    break
+                logger.warning(f"Mongo read cache watcher of {database} failed: {e}")
+                resume_token = None
+            except PyMongoError as e:
+                logger.warning(f"Mongo read cache watcher of {database} disconnected: {e}")
+            finally:
+                # events may be missed until the stream is back, cached reads can no longer be trusted
+                self._watching.discard(database)
+                self.invalidate(database)
+            self._stop.wait(self.retry_interval)
+        with self._lock:
+            if self._watchers.get(database) is threading.current_thread():
+                self._watchers.pop(database)
+
+    def _on_change(self, database: str, change: Dict):
+        collection = change.get("ns", {}).get("coll")
+        if collection is None:
+            # dropDatabase and invalidate events name no collection
+            self.invalidate(database)
+            return
+        self.invalidate(database, collection)
+        if change.get("operationType") == "rename":
+            self.invalidate(database, change["to"]["coll"])
+
+
+read_cache = MongoReadCache()
+
+
+class CachedMongoCollectionBaseClass(MongoCollectionBaseClass):
+    """
+    Read-through cache over MongoCollectionBaseClass for mostly static metadata (project info, tag metadata,
+    line definitions). find_one and find results are served from read_cache, keyed by (database, collection,
+    query, projection, sort, skip, limit), and returned as copies, so callers may modify them. find returns a
+    list instead of a cursor.
+
+    Writes through this class drop the collection's cached reads at once, writes from elsewhere are picked up
+    by the change stream watcher, or after the TTL without change streams.
+    """
+
+    def __init__(
+        self,
+        mongo_client,
+        database,
+        collection,
+        cache_size: Optional[int] = None,
+        **kwargs,
+    ):
+        """
+        :param cache_size: Maximum cached reads of this collection, MONGO_DB.read_cache_size by default
+        """
+        super().__init__(mongo_client, database, collection, **kwargs)
+        self.cache_size = cache_size
+
+    def _cached(self, key: str, read):
+        read_cache.watch(self.client, self.database)
+        value = read_cache.get(self.database, self.collection, key)
+        if value is _MISSING:
+            generation = read_cache.generation(self.database, self.collection)
+            value = read()
+            read_cache.set(self.database, self.collection, key, value, generation, self.cache_size)
+        return copy.deepcopy(value)
+
+    def find_one(self, query: Dict, filter_dict: Optional[Dict] = None):
+        key = read_cache.key("find_one", query, filter_dict)
+        return self._cached(key, lambda: super(CachedMongoCollectionBaseClass, self).find_one(query, filter_dict))
+
+    def find(
+        self,
+        query: Dict,
+        filter_dict: Optional[Dict] = None,
+        sort=None,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = None,
+    ) -> List:
+        key = read_cache.key("find", query, filter_dict, sort, skip, limit)
+        return self._cached(key, lambda: list(super(CachedMongoCollectionBaseClass, self).find(
+            query, filter_dict, sort, skip, limit)))
+
+    def invalidate(self):
+        read_cache.invalidate(self.database, self.collection)
+
+    def bulk_operations(self, chunk_size: Optional[int] = None):
+        bulk = super().bulk_operations(chunk_size)
+        bulk.after_execute = self.invalidate
+        return bulk
+
+    def insert_one(self, data: Dict):
+        try:
+            return super().insert_one(data)
+        finally:
+            self.invalidate()
+
+    def insert_many(self, data: List):
+        try:
+            return super().insert_many(data)
+        finally:
+            self.invalidate()
+
+    def update_one(self, query: Dict, data: Dict, upsert: bool = False):
+        try:
+            return super().update_one(query, data, upsert)
+        finally:
+            self.invalidate()
+
+    def update_to_set(self, query: Dict, param: str, data: Dict, upsert: bool = False):
+        try:
+            return super().update_to_set(query, param, data, upsert)
+        finally:
+            self.invalidate()
+
+    def update_many(self, query: Dict, data: Dict, upsert: bool = False):
+        try:
+            return super().update_many(query, data, upsert)
+        finally:
+            self.invalidate()
+
+    def delete_many(self, query: Dict):
+        try:
+            return super().delete_many(query)
+        finally:
+            self.invalidate()
+
+    def delete_one(self, query: Dict):
+        try:
+            return super().delete_one(query)
+        finally:
+            self.invalidate()
+
+    def upsert_document(self, query_condition, records_to_insert):
+        try:
+            return super().upsert_document(query_condition, records_to_insert)
+        finally:
+            self.invalidate()
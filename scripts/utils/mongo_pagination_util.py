@@ -0,0 +1,177 @@
+"""
+Total counts and range (cursor) paging shared by MongoCollectionBaseClass and AsyncMongoCollectionBaseClass.
+
+A range page continues after the sort key (and _id) of the last document of the previous page, so with an
+index on the sort key page N costs the same as page 1, instead of the server walking every skipped document.
+"""
+import base64
+import json
+from typing import Dict, List, Optional, Tuple
+
+from bson import json_util
+
+from scripts.config.app_configurations import MongoConf
+from scripts.utils.cache_util import LRUCache
+
+count_cache = LRUCache(maxsize=MongoConf.count_cache_size, ttl=MongoConf.count_cache_ttl)
+
+
+class MongoCountMode:
+    none = None
+    # count_documents, a scan of the matching set
+    exact = "exact"
+    # page and count in one aggregation round trip
+    facet = "facet"
+    # collection metadata when the query is empty, exact otherwise
+    estimated = "estimated"
+    # estimated, kept in count_cache for MONGO_DB.count_cache_ttl seconds
+    cached = "cached"
+
+
+def count_key(database: str, collection: str, query: Dict) -> Tuple[str, str, str]:
+    return database, collection, json_util.dumps(query, sort_keys=True)
+
+
+def facet_pipeline(query: Dict, filter_dict: Optional[Dict] = None, sort=None, skip: int = 0,
+                   limit: Optional[int] = None) -> List:
+    """
+    Page and total of the same $match in one aggregation. The page is returned inside a single result
+    document, so it must stay under the 16MB document limit.
+    """
+    page = []
+    if sort:
+        page.append({"$sort": dict(sort)})
+    if skip:
+        page.append({"$skip": skip})
+    if limit:
+        page.append({"$limit": limit})
+    if filter_dict:
+        page.append({"$project": filter_dict})
+    return [
+        {"$match": query},
+        {"$facet": {"records": page or [{"$skip": 0}], "total": [{"$count": "count"}]}},
+    ]
+
+
+def facet_result(documents: List) -> Tuple[List, int]:
+    result = documents[0] if documents else {}
+    total = result.get("total") or [{"count": 0}]
+    return result.get("records", []), total[0]["count"]
+
+
+def encode_range_cursor(key_values: List) -> str:
+    """
+    Extended JSON keeps ObjectId and datetime keys typed across the round trip through the client.
+    """
+    payload = json_util.dumps(key_values, json_options=json_util.RELAXED_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_range_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {e}") from e
+
+
+def range_sort(sort_key: str, descending: bool = False) -> List:
+    direction = -1 if descending else 1
+    if sort_key == "_id":
+        return [("_id", direction)]
+    # _id breaks ties between equal sort keys, so no document is skipped or repeated across pages
+    return [(sort_key, direction), ("_id", direction)]
+
+
+def range_query(query: Dict, sort_key: str, after: Optional[List], descending: bool = False) -> Dict:
+    if after is None:
+        return query
+    operator = "$lt" if descending else "$gt"
+    if sort_key == "_id":
+        condition = {"_id": {operator: after[0]}}
+    elif after[0] is None:
+        # null and missing keys sort before every other value, and $gt/$lt never match across types
+        ties = {sort_key: None, "_id": {operator: after[1]}}
+        condition = ties if descending else {"$or": [ties, {sort_key: {"$ne": None}}]}
+    else:
+        clauses = [
+            {sort_key: {operator: after[0]}},
+            {sort_key: after[0], "_id": {operator: after[1]}},
+        ]
+        if descending:
+            clauses.append({sort_key: None})
+        condition = {"$or": clauses}
+    return {"$and": [query, condition]} if query else condition
+
+
+def covers(name: str, key: str) -> bool:
+    """
+    Whether projecting field `name` projects `key`, itself or a parent of a dotted key.
+    """
+    return key == name or key.startswith(f"{name}.")
+
+
+def range_projection(filter_dict: Optional[Dict], sort_key: str) -> Tuple[Optional[Dict], set]:
+    """
+    Projection that keeps the cursor keys, and the keys to strip again from the returned documents.
+    """
+    keys = {sort_key, "_id"}
+    if filter_dict is None:
+        filter_dict = {"_id": 0}
+    inclusive = any(value and name != "_id" for name, value in filter_dict.items())
+    if inclusive:
+        strip = {key for key in keys
+                 if not any(value and covers(name, key) for name, value in filter_dict.items())
+                 and not (key == "_id" and "_id" not in filter_dict)}
+        # a key under an included parent is already projected, naming both is a path collision
+        added = {key: 1 for key in keys
+                 if not any(value and name != key and covers(name, key) for name, value in filter_dict.items())}
+        return {**filter_dict, **added}, strip
+    # an excluded parent of a dotted sort key is fetched and stripped as a whole
+    strip = {name for name in filter_dict if any(covers(name, key) for key in keys)}
+    projection = {name: value for name, value in filter_dict.items() if name not in strip}
+    return projection or None, strip
+
+
+def key_value(document: Dict, path: str):
+    """
+    Value of a dotted path such as "meta.created_at" in a nested document, None when missing.
+    """
+    value = document
+    for name in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def pop_key(document: Dict, path: str):
+    """
+    Removes a dotted path from a nested document, and the parents it leaves empty.
+    """
+    name, _, rest = path.partition(".")
+    if not rest:
+        document.pop(name, None)
+        return
+    child = document.get(name)
+    if isinstance(child, dict):
+        pop_key(child, rest)
+        if not child:
+            document.pop(name)
+
+
+def range_page(documents: List, sort_key: str, limit: int, strip: set) -> Tuple[List, Optional[str]]:
+    """
+    :return: (documents, cursor of the next page or None on the last page)
+    """
+    next_cursor = None
+    if limit and len(documents) == limit:
+        last = documents[-1]
+        keys = [last["_id"]] if sort_key == "_id" else [key_value(last, sort_key), last["_id"]]
+        next_cursor = encode_range_cursor(keys)
+    if strip:
+        for document in documents:
+            for key in strip:
+                pop_key(document, key)
+    return documents, next_cursor
@@ -0,0 +1,263 @@
+"""
+Explain based profiling and result caching of aggregation pipelines run through ProfiledMongoAggregateBaseClass.
+
+Pipelines are grouped by fingerprint, the pipeline shape with its literal values masked, so the same dashboard
+query with different filter values is profiled as one pipeline.
+"""
+import copy
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import bson
+from bson import json_util
+
+from scripts.config.app_configurations import MongoConf
+from scripts.logging.logging import logger
+from scripts.utils.cache_util import LRUCache
+from scripts.utils.mongo_util import MongoAggregateBaseClass
+
+# stages that write, explain with executionStats would run the write
+WRITE_STAGES = {"$out", "$merge"}
+
+
+def pipeline_shape(value):
+    """
+    Pipeline with literal values replaced by "?", keeping operators and $field paths.
+    """
+    if isinstance(value, dict):
+        return {key: pipeline_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [pipeline_shape(item) for item in value]
+        # $in lists of any length have the same shape
+        return shapes[:1] if shapes and all(shape == "?" for shape in shapes) else shapes
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def fingerprint(database: str, collection: str, pipeline: List) -> str:
+    payload = json_util.dumps([database, collection, pipeline_shape(pipeline)])
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def explain_summary(explain: Dict) -> Dict:
+    """
+    Pipeline stages, plan stages, indexes and document counts from an executionStats explain, whether the
+    pipeline ran as a $cursor stage, was pushed down entirely, or ran on shards.
+    """
+    summary = {
+        "stages": [],
+        "plan_stages": [],
+        "indexes": [],
+        "docs_examined": 0,
+        "keys_examined": 0,
+        "returned": None,
+        "execution_ms": None,
+    }
+
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        stats = node.get("executionStats")
+        if isinstance(stats, dict):
+            summary["docs_examined"] += stats.get("totalDocsExamined", 0)
+            summary["keys_examined"] += stats.get("totalKeysExamined", 0)
+            summary["execution_ms"] = max(summary["execution_ms"] or 0, stats.get("executionTimeMillis", 0))
+            if summary["returned"] is None:
+                summary["returned"] = stats.get("nReturned")
+        if isinstance(node.get("stage"), str) and node["stage"] not in summary["plan_stages"]:
+            summary["plan_stages"].append(node["stage"])
+        if node.get("indexName") and node["indexName"] not in summary["indexes"]:
+            summary["indexes"].append(node["indexName"])
+        for key, item in node.items():
+            if key != "executionStats" or not isinstance(item, dict):
+                walk(item)
+            else:
+                walk(item.get("executionStages"))
+
+    for stage in explain.get("stages", []):
+        summary["stages"].extend(key for key in stage if key.startswith("$"))
+        # the last stage to report nReturned is the pipeline's output
+        if "nReturned" in stage:
+            summary["returned"] = stage["nReturned"]
+    walk(explain)
+    summary["collscan"] = "COLLSCAN" in summary["plan_stages"]
+    return summary
+
+
+class PipelineStats:
+    def __init__(self, database: str, collection: str, shape: List):
+        self.database = database
+        self.collection = collection
+        self.shape = shape
+        self.calls = 0
+        self.cache_hits = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.explain = None
+        self.explained_at = None
+
+    def to_dict(self, key: str) -> Dict:
+        executed = self.calls - self.cache_hits
+        return {
+            "fingerprint": key,
+            "database": self.database,
+            "collection": self.collection,
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "mean_ms": round(self.total_ms / executed, 2) if executed else None,
+            "max_ms": round(self.max_ms, 2),
+            "explain": self.explain,
+            "pipeline": self.shape,
+        }
+
+
+class PipelineProfiler:
+    """
+    Per fingerprint call counts, timings and the summary of an executionStats explain.
+    Explain executes the pipeline again, so it runs off the request path on a single worker, on the first call
+    of a fingerprint and then at most every `explain_interval` seconds. COLLSCAN plans are logged when found.
+    """
+
+    def __init__(
+        self,
+        max_pipelines: int = MongoConf.profile_max_pipelines,
+        explain_interval: float = MongoConf.profile_explain_interval,
+    ):
+        self.pipelines = LRUCache(maxsize=max_pipelines)
+        self.explain_interval = explain_interval
+        self._lock = threading.Lock()
+        self._explaining = set()
+        self._executor = None
+
+    def record(self, key: str, database: str, collection: str, pipeline: List, elapsed_ms: Optional[float]):
+        """
+        :param elapsed_ms: Time of the call, None for a cache hit
+        :return: The stats when an explain is due, to be passed to explain
+        """
+        with self._lock:
+            stats = self.pipelines.get(key, count=False)
+            if stats is None:
+                stats = PipelineStats(database, collection, pipeline_shape(pipeline))
+                self.pipelines.set(key, stats)
+            stats.calls += 1
+            if elapsed_ms is None:
+                stats.cache_hits += 1
+            else:
+                stats.total_ms += elapsed_ms
+                stats.max_ms = max(stats.max_ms, elapsed_ms)
+            due = stats.explained_at is None or time.monotonic() - stats.explained_at >= self.explain_interval
+            if not due or key in self._explaining:
+                return
+            if any(stage_name in WRITE_STAGES for stage in pipeline for stage_name in stage):
+                return
+            self._explaining.add(key)
+            stats.explained_at = time.monotonic()
+        return stats
+
+    def explain(self, client, key: str, stats: PipelineStats, pipeline: List):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongo-pipeline-explain")
+        self._executor.submit(self._explain, client, key, stats, pipeline)
+
+    def report(self, limit: int = 20, sort_by: str = "mean_ms", collscan_only: bool = False) -> List[Dict]:
+        """
+        :param sort_by: mean_ms, max_ms, calls or docs_examined
+        :return: Slowest pipelines first
+        """
+        rows = []
+        for key in self.pipelines.keys():
+            stats = self.pipelines.get(key, count=False)
+            if stats is not None:
+                rows.append(stats.to_dict(key))
+        if collscan_only:
+            rows = [row for row in rows if row["explain"] and row["explain"]["collscan"]]
+        if sort_by == "docs_examined":
+            rows.sort(key=lambda row: (row["explain"] or {}).get("docs_examined", 0), reverse=True)
+        else:
+            rows.sort(key=lambda row: row.get(sort_by) or 0, reverse=True)
+        return rows[:limit]
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _explain(self, client, key: str, stats: PipelineStats, pipeline: List):
+        try:
+            explain = client[stats.database].command(
+                {"explain": {"aggregate": stats.collection, "pipeline": pipeline, "cursor": {}},
+                 "verbosity": "executionStats"})
+            stats.explain = explain_summary(explain)
+            if stats.explain["collscan"]:
+                logger.warning(f"Pipeline {key} on {stats.database}.{stats.collection} scans the collection: "
+                               f"{stats.explain['docs_examined']} documents examined for "
+                               f"{stats.explain['returned']} returned")
+        except Exception as e:
+            logger.warning(f"Failed to explain pipeline {key} on {stats.database}.{stats.collection}: {e}")
+        finally:
+            with self._lock:
+                self._explaining.discard(key)
+
+
+def result_size(documents: List) -> int:
+    return sum(len(bson.encode(document)) for document in documents)
+
+
+pipeline_profiler = PipelineProfiler()
+pipeline_result_cache = LRUCache(
+    maxsize=MongoConf.pipeline_cache_size,
+    ttl=MongoConf.pipeline_cache_ttl,
+    maxbytes=MongoConf.pipeline_cache_bytes,
+    sizeof=result_size,
+)
+
+
+class ProfiledMongoAggregateBaseClass(MongoAggregateBaseClass):
+    """
+    Opt-in MongoAggregateBaseClass that profiles every pipeline in pipeline_profiler and caches the results of
+    pipelines marked cacheable, within the MONGO_DB.pipeline_cache_bytes memory cap.
+    """
+
+    def aggregate(
+        self,
+        collection,
+        pipelines: List,
+        cacheable: bool = False,
+        ttl: Optional[float] = None,
+    ):
+        """
+        :param cacheable: Serve repeat runs of the same pipeline from pipeline_result_cache,
+                          the results are then returned as a list instead of a cursor
+        :param ttl: Seconds a cacheable result is kept, MONGO_DB.pipeline_cache_ttl by default
+        """
+        key = fingerprint(self.database, collection, pipelines)
+        documents = None
+        if cacheable:
+            result_key = json_util.dumps([self.database, collection, pipelines])
+            documents = pipeline_result_cache.get(result_key)
+        if documents is not None:
+            response, elapsed_ms = copy.deepcopy(documents), None
+        else:
+            started = time.perf_counter()
+            response = super().aggregate(collection, pipelines)
+            if cacheable:
+                response = list(response)
+                pipeline_result_cache.set(result_key, response, ttl=ttl)
+            # for cursors this covers the command and first batch, the explain has the full server time
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if cacheable:
+                response = copy.deepcopy(response)
+        stats = pipeline_profiler.record(key, self.database, collection, pipelines, elapsed_ms)
+        if stats is not None:
+            pipeline_profiler.explain(self.client, key, stats, pipelines)
+        return response
@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import Dict, List
+
+import pytz
+
+from scripts.config.app_configurations import MongoConf, Timezone
+from scripts.logging.logging import logger
+
+
+def soft_delete_pipeline(query: Dict, database_name: str, collection_name: str) -> List:
+    """
+    Copies the documents matching query, stamped with the deletion time, into deleted__<database>.
+    """
+    return [
+        {"$match": query},
+        {"$addFields": {"deleted": {"on": datetime.now(pytz.timezone(Timezone.desired_time_zone))}}},
+        {
+            "$merge": {
+                "into": {
+                    "db": f"deleted__{database_name}",
+                    "coll": collection_name,
+                },
+            }
+        },
+    ]
+
+
+class SoftDeleteEngine:
+    """
+    Archive-then-delete by _id.
+
+    The _ids matching the query are read once from a cursor (index only, `{_id: 1}` projection) in batches
+    of `batch_size`. Each batch is archived with one $merge on `{_id: {$in: batch}}` and only then deleted by
+    the same _id list, so memory stays bounded by the batch and no document is deleted before its archive
+    copy is written. A document inserted after the snapshot is neither archived nor deleted.
+    """
+
+    def __init__(self, collection, database_name: str, collection_name: str,
+                 batch_size: int = MongoConf.soft_delete_batch_size):
+        """
+        :param collection: pymongo Collection
+        :param database_name: Database the archive name deleted__<database> is derived from
+        """
+        self.collection = collection
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+
+    def delete_many(self, query: Dict) -> int:
+        """
+        :return: Number of documents deleted
+        """
+        deleted, batch = 0, []
+        cursor = self.collection.find(query, {"_id": 1}).batch_size(self.batch_size)
+        try:
+            for document in cursor:
+                batch.append(document["_id"])
+                if len(batch) >= self.batch_size:
+                    deleted += self.archive_and_delete(batch)
+                    batch = []
+        finally:
+            cursor.close()
+        if batch:
+            deleted += self.archive_and_delete(batch)
+        return deleted
+
+    def delete_one(self, query: Dict) -> int:
+        document = self.collection.find_one(query, {"_id": 1})
+        if document is None:
+            return 0
+        return self.archive_and_delete([document["_id"]])
+
+    def archive_and_delete(self, ids: List) -> int:
+        query = {"_id": {"$in": ids}}
+        # the $merge stage writes while the command runs, there is no cursor to drain
+        self.collection.aggregate(soft_delete_pipeline(query, self.database_name, self.collection_name))
+        deleted = self.collection.delete_many(query).deleted_count
+        if deleted != len(ids):
+            logger.debug(f"{len(ids) - deleted} of {len(ids)} archived documents of {self.collection_name} "
+                         f"were already deleted")
+        return deleted
+
+
+class AsyncSoftDeleteEngine(SoftDeleteEngine):
+    """
+    SoftDeleteEngine on a Motor collection.
+    """
+
+    async def delete_many(self, query: Dict) -> int:
+        deleted, batch = 0, []
+        cursor = self.collection.find(query, {"_id": 1}).batch_size(self.batch_size)
+        try:
+            async for document in cursor:
+                batch.append(document["_id"])
+                if len(batch) >= self.batch_size:
+                    deleted += await self.archive_and_delete(batch)
+                    batch = []
+        finally:
+            await cursor.close()
+        if batch:
+            deleted += await self.archive_and_delete(batch)
+        return deleted
+
+    async def delete_one(self, query: Dict) -> int:
+        document = await self.collection.find_one(query, {"_id": 1})
+        if document is None:
+            return 0
+        return await self.archive_and_delete([document["_id"]])
+
+    async def archive_and_delete(self, ids: List) -> int:
+        query = {"_id": {"$in": ids}}
+        # Motor runs the aggregate command lazily, on the first fetch
+        await self.collection.aggregate(
+            soft_delete_pipeline(query, self.database_name, self.collection_name)).to_list(length=None)
+        return (await self.collection.delete_many(query)).deleted_count
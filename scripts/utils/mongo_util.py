@@ -1,21 +1,39 @@
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
-import pytz
+from typing import Dict, Iterator, List, Optional
+from bson import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from pymongo import MongoClient
 from pymongo.cursor import Cursor
-from scripts.config.app_configurations import DBConf, Timezone
+from scripts.config.app_configurations import DBConf, MongoConf
 from scripts.logging.logging import logger
 from scripts.utils.db_name_util import get_db_name
+from scripts.utils.mongo_bulk_util import MongoBulkOperations
+from scripts.utils import mongo_pagination_util as pagination
+from scripts.utils.mongo_pagination_util import MongoCountMode
+from scripts.utils.mongo_soft_delete_util import SoftDeleteEngine
 
 META_SOFT_DEL: bool = os.getenv("META_SOFT_DEL", True)
 
 
+def pool_options() -> Dict:
+    """
+    Connection pool settings from MongoConf, shared by the sync and async clients.
+    """
+    return {
+        "maxPoolSize": MongoConf.max_pool_size,
+        "minPoolSize": MongoConf.min_pool_size,
+        "maxIdleTimeMS": MongoConf.max_idle_time_ms,
+        "waitQueueTimeoutMS": MongoConf.wait_queue_timeout_ms,
+        "serverSelectionTimeoutMS": MongoConf.server_selection_timeout_ms,
+        "connectTimeoutMS": MongoConf.connect_timeout_ms,
+    }
+
+
 class MongoConnect:
     def __init__(self, uri):
         try:
             self.uri = uri
-            self.client = MongoClient(self.uri, connect=False)
+            self.client = MongoClient(self.uri, connect=False, **pool_options())
         except Exception:
             raise
 
@@ -66,7 +84,7 @@ class MongoCollectionBaseClass:
             db = self.client[database_name]
             collection = db[collection_name]
             response = collection.insert_one(data)
-            logger.qtrace(data)
+            logger.debug(data)
             return response.inserted_id
         except Exception:
             raise
@@ -83,7 +101,7 @@ class MongoCollectionBaseClass:
             db = self.client[database_name]
             collection = db[collection_name]
             response = collection.insert_many(data)
-            logger.qtrace(data)
+            logger.debug(data)
             return response.inserted_ids
         except Exception:
             raise
@@ -135,6 +153,53 @@ class MongoCollectionBaseClass:
         except Exception:
             raise
 
+    def find_iter(
+        self,
+        query: Dict,
+        filter_dict: Optional[Dict] = None,
+        fields: Optional[List[str]] = None,
+        sort=None,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = None,
+        batch_size: int = MongoConf.stream_batch_size,
+        chunk_size: Optional[int] = None,
+        raw: bool = False,
+        allow_disk_use: Optional[bool] = None,
+    ) -> Iterator:
+        """
+        Streams the documents of a query instead of collecting them, holding one server batch at a time.
+        :param filter_dict: Filter Dictionary
+        :param fields: Only these fields are sent by the server (without _id), takes precedence over filter_dict
+        :param batch_size: Documents per server round trip
+        :param chunk_size: Yield lists of up to chunk_size documents instead of single documents
+        :param raw: Yield RawBSONDocument, left undecoded until a field is read, e.g. for streaming_util.bson_response
+        :param allow_disk_use: Let a large server side sort spill to disk (MongoDB 4.4+)
+        :return: Generator of documents, or of lists of documents with chunk_size
+        """
+        if fields:
+            filter_dict = {**dict.fromkeys(fields, 1), "_id": 0}
+        elif filter_dict is None:
+            filter_dict = {"_id": 0}
+        collection = self.client[self.database][self.collection]
+        if raw:
+            collection = collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+        cursor = collection.find(query, filter_dict, skip=skip, limit=limit or 0, sort=sort or None,
+                                 batch_size=batch_size, allow_disk_use=allow_disk_use)
+        try:
+            if not chunk_size:
+                yield from cursor
+                return
+            chunk = []
+            for document in cursor:
+                chunk.append(document)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            cursor.close()
+
     def find_one(self, query: Dict, filter_dict: Optional[Dict] = None):
         try:
             database_name = self.database
@@ -157,6 +222,7 @@ class MongoCollectionBaseClass:
         sort=None,
         skip: Optional[int] = 0,
         limit: Optional[int] = None,
+        count_mode: Optional[str] = MongoCountMode.exact,
     ):
         """
         The function is used to query documents from a given collection in a Mongo Database
@@ -165,7 +231,9 @@ class MongoCollectionBaseClass:
         :param sort: List of tuple with key and direction. [(key, -1), ...]
         :param skip: Skip Number
         :param limit: Limit Number
-        :return: List of Documents
+        :param count_mode: MongoCountMode, how the total is computed: exact, facet (page and total in one
+                           aggregation, the page is then a list), estimated, cached or none
+        :return: List of Documents, total count
         """
         if sort is None:
             sort = []
@@ -178,7 +246,10 @@ class MongoCollectionBaseClass:
             db = self.client[database_name]
             collection = db[collection_name]
 
-            total_count = collection.count_documents(query)
+            if count_mode == MongoCountMode.facet:
+                pipeline = pagination.facet_pipeline(query, filter_dict, sort, skip, limit)
+                return pagination.facet_result(list(collection.aggregate(pipeline)))
+            total_count = self.count_documents(query, count_mode)
 
             if len(sort) > 0:
                 cursor = (
@@ -201,6 +272,54 @@ class MongoCollectionBaseClass:
         except Exception:
             raise
 
+    def count_documents(self, query: Dict, count_mode: Optional[str] = MongoCountMode.exact) -> Optional[int]:
+        """
+        :param count_mode: exact runs count_documents; estimated reads the collection metadata when the query is
+                           empty; cached is estimated, reused for MONGO_DB.count_cache_ttl seconds; none skips
+        :return: Number of documents matching query, None when count_mode is none
+        """
+        if count_mode is MongoCountMode.none:
+            return None
+        collection = self.client[self.database][self.collection]
+        if count_mode == MongoCountMode.cached:
+            key = pagination.count_key(self.database, self.collection, query)
+            total_count = pagination.count_cache.get(key)
+            if total_count is None:
+                total_count = self.count_documents(query, MongoCountMode.estimated)
+                pagination.count_cache.set(key, total_count)
+            return total_count
+        if count_mode == MongoCountMode.estimated and not query:
+            return collection.estimated_document_count()
+        return collection.count_documents(query)
+
+    def find_by_range(
+        self,
+        query: Dict,
+        sort_key: str = "_id",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False,
+        filter_dict: Optional[Dict] = None,
+    ):
+        """
+        Range paging: the next page starts after the sort key of the last document, which is an index seek
+        when sort_key (with _id) is indexed, at any depth.
+        :param sort_key: Field the pages are ordered by, _id breaks ties
+        :param cursor: Cursor returned with the previous page, None for the first page
+        :param limit: Page size
+        :param filter_dict: Filter Dictionary
+        :return: List of Documents, cursor of the next page (None on the last page)
+        """
+        projection, strip = pagination.range_projection(filter_dict, sort_key)
+        range_query = pagination.range_query(query, sort_key, pagination.decode_range_cursor(cursor), descending)
+        collection = self.client[self.database][self.collection]
+        documents = list(
+            collection.find(range_query, projection)
+            .sort(pagination.range_sort(sort_key, descending))
+            .limit(limit)
+        )
+        return pagination.range_page(documents, sort_key, limit, strip)
+
     def update_one(self, query: Dict, data: Dict, upsert: bool = False):
         """
 
@@ -270,19 +389,7 @@ class MongoCollectionBaseClass:
             db = self.client[database_name]
             collection = db[collection_name]
             if self.soft_delete:
-                soft_del_query = [
-                    {"$match": query},
-                    {"$addFields": {"deleted": {"on": datetime.now(pytz.timezone(Timezone.desired_time_zone))}}},
-                    {
-                        "$merge": {
-                            "into": {
-                                "db": f"deleted__{database_name}",
-                                "coll": collection_name,
-                            },
-                        }
-                    },
-                ]
-                collection.aggregate(soft_del_query)
+                return SoftDeleteEngine(collection, database_name, collection_name).delete_many(query)
             response = collection.delete_many(query)
             # logger.qtrace(query)
             return response.deleted_count
@@ -299,27 +406,29 @@ class MongoCollectionBaseClass:
             collection_name = self.collection
             db = self.client[database_name]
             collection = db[collection_name]
-            response = collection.delete_one(query)
             if self.soft_delete:
-                soft_del_query = [
-                    {"$match": query},
-                    {"$addFields": {"deleted": {"on": datetime.now(pytz.timezone(Timezone.desired_time_zone))}}},
-                    {
-                        "$merge": {
-                            "into": {
-                                "db": f"deleted__{database_name}",
-                                "coll": collection_name,
-                            },
-                        }
-                    },
-                ]
-                collection.aggregate(soft_del_query)
-
+                # archive first, the document is gone once deleted
+                return SoftDeleteEngine(collection, database_name, collection_name).delete_one(query)
+            response = collection.delete_one(query)
             # logger.qtrace(query)
             return response.deleted_count
         except Exception:
             raise
 
+    def bulk_operations(self, chunk_size: Optional[int] = None) -> MongoBulkOperations:
+        """
+        Builder to batch inserts, updates, upserts and deletes into unordered bulk writes,
+        e.g. bulk = collection.bulk_operations(); bulk.upsert_document(...); bulk.delete_one(...); bulk.execute()
+        Deletes are archived to deleted__<database> first, in _id batches, when soft delete is on.
+        :param chunk_size: Operations per bulk_write, MongoConf.bulk_chunk_size by default
+        :return: MongoBulkOperations bound to this collection
+        """
+        database_name = self.database
+        collection_name = self.collection
+        collection = self.client[database_name][collection_name]
+        soft_delete = SoftDeleteEngine(collection, database_name, collection_name) if self.soft_delete else None
+        return MongoBulkOperations(collection, soft_delete=soft_delete, chunk_size=chunk_size)
+
     def distinct(self, query_key: str, filter_json: Optional[Dict] = None):
         """
         :param query_key:
@@ -369,10 +478,8 @@ class MongoCollectionBaseClass:
         :param body:
         :return:
         """
-        final_list = []
         try:
-            for each in body:
-                final_list.append(each)
+            final_list = list(body)
         except Exception as e:
             status_message = "could not fetch records from object", str(e)
             logger.exception(status_message)
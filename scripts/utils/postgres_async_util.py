@@ -0,0 +1,275 @@
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from scripts.config.app_configurations import PostgresConf
+from scripts.db.psql import bulk_upsert, pagination
+from scripts.db.psql.pagination import CountMode
+from scripts.logging.logging import logger
+from scripts.utils.postgres_util import PostgresUtility
+
+
+class AsyncPostgresUtility:
+    """
+    PostgresUtility on an AsyncSession (asyncpg), for use from `async def` routes.
+    Same methods and return values, awaited.
+    """
+
+    def __init__(self, session, table):
+        self.session = session
+        self.table = table
+
+    fetch_records_from_object = PostgresUtility.fetch_records_from_object
+    fetch_record_from_object = PostgresUtility.fetch_record_from_object
+
+    def _filtered(self, statement, filters: dict = None):
+        return pagination.filtered(self.table, statement, filters)
+
+    async def find_all_data(self):
+        try:
+            data = (await self.session.execute(select(self.table))).scalars().all()
+            return self.fetch_records_from_object(data)
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch record: {fetch_error}")
+            return None
+
+    async def stream_rows(self, statement, fetch_size: int = PostgresConf.stream_fetch_size, chunks: bool = False):
+        """
+        Async generator over a server-side cursor, see PostgresUtility.stream_rows.
+        """
+        result = await self.session.stream(statement.execution_options(max_row_buffer=fetch_size))
+        try:
+            async for partition in result.mappings().partitions(fetch_size):
+                rows = [dict(row) for row in partition]
+                if chunks:
+                    yield rows
+                else:
+                    for row in rows:
+                        yield row
+        finally:
+            await result.close()
+
+    def iter_all_data(self, fetch_size: int = PostgresConf.stream_fetch_size, chunks: bool = False):
+        return self.stream_rows(select(*self.table.__table__.columns), fetch_size, chunks)
+
+    def iter_many_data_by_condition(self, filters: dict = None, columns: list = None, distinct_column: str = None,
+                                    fetch_size: int = PostgresConf.stream_fetch_size, chunks: bool = False):
+        selected = [getattr(self.table, col) for col in columns] if columns else self.table.__table__.columns
+        statement = self._filtered(select(*selected), filters)
+        if distinct_column:
+            statement = statement.distinct(getattr(self.table, distinct_column))
+        return self.stream_rows(statement, fetch_size, chunks)
+
+    async def iter_many_data_including_foreign_values(self, filters: dict = None, column_mappings={},
+                                                      fetch_size: int = PostgresConf.stream_fetch_size):
+        statement = self._filtered(select(*self.table.__table__.columns), filters)
+        async for row in self.stream_rows(statement, fetch_size):
+            if column_mappings:
+                row.update({label: row.get(value) for label, value in column_mappings.items() if value in row})
+            yield row
+
+    async def find_many_data_including_foreign_values(self, filters: dict = None, column_mappings={}):
+        try:
+            statement = self._filtered(select(*self.table.__table__.columns), filters)
+            data = (await self.session.execute(statement)).mappings().all()
+
+            # Process the data into the desired format
+            if column_mappings:
+                result = [
+                    {
+                        **dict(row),
+                        **{label: row.get(value, None) for label, value in column_mappings.items() if value in row}
+                    }
+                    for row in data
+                ]
+            else:
+                result = [{**dict(row)} for row in data]
+            return result
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch data: {fetch_error}")
+            raise fetch_error
+
+    async def find_data_by_pagination(self, query, count_query, column_mappings={}, page: int = 1,
+                                      page_size: int = 50):
+        try:
+            offset = (page - 1) * page_size
+            total_records = (await self.session.execute(text(count_query))).scalar()
+            data = (
+                await self.session.execute(text(query), {'page_size': page_size, 'offset': offset})
+            ).mappings().all()
+
+            if column_mappings:
+                result = [
+                    {**dict(row), **{label: row[value] for label, value in column_mappings.items()}}
+                    for row in data
+                ]
+            else:
+                result = [{**dict(row)} for row in data]
+
+            end_of_records = offset + page_size >= total_records
+            return result, end_of_records, total_records
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch data: {fetch_error}")
+            raise fetch_error
+
+    async def find_data_by_cursor(self, order_by: list, cursor: str = None, page_size: int = 50,
+                                  filters: dict = None, columns: list = None, column_mappings={},
+                                  descending: bool = False, count_mode: str = CountMode.none):
+        """
+        Keyset pagination, see PostgresUtility.find_data_by_cursor.
+        """
+        try:
+            window_total = count_mode == CountMode.window
+            statement, seen = pagination.keyset_statement(self.table, order_by, cursor, page_size, filters,
+                                                          columns, descending, window_total)
+            rows = (await self.session.execute(statement)).mappings().all()
+            result, next_cursor, total_records = pagination.keyset_page(rows, order_by, page_size, seen, columns,
+                                                                        column_mappings, window_total)
+            if count_mode == CountMode.exact:
+                total_records = (await self.session.execute(pagination.count_statement(self.table, filters))).scalar()
+            elif count_mode == CountMode.estimated:
+                total_records = await self.estimate_count(filters)
+            return result, next_cursor, total_records
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch data: {fetch_error}")
+            raise fetch_error
+
+    async def estimate_count(self, filters: dict = None) -> int:
+        if not filters:
+            estimate = (await self.session.execute(pagination.reltuples_statement(self.table))).scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+        sql, params = pagination.explain_sql(self.table, filters, self.session.bind.dialect)
+        connection = await self.session.connection()
+        plan = (await connection.exec_driver_sql(sql, params)).scalar()
+        return pagination.explain_rows(plan)
+
+    async def find_data_by_condition(self, filters: dict = None, columns: list = None):
+        """
+        Fetch a single record with dynamic filters.
+        """
+        try:
+            if columns:
+                statement = self._filtered(select(*[getattr(self.table, col) for col in columns]), filters)
+                record = (await self.session.execute(statement)).one_or_none()
+                return dict(zip(columns, record)) if record else None
+            statement = self._filtered(select(self.table), filters)
+            record = (await self.session.execute(statement)).scalars().one_or_none()
+            return self.fetch_record_from_object(record) if record else None
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch record: {fetch_error}")
+            return None
+
+    async def find_many_data_by_condition(
+            self, filters: dict = None, columns: list = None, distinct_column: str = None
+    ):
+        try:
+            if columns:
+                statement = select(*[getattr(self.table, col) for col in columns])
+            else:
+                statement = select(self.table)
+            statement = self._filtered(statement, filters)
+            if distinct_column:
+                statement = statement.distinct(getattr(self.table, distinct_column))
+
+            result = await self.session.execute(statement)
+            if columns:
+                return [dict(zip(columns, record)) for record in result.all()]
+            return [self.fetch_record_from_object(record) for record in result.scalars().all()]
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch records: {fetch_error}")
+            return []
+
+    async def insert_or_update_record(self, data_to_insert: dict, filter_field: str):
+        try:
+            filter_value = data_to_insert.get(filter_field, 0)
+            statement = select(self.table).where(getattr(self.table, filter_field) == filter_value).limit(1)
+            existing_entry = (await self.session.execute(statement)).scalars().first()
+
+            if existing_entry:
+                for key, value in data_to_insert.items():
+                    setattr(existing_entry, key, value)
+                await self.session.commit()
+                logger.info("Data updated successfully!")
+            else:
+                new_entry = self.table(**data_to_insert)
+                self.session.add(new_entry)
+                await self.session.commit()
+                logger.info(f"Data inserted successfully! {new_entry.__table__.name}")
+            return True
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(f"Failed to insert or update data: {e}")
+            raise
+
+    async def bulk_insert_or_update(self, records: list, conflict_keys: list,
+                                    chunk_size: int = PostgresConf.upsert_chunk_rows, update_columns: list = None,
+                                    stop_on_error: bool = False) -> dict:
+        """
+        Chunked ON CONFLICT upsert in one transaction, see PostgresUtility.bulk_insert_or_update.
+        """
+        batches, duplicates = bulk_upsert.upsert_batches(records, conflict_keys, chunk_size)
+        reports = []
+        try:
+            for number, (first_index, rows) in enumerate(batches):
+                statement = bulk_upsert.upsert_statement(self.table, rows, conflict_keys, update_columns)
+                try:
+                    async with self.session.begin_nested():
+                        flags = (await self.session.execute(statement)).scalars().all()
+                    reports.append(bulk_upsert.batch_report(number, first_index, rows, flags))
+                except SQLAlchemyError as e:
+                    logger.error(f"Bulk upsert batch {number} failed: {e}")
+                    reports.append(bulk_upsert.batch_report(number, first_index, rows, error=e,
+                                                               conflict_keys=conflict_keys))
+                    if stop_on_error:
+                        raise
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        report = bulk_upsert.summary(reports, duplicates)
+        logger.info(f"Bulk upsert: {report['inserted']} inserted, {report['updated']} updated, "
+                    f"{report['failed_rows']} failed")
+        return report
+
+    async def find_count(self, filters=None):
+        try:
+            statement = select(func.count()).select_from(self.table)
+            if filters:
+                statement = statement.filter_by(**filters)
+            total_count = (await self.session.execute(statement)).scalar()
+            logger.info(f"Total count fetched: {total_count}")
+            return total_count
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to fetch count: {e}")
+            raise
+
+    async def delete_record(self, filters: dict, soft_delete: bool = True) -> bool:
+        if not filters:
+            logger.warning("No filters provided for deletion.")
+            return False
+
+        try:
+            conditions = [getattr(self.table, key) == value for key, value in filters.items()]
+            statement = select(self.table).where(and_(*conditions))
+            existing_entry = (await self.session.execute(statement)).scalars().one_or_none()
+            if not existing_entry:
+                logger.warning(f"No record found with conditions: {filters}")
+                return False
+
+            if soft_delete:
+                if not getattr(existing_entry, 'archive', False):
+                    setattr(existing_entry, 'archive', True)
+                    logger.info(f"Record soft deleted with conditions: {filters}")
+                else:
+                    logger.info(f"Record already soft deleted with conditions: {filters}")
+            else:
+                await self.session.delete(existing_entry)
+                logger.info(f"Record hard deleted with conditions: {filters}")
+
+            await self.session.commit()
+            return True
+
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Failed to delete record: {e}")
+            return False
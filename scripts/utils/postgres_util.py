@@ -1,5 +1,11 @@
-from sqlalchemy import inspect, text, func, and_
+from sqlalchemy import text, func, and_, select
 from sqlalchemy.exc import SQLAlchemyError
+
+from scripts.config.app_configurations import PostgresConf
+from scripts.db.psql import bulk_upsert, pagination
+from scripts.db.psql.pagination import CountMode
+from scripts.db.psql.row_converter import RowOutput, converter_for
+from scripts.db.psql.schema_cache import schema_cache
 from scripts.logging.logging import logger
 
 
@@ -13,27 +19,25 @@ class PostgresUtility:
         try:
             if self.session:
                 engine = self.session.get_bind().engine
-                if not inspect(engine).has_table(self.table.__tablename__):
-                    self.table.__table__.create(bind=engine, checkfirst=True)
+                table = self.table.__table__
+                if schema_cache.get(engine, table.name, table.schema) is None:
+                    table.create(bind=engine, checkfirst=True)
+                    schema_cache.mark_created(engine, table)
                 else:
                     self.update_table_columns(engine)
-                    orm_table = self.table
-                    orm_table.__table__.create(bind=engine, checkfirst=True)
         except Exception as e:
             logger.error(f"Error occurred during start-up: {e}", exc_info=True)
 
     def update_table_columns(self, engine):
-        inspector = inspect(engine)
-        existing_columns = [column["name"] for column in inspector.get_columns(self.table.__tablename__)]
-
-        for column in self.table.__table__.columns:
-            if column.name not in existing_columns:
-                self.add_column(engine, self.table.__tablename__, column)
+        """
+        Adds model columns missing from the live table, in one ALTER TABLE, reflecting only on a cache miss.
+        """
+        table = self.table.__table__
+        return schema_cache.ensure_columns(engine, table.name, list(table.columns), table.schema)
 
     @staticmethod
     def add_column(engine, table_name, column):
-        column_definition = f"{column.name} {column.type}"
-        engine.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_definition}")
+        schema_cache.ensure_columns(engine, table_name, [column])
 
     def find_all_data(self):
         try:
@@ -45,6 +49,75 @@ class PostgresUtility:
             logger.error(f"Failed to fetch record: {fetch_error}")
             return None
 
+    def find_rows(self, filters: dict = None, columns: list = None, output: str = RowOutput.dict,
+                  order_by: list = None, limit: int = None):
+        """
+        Read-only fast path: selects only the requested columns as Core rows and converts them with a
+        converter cached per model, no ORM objects are built.
+
+        :param output: "dict" (list of dicts), "tuple" (list of tuples in column order) or
+                       "columns" (dict of column name to list of values)
+        """
+        try:
+            converter = converter_for(self.table, tuple(columns) if columns else None)
+            statement = pagination.filtered(
+                self.table, select(*[getattr(self.table, name) for name in converter.names]), filters
+            )
+            if order_by:
+                statement = statement.order_by(*[getattr(self.table, name) for name in order_by])
+            if limit:
+                statement = statement.limit(limit)
+            rows = self.session.connection().execute(statement).fetchall()
+            return converter.convert(rows, output)
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch rows: {fetch_error}")
+            raise fetch_error
+
+    def stream_rows(self, statement, fetch_size: int = PostgresConf.stream_fetch_size, chunks: bool = False):
+        """
+        Runs a Core select on a server-side cursor and yields its rows as dicts, fetch_size rows per round trip.
+
+        :param chunks: Yield lists of up to fetch_size row dicts instead of single rows
+        """
+        result = self.session.execute(statement.execution_options(stream_results=True, max_row_buffer=fetch_size))
+        try:
+            for partition in result.mappings().partitions(fetch_size):
+                rows = [dict(row) for row in partition]
+                if chunks:
+                    yield rows
+                else:
+                    yield from rows
+        finally:
+            result.close()
+
+    def iter_all_data(self, fetch_size: int = PostgresConf.stream_fetch_size, chunks: bool = False):
+        """
+        Streaming counterpart of find_all_data.
+        """
+        return self.stream_rows(select(*self.table.__table__.columns), fetch_size, chunks)
+
+    def iter_many_data_by_condition(self, filters: dict = None, columns: list = None, distinct_column: str = None,
+                                    fetch_size: int = PostgresConf.stream_fetch_size, chunks: bool = False):
+        """
+        Streaming counterpart of find_many_data_by_condition.
+        """
+        selected = [getattr(self.table, col) for col in columns] if columns else self.table.__table__.columns
+        statement = pagination.filtered(self.table, select(*selected), filters)
+        if distinct_column:
+            statement = statement.distinct(getattr(self.table, distinct_column))
+        return self.stream_rows(statement, fetch_size, chunks)
+
+    def iter_many_data_including_foreign_values(self, filters: dict = None, column_mappings={},
+                                                fetch_size: int = PostgresConf.stream_fetch_size):
+        """
+        Streaming counterpart of find_many_data_including_foreign_values, yields one dict per row.
+        """
+        statement = pagination.filtered(self.table, select(*self.table.__table__.columns), filters)
+        for row in self.stream_rows(statement, fetch_size):
+            if column_mappings:
+                row.update({label: row.get(value) for label, value in column_mappings.items() if value in row})
+            yield row
+
     def find_many_data_including_foreign_values(self, filters: dict = None, column_mappings={}):
         try:
             query = self.session.query(self.table)
@@ -104,6 +177,47 @@ class PostgresUtility:
             logger.error(f"Failed to fetch data: {fetch_error}")
             raise fetch_error
 
+    def find_data_by_cursor(self, order_by: list, cursor: str = None, page_size: int = 50, filters: dict = None,
+                            columns: list = None, column_mappings={}, descending: bool = False,
+                            count_mode: str = CountMode.none):
+        """
+        Keyset pagination: each page continues after the key of the previous page's last row.
+
+        :param order_by: Columns forming a unique ordered key, e.g. ["created_at", "id"]
+        :param cursor: Token returned as next_cursor by the previous page, None for the first page
+        :param count_mode: None, "exact" (count query), "window" (count(*) over () in the page query itself)
+                           or "estimated" (planner statistics, for very large tables)
+        :return: (records, next_cursor or None on the last page, total_records or None)
+        """
+        try:
+            window_total = count_mode == CountMode.window
+            statement, seen = pagination.keyset_statement(self.table, order_by, cursor, page_size, filters,
+                                                          columns, descending, window_total)
+            rows = self.session.execute(statement).mappings().all()
+            result, next_cursor, total_records = pagination.keyset_page(rows, order_by, page_size, seen, columns,
+                                                                        column_mappings, window_total)
+            if count_mode == CountMode.exact:
+                total_records = self.session.execute(pagination.count_statement(self.table, filters)).scalar()
+            elif count_mode == CountMode.estimated:
+                total_records = self.estimate_count(filters)
+            return result, next_cursor, total_records
+        except Exception as fetch_error:
+            logger.error(f"Failed to fetch data: {fetch_error}")
+            raise fetch_error
+
+    def estimate_count(self, filters: dict = None) -> int:
+        """
+        Row count from Postgres planner statistics instead of scanning the table.
+        pg_class.reltuples for the whole table, the EXPLAIN row estimate when filtered.
+        """
+        if not filters:
+            estimate = self.session.execute(pagination.reltuples_statement(self.table)).scalar()
+            if estimate is not None and estimate >= 0:
+                return estimate
+        sql, params = pagination.explain_sql(self.table, filters, self.session.get_bind().dialect)
+        plan = self.session.connection().exec_driver_sql(sql, params).scalar()
+        return pagination.explain_rows(plan)
+
     def find_data_by_condition(self, filters: dict = None, columns: list = None):
         """
         Fetch a single record using a raw query with dynamic filters.
@@ -192,6 +306,40 @@ class PostgresUtility:
             logger.error(f"Failed to insert or update data: {e}")
             raise
 
+    def bulk_insert_or_update(self, records: list, conflict_keys: list, chunk_size: int = PostgresConf.upsert_chunk_rows,
+                              update_columns: list = None, stop_on_error: bool = False) -> dict:
+        """
+        Upserts many records with chunked INSERT ... ON CONFLICT statements in one transaction.
+        Every batch runs in its own savepoint, a failing batch is rolled back and reported while the others
+        still commit (unless stop_on_error).
+
+        :param conflict_keys: Columns of the unique constraint / primary key identifying a record
+        :param update_columns: Columns overwritten on conflict, defaults to every non-key column
+        :return: Totals plus per batch inserted / updated / skipped counts or the error of the batch
+        """
+        batches, duplicates = bulk_upsert.upsert_batches(records, conflict_keys, chunk_size)
+        reports = []
+        try:
+            for number, (first_index, rows) in enumerate(batches):
+                statement = bulk_upsert.upsert_statement(self.table, rows, conflict_keys, update_columns)
+                try:
+                    with self.session.begin_nested():
+                        flags = self.session.execute(statement).scalars().all()
+                    reports.append(bulk_upsert.batch_report(number, first_index, rows, flags))
+                except SQLAlchemyError as e:
+                    logger.error(f"Bulk upsert batch {number} failed: {e}")
+                    reports.append(bulk_upsert.batch_report(number, first_index, rows, error=e,
+                                                               conflict_keys=conflict_keys))
+                    if stop_on_error:
+                        raise
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        report = bulk_upsert.summary(reports, duplicates)
+        logger.info(f"Bulk upsert: {report['inserted']} inserted, {report['updated']} updated, "
+                    f"{report['failed_rows']} failed")
+        return report
 
     def find_count(self, filters=None):
         try:
@@ -0,0 +1,103 @@
+import json
+from typing import AsyncIterable, Callable, Iterable, Union
+
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BSON_MEDIA_TYPE = "application/bson"
+
+
+class NDJSONStream:
+    """
+    Encodes rows (dicts) or chunks of rows (lists of dicts) as newline delimited JSON, one line per row.
+    Lines are grouped into writes of about `buffer_bytes` so small rows do not cost one socket write each.
+    """
+
+    def __init__(self, rows: Union[Iterable, AsyncIterable], buffer_bytes: int = 64 * 1024):
+        self.rows = rows
+        self.buffer_bytes = buffer_bytes
+
+    @staticmethod
+    def encode(row) -> str:
+        return json.dumps(row, default=str, separators=(",", ":")) + "\n"
+
+    def lines(self, item):
+        if isinstance(item, list):
+            return "".join(self.encode(row) for row in item)
+        return self.encode(item)
+
+    @staticmethod
+    def join(buffer) -> bytes:
+        return "".join(buffer).encode()
+
+    def __iter__(self):
+        buffer, size = [], 0
+        for item in self.rows:
+            line = self.lines(item)
+            buffer.append(line)
+            size += len(line)
+            if size >= self.buffer_bytes:
+                yield self.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield self.join(buffer)
+
+    async def __aiter__(self):
+        buffer, size = [], 0
+        async for item in self.rows:
+            line = self.lines(item)
+            buffer.append(line)
+            size += len(line)
+            if size >= self.buffer_bytes:
+                yield self.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield self.join(buffer)
+
+
+class BSONStream(NDJSONStream):
+    """
+    Concatenated BSON documents (the mongodump .bson layout), from RawBSONDocument rows or chunks,
+    written as received from the server without decoding.
+    """
+
+    def lines(self, item):
+        if isinstance(item, list):
+            return b"".join(document.raw for document in item)
+        return item.raw
+
+    @staticmethod
+    def join(buffer) -> bytes:
+        return b"".join(buffer)
+
+
+def ndjson_response(rows: Union[Iterable, AsyncIterable], close: Callable = None, filename: str = None,
+                    status_code: int = 200) -> StreamingResponse:
+    """
+    Streams rows from a generator (e.g. PostgresUtility.iter_all_data) as NDJSON with flat memory.
+    Synchronous generators are iterated on the threadpool, so blocking cursors do not stall the event loop.
+
+    :param close: Called once the body is sent, typically session.close, since FastAPI closes `yield`
+                  dependencies before a streamed body is produced
+    :param filename: Send as an attachment with this file name
+    """
+    return stream_response(NDJSONStream(rows), NDJSON_MEDIA_TYPE, close, filename, status_code)
+
+
+def bson_response(documents: Union[Iterable, AsyncIterable], close: Callable = None, filename: str = None,
+                  status_code: int = 200) -> StreamingResponse:
+    """
+    Streams RawBSONDocuments (e.g. MongoCollectionBaseClass.find_iter(..., raw=True)) as concatenated BSON,
+    readable by mongorestore and bson.decode_file_iter, without decoding them in this service.
+    """
+    return stream_response(BSONStream(documents), BSON_MEDIA_TYPE, close, filename, status_code)
+
+
+def stream_response(stream: NDJSONStream, media_type: str, close: Callable = None, filename: str = None,
+                    status_code: int = 200) -> StreamingResponse:
+    body = stream.__aiter__() if hasattr(stream.rows, "__aiter__") else iter(stream)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    background = BackgroundTask(close) if close else None
+    return StreamingResponse(body, status_code=status_code, media_type=media_type, headers=headers,
+                             background=background)
@@ -0,0 +1,46 @@
+import json
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import numpy as np  # noqa: E402
+
+from scripts.db.kairos.response_decoder import KairosResponseDecoder  # noqa: E402
+
+
+def response(results):
+    return json.dumps({"queries": [{"sample_size": 3, "results": results}]}).encode()
+
+
+def chunked(body: bytes, size: int):
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+def test_string_datapoints_with_brackets():
+    body = response([
+        {"name": "status", "group_by": [], "tags": {"line": ["l1"]},
+         "values": [[1, "a]]b"], [2, 7], [3, '[x"]'], [4, None]]},
+        {"name": "speed", "tags": {}, "values": [[5, 1.5]]},
+    ])
+    for size in (len(body), 7, 1):
+        (status, speed), = KairosResponseDecoder().decode(chunked(body, size))
+        assert status.timestamps.tolist() == [1, 2, 3, 4]
+        assert np.isnan(status.values[[0, 2, 3]]).all() and status.values[1] == 7
+        assert status.tags == {"line": ["l1"]}
+        assert speed.name == "speed" and speed.values.tolist() == [1.5]
+
+
+def test_tag_named_values_is_not_datapoints():
+    body = response([{"name": "m", "tags": {"values": ["a", "b"]}, "values": [[1, 2], [3, 4]]}])
+    for size in (len(body), 5):
+        (series,), = KairosResponseDecoder().decode(chunked(body, size))
+        assert series.tags == {"values": ["a", "b"]}
+        assert series.timestamps.tolist() == [1, 3] and series.values.tolist() == [2, 4]
+
+
+def test_chunk_points_with_string_datapoints():
+    values = [[index, "]]" if index % 2 else index] for index in range(10)]
+    body = response([{"name": "m", "tags": {}, "values": values}])
+    pieces = list(KairosResponseDecoder(chunk_points=3).iter_series(chunked(body, 16)))
+    assert np.concatenate([piece.timestamps for piece in pieces]).tolist() == list(range(10))
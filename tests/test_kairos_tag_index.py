@@ -0,0 +1,95 @@
+import asyncio
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from scripts.db.kairos import async_kairos_connection, kairos_connection  # noqa: E402
+from scripts.db.kairos.async_kairos_connection import AsyncKairosConn  # noqa: E402
+from scripts.db.kairos.kairos_connection import KairosConn  # noqa: E402
+from scripts.db.kairos.tag_index import KairosTagIndex  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, tags):
+        self.tags = tags
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"queries": [{"results": [{"name": "line_status", "tags": {"line": list(self.tags)}}]}]}
+
+
+class FakeKairos:
+    def __init__(self, *tags):
+        self.tags = list(tags)
+        self.reads = 0
+
+    def read_tags(self, query_json):
+        self.reads += 1
+        return FakeResponse(self.tags)
+
+
+class AsyncFakeKairos(FakeKairos):
+    async def read_tags(self, query_json, deadline=None):
+        self.reads += 1
+        await asyncio.sleep(0)
+        return FakeResponse(self.tags)
+
+
+def use_index(monkeypatch, kairos):
+    index = KairosTagIndex(kairos_instance=kairos, refresh_interval=0, miss_reload=60)
+    monkeypatch.setattr(kairos_connection, "tag_index", index)
+    monkeypatch.setattr(async_kairos_connection, "tag_index", index)
+    return index
+
+
+def make_due(index, metric_name="line_status"):
+    index.peek(metric_name).loaded_at -= index.miss_reload
+
+
+def test_miss_reloads_the_index_once(monkeypatch):
+    kairos = FakeKairos("l1")
+    index = use_index(monkeypatch, kairos)
+    connection = KairosConn()
+    assert connection.find_key("line_status", "l1", None, None) == {"line": "l1"}
+    kairos.tags.append("l2")
+    # loaded just now, the miss waits for the interval
+    assert connection.find_key("line_status", "l2", None, None) is None
+    make_due(index)
+    assert connection.find_key("line_status", "l2", None, None) == {"line": "l2"}
+    assert connection.find_key("line_status", "l3", None, None) is None
+    assert kairos.reads == 2
+
+
+def test_failed_reload_keeps_the_index(monkeypatch):
+    kairos = FakeKairos("l1")
+    index = use_index(monkeypatch, kairos)
+    connection = KairosConn()
+    connection.find_key("line_status", "l1", None, None)
+    make_due(index)
+
+    def down(query_json):
+        raise ConnectionError("Kairos is down")
+
+    monkeypatch.setattr(kairos, "read_tags", down)
+    assert connection.find_key("line_status", "l2", None, None) is None
+    # retried after the interval, not on every miss
+    assert not index.reload_due(index.peek("line_status"))
+
+
+def test_async_misses_share_one_reload(monkeypatch):
+    kairos = AsyncFakeKairos("l1")
+    index = use_index(monkeypatch, kairos)
+    connection = AsyncKairosConn()
+    connection.kairos_instance = kairos
+
+    async def lookups():
+        await connection.find_key("line_status", "l1", None, None)
+        kairos.tags.append("l2")
+        make_due(index)
+        return await asyncio.gather(*(connection.find_key("line_status", "l2", None, None) for _ in range(5)))
+
+    assert asyncio.run(lookups()) == [{"line": "l2"}] * 5
+    assert kairos.reads == 2 and not index.async_reloads
@@ -0,0 +1,120 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import pytest  # noqa: E402
+
+from scripts.config.app_configurations import Timezone  # noqa: E402
+from scripts.utils.mongo_bulk_util import MongoBulkOperations  # noqa: E402
+from scripts.utils.mongo_soft_delete_util import SoftDeleteEngine  # noqa: E402
+
+mongomock = pytest.importorskip("mongomock")
+
+DB_NAME = "project_1__dashboard"
+
+
+class MergingCollection:
+    """
+    mongomock collection that runs a final $merge stage itself (mongomock does not implement it)
+    and counts the round trips.
+    """
+
+    def __init__(self, client, collection):
+        self.client = client
+        self.collection = collection
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.collection, name)
+
+    def aggregate(self, pipeline):
+        self.calls.append("aggregate")
+        if "$merge" not in pipeline[-1]:
+            return self.collection.aggregate(pipeline)
+        target = pipeline[-1]["$merge"]["into"]
+        documents = list(self.collection.aggregate(pipeline[:-1]))
+        if documents:
+            self.client[target["db"]][target["coll"]].insert_many(documents)
+        return iter([])
+
+
+@pytest.fixture(autouse=True)
+def time_zone(monkeypatch):
+    # the archive copies are stamped with the deletion time in this zone
+    monkeypatch.setattr(Timezone, "desired_time_zone", Timezone.desired_time_zone or "UTC")
+
+
+@pytest.fixture
+def client():
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def collection(client):
+    collection = MergingCollection(client, client[DB_NAME]["widgets"])
+    collection.collection.insert_many([{"_id": i, "kind": "chart" if i % 2 else "table"} for i in range(10)])
+    collection.calls.clear()
+    return collection
+
+
+def bulk(collection, chunk_size=None):
+    return MongoBulkOperations(collection, SoftDeleteEngine(collection, DB_NAME, "widgets"), chunk_size)
+
+
+def remaining(collection):
+    return sorted(document["_id"] for document in collection.collection.find())
+
+
+def archived(client):
+    return sorted(document["_id"] for document in client[f"deleted__{DB_NAME}"]["widgets"].find())
+
+
+def test_delete_one_resolves_distinct_documents_in_one_round_trip(client, collection):
+    operations = bulk(collection)
+    operations.delete_one({"kind": "chart"}).delete_one({"kind": "chart"}).delete_one({"kind": "missing"})
+    operations.delete_one({"_id": 2}).delete_one({"_id": 2}).delete_one({"_id": 42})
+    result = operations.execute()
+    assert result["deleted"] == 3 and not result["errors"]
+    assert remaining(collection) == [0, 4, 5, 6, 7, 8, 9]
+    assert archived(client) == [1, 2, 3]
+    # one resolve aggregate, one archive $merge, one delete
+    assert collection.calls == ["aggregate", "aggregate", "delete_many"]
+
+
+def test_overlapping_filters_read_past_taken_candidates(client, collection):
+    operations = bulk(collection).delete_one({"kind": "chart"}).delete_one({"_id": {"$in": [1, 3]}})
+    assert operations.execute()["deleted"] == 2
+    assert archived(client) == [1, 3]
+    assert collection.calls == ["aggregate", "find_one", "aggregate", "delete_many"]
+
+
+def test_delete_one_after_delete_many_deletes_what_it_left(client, collection):
+    operations = bulk(collection).delete_many({"kind": "chart"}).delete_one({"_id": {"$gte": 0}})
+    assert operations.execute()["deleted"] == 6
+    assert remaining(collection) == [2, 4, 6, 8]
+    assert archived(client) == [0, 1, 3, 5, 7, 9]
+
+
+def test_writes_and_deletes_keep_queue_order(client, collection):
+    operations = bulk(collection).insert_one({"_id": 20, "kind": "gauge"}).delete_one({"kind": "gauge"})
+    operations.delete_one({"_id": 21}).insert_one({"_id": 21, "kind": "gauge"})
+    result = operations.execute()
+    assert result["inserted"] == 2 and result["deleted"] == 1
+    assert 20 not in remaining(collection) and 21 in remaining(collection)
+    assert archived(client) == [20]
+
+
+def test_chunks_map_errors_to_queue_indexes(client, collection):
+    operations = bulk(collection, chunk_size=2)
+    operations.insert_one({"_id": 30}).delete_one({"_id": 0}).insert_one({"_id": 31}).insert_one({"_id": 1})
+    result = operations.execute()
+    assert result["inserted"] == 2 and result["deleted"] == 1
+    assert [(error["index"], error["operation"]) for error in result["errors"]] == [(3, "InsertOne")]
+    assert archived(client) == [0]
+
+
+def test_hard_delete_stays_in_the_bulk_write(collection):
+    operations = MongoBulkOperations(collection).delete_one({"kind": "chart"}).delete_many({"kind": "table"})
+    assert operations.execute()["deleted"] == 6
+    assert collection.calls == ["bulk_write"]
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import pytest  # noqa: E402
+
+from scripts.utils import mongo_pagination_util as pagination  # noqa: E402
+
+SORT_KEY = "meta.created_at"
+
+
+def test_range_page_cursor_of_dotted_sort_key():
+    created_at = datetime(2024, 1, 1)
+    documents = [{"_id": 1, "meta": {"created_at": created_at, "line": "l1"}}]
+    documents, cursor = pagination.range_page(documents, SORT_KEY, 1, {SORT_KEY})
+    assert pagination.decode_range_cursor(cursor) == [created_at, 1]
+    assert documents == [{"_id": 1, "meta": {"line": "l1"}}]
+
+
+def test_range_projection_of_dotted_sort_key():
+    assert pagination.range_projection({"meta": 1}, SORT_KEY) == ({"meta": 1, "_id": 1}, set())
+    assert pagination.range_projection({"meta.line": 1, "_id": 0}, SORT_KEY) == (
+        {"meta.line": 1, "_id": 1, SORT_KEY: 1}, {"_id", SORT_KEY})
+    assert pagination.range_projection({"meta": 0}, SORT_KEY) == (None, {"meta"})
+
+
+def test_strip_drops_emptied_parents():
+    documents, _ = pagination.range_page([{"_id": 1, "meta": {"created_at": 1}}], SORT_KEY, 2, {SORT_KEY})
+    assert documents == [{"_id": 1}]
+
+
+def test_range_pages_walk_past_null_and_missing_sort_keys():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient()["project_1__dashboard"]["widgets"]
+    for _id in range(20):
+        meta = {"created_at": None} if _id % 4 == 1 else {} if _id % 4 == 2 else {"created_at": _id % 5}
+        collection.insert_one({"_id": _id, "meta": meta})
+    for descending in (False, True):
+        for limit in (1, 3, 7):
+            seen, cursor = [], None
+            while True:
+                query = pagination.range_query({}, SORT_KEY, pagination.decode_range_cursor(cursor), descending)
+                documents = collection.find(query).sort(pagination.range_sort(SORT_KEY, descending)).limit(limit)
+                documents, cursor = pagination.range_page(list(documents), SORT_KEY, limit, set())
+                seen.extend(document["_id"] for document in documents)
+                if cursor is None:
+                    break
+            assert sorted(seen) == list(range(20)), (descending, limit, seen)
@@ -0,0 +1,108 @@
+import json
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import psycopg2  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import BigInteger, Float, Integer, String  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from scripts.db.psql import TableDDL  # noqa: E402
+
+DATA_TYPES = {
+    "id": (BigInteger, True),
+    "status": (Integer, False),
+    "value": (Float, False),
+    "config": (String, False),
+}
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, statement):
+        self.connection.statements.append(statement)
+        if self.connection.fail and statement.startswith("INSERT"):
+            raise psycopg2.DataError("invalid input syntax for type integer")
+
+    def copy_expert(self, statement, buffer):
+        self.connection.copied.append(buffer.read())
+
+
+class FakeConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.statements = []
+        self.copied = []
+        self.committed = self.rolled_back = self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEngine:
+    dialect = postgresql.dialect()
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def raw_connection(self):
+        return self.connection
+
+
+def copy_upsert(data_df, connection):
+    table_ddl = TableDDL(FakeEngine(connection), "line_status")
+    table_ddl.copy_upsert_to_table(table_ddl.create_model(DATA_TYPES), ["id"], data_df, chunk_rows=2)
+
+
+def test_int_column_with_nan_is_copied_without_decimals():
+    data_df = pd.DataFrame({"id": [1, 2, 3], "status": [4, np.nan, 6], "value": [0.5, np.nan, 2.0]})
+    assert data_df["status"].dtype.kind == "f"
+    connection = FakeConnection()
+    copy_upsert(data_df, connection)
+    assert connection.copied == ["1,4,0.5\n2,\\N,\\N\n", "3,6,2.0\n"]
+    assert connection.committed and connection.closed
+
+
+def test_dict_and_list_cells_are_json_encoded():
+    config = [{"line": "l1", "tags": ["a", "b"]}, ["x", 1], "plain"]
+    data_df = pd.DataFrame({"id": [1, 2, 3], "config": config})
+    columns = [column for column in TableDDL(None, "t").create_model(DATA_TYPES).columns if column.name in data_df]
+    chunk = TableDDL.csv_ready(data_df, columns)
+    assert json.loads(chunk["config"][0]) == config[0]
+    assert json.loads(chunk["config"][1]) == config[1]
+    assert chunk["config"][2] == "plain"
+
+
+def test_failed_merge_is_raised():
+    connection = FakeConnection(fail=True)
+    with pytest.raises(psycopg2.DataError):
+        copy_upsert(pd.DataFrame({"id": [1], "status": [2]}), connection)
+    assert connection.rolled_back and not connection.committed
+
+
+def test_columns_missing_from_the_model_are_raised():
+    connection = FakeConnection()
+    with pytest.raises(ValueError, match="unknown"):
+        copy_upsert(pd.DataFrame({"id": [1], "unknown": [2]}), connection)
+    assert not connection.statements